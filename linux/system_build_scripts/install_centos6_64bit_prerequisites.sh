@@ -152,6 +152,7 @@ pip install ssh
 pip install pycrypto
 pip install appdirs
 pip install requests
+pip install requests-toolbelt
 pip install pexpect
 pip install lxml
 pip install psutil
@@ -23,6 +23,7 @@ from .views.testrun import TestRunFrame
 
 from .controllers.folders import FoldersController
 from .controllers.schedule import ScheduleController
+from .controllers.watch import WatchController
 from .controllers.updates import VersionCheck
 
 from .events.settings import OnSettings
@@ -52,6 +53,7 @@ class MyData(wx.App):
 
         self.foldersController = None
         self.scheduleController = None
+        self.watchController = None
 
         MyData.ParseArgs(argv)
 
@@ -114,6 +116,7 @@ class MyData(wx.App):
 
         self.foldersController = FoldersController(self.frame)
         self.scheduleController = ScheduleController()
+        self.watchController = WatchController()
 
         if sys.platform.startswith("win"):
             self.CheckIfAlreadyRunning(appdirPath)
@@ -190,6 +193,7 @@ class MyData(wx.App):
         """
         from .utils import BeginBusyCursorIfRequired
         from .utils import EndBusyCursorIfRequired
+        from .utils.hashing import MD5_PROCESS_POOL
         if sys.platform.startswith("linux"):
             from .linuxsubprocesses import StopErrandBoy
 
@@ -211,6 +215,7 @@ class MyData(wx.App):
             self.foldersController.ShutDownUploadThreads()
             EndBusyCursorIfRequired()
             DATAVIEW_MODELS['tasks'].ShutDown()
+            MD5_PROCESS_POOL.Terminate()
             if sys.platform.startswith("linux"):
                 StopErrandBoy()
             # sys.exit can raise exceptions if the wx.App
@@ -25,23 +25,40 @@ from ..events import PostEvent
 from ..events.stop import CheckIfShouldAbort
 from ..events import MYDATA_THREADS
 from ..settings import SETTINGS
-from ..models.experiment import ExperimentModel
-from ..models.dataset import DatasetModel
+from ..models.resolution import RESOLUTION_CACHE
+from ..models.datafile import DataFileLookupIndex
+from ..models.upload import UploadStatus
+from ..models.verification import VerificationStatus
 from ..logs import logger
 from ..logs.testrun import LogTestRunSummary
 from ..utils import EndBusyCursorIfRequired
 from ..utils import SafeStr
+from ..utils.api import MYTARDIS_API
 from ..utils.exceptions import StorageBoxAttributeNotFound
 from ..utils.openssh import CleanUpScpAndSshProcesses
+from ..utils.sftp import SFTP_POOL
 from ..threads.flags import FLAGS
 from ..threads.locks import LOCKS
 from .uploads import UploadMethod
 from .uploads import UploadDatafileRunnable
+from .uploads import UploadBatchRunnable
+from .uploads import BATCH_MAX_FILES
 from .verifications import VerifyDatafileRunnable
 
 if sys.platform.startswith("linux"):
     from ..linuxsubprocesses import StartErrandBoy
 
+# When a folder's files are verified while the folder is still being
+# scanned, this many files are looked up in the verified DataFiles cache
+# at once, before queueing lookups for the cache misses:
+STREAMING_BATCH_SIZE = 256
+
+# When hashing workers are enabled, up to this many hashed uploads per
+# upload thread can be waiting in the uploads queue (or up to
+# BATCH_MAX_FILES hashed uploads, when small files are uploaded in
+# batches):
+HASHED_UPLOADS_PER_UPLOAD_THREAD = 2
+
 
 class FoldersController(object):
     # pylint: disable=too-many-public-methods
@@ -63,7 +80,10 @@ class FoldersController(object):
         self.finishedCountingVerifications = dict()
         self.finishedScanningForDatasetFolders = threading.Event()
         self.verificationsQueue = None
+        self.hashingQueue = None
         self.uploadsQueue = None
+        # Limits the number of hashed uploads waiting for upload workers:
+        self.hashedUploadSlots = None
         self.numVerificationsToBePerformed = 0
         self.uploadsAcknowledged = 0
         self.uploadMethod = UploadMethod.HTTP_POST
@@ -73,6 +93,8 @@ class FoldersController(object):
         # can be called.
         self.numVerificationWorkerThreads = 0
         self.verificationWorkerThreads = []
+        self.numHashingWorkerThreads = 0
+        self.hashingWorkerThreads = []
         self.numUploadWorkerThreads = 0
         self.uploadWorkerThreads = []
 
@@ -204,7 +226,10 @@ class FoldersController(object):
             folderModel, dfi, existingUnverifiedDatafile,
             verificationModel, bytesUploadedPreviously)
         if wx.PyApp.IsMainLoopRunning():
-            self.uploadsQueue.put(uploadDatafileRunnable)
+            if self.numHashingWorkerThreads > 0:
+                self.hashingQueue.put(uploadDatafileRunnable)
+            else:
+                self.uploadsQueue.put(uploadDatafileRunnable)
         else:
             uploadDatafileRunnable.Run()
         self.CountCompletedUploadsAndVerifications(event=None)
@@ -230,6 +255,11 @@ class FoldersController(object):
         self.uploadsAcknowledged = 0
         self.finishedCountingVerifications = dict()
         SETTINGS.InitializeVerifiedDatafilesCache()
+        SETTINGS.InitializeLookupCache()
+        SETTINGS.InitializeChecksumCache()
+        RESOLUTION_CACHE.Reset()
+        if SETTINGS.miscellaneous.incrementalScans:
+            SETTINGS.InitializeScanManifest()
 
         if wx.PyApp.IsMainLoopRunning():
             for i in range(self.numVerificationWorkerThreads):
@@ -240,6 +270,15 @@ class FoldersController(object):
                 thread.start()
         self.uploadsQueue = Queue()
         self.numUploadWorkerThreads = SETTINGS.advanced.maxUploadThreads
+        self.hashingQueue = Queue()
+        self.numHashingWorkerThreads = \
+            max(0, SETTINGS.miscellaneous.maxHashingThreads)
+        self.hashingWorkerThreads = []
+        numHashedUploads = \
+            HASHED_UPLOADS_PER_UPLOAD_THREAD * self.numUploadWorkerThreads
+        if SETTINGS.miscellaneous.batchSmallFileUploads:
+            numHashedUploads = max(numHashedUploads, BATCH_MAX_FILES)
+        self.hashedUploadSlots = threading.Semaphore(numHashedUploads)
         self.uploadMethod = UploadMethod.HTTP_POST
 
         if sys.platform.startswith("linux"):
@@ -330,8 +369,7 @@ class FoldersController(object):
                 "approval from your MyTardis administrator.\n\n" \
                 "A request has been sent, and you will be contacted " \
                 "once the request has been approved. Until then, " \
-                "MyData will upload files using HTTP POST, and will " \
-                "only upload one file at a time.\n\n" \
+                "MyData will upload files using HTTP POST.\n\n" \
                 "HTTP POST is generally only suitable for small " \
                 "files (up to 100 MB each)."
             logger.warning(message)
@@ -341,16 +379,15 @@ class FoldersController(object):
                     message=message,
                     icon=wx.ICON_WARNING))
             self.uploadMethod = UploadMethod.HTTP_POST
-        if self.uploadMethod == UploadMethod.HTTP_POST and \
-                self.numUploadWorkerThreads > 1:
-            logger.warning(
-                "Using HTTP POST, so setting "
-                "numUploadWorkerThreads to 1, "
-                "because urllib2 is not thread-safe.")
-            self.numUploadWorkerThreads = 1
 
         self.uploadWorkerThreads = []
         if wx.PyApp.IsMainLoopRunning():
+            for i in range(self.numHashingWorkerThreads):
+                thread = threading.Thread(
+                    name="HashingWorkerThread-%d" % (i + 1),
+                    target=self.HashingWorker, args=())
+                self.hashingWorkerThreads.append(thread)
+                thread.start()
             for i in range(self.numUploadWorkerThreads):
                 thread = threading.Thread(
                     name="UploadWorkerThread-%d" % (i + 1),
@@ -467,11 +504,10 @@ class FoldersController(object):
                 "and uploads for folder: " + folderModel.folderName)
             try:
                 try:
-                    with LOCKS.getOrCreateExp:
-                        if self.IsShuttingDown() or CheckIfShouldAbort():
-                            return
-                        experimentModel = ExperimentModel\
-                            .GetOrCreateExperimentForFolder(folderModel)
+                    if self.IsShuttingDown() or CheckIfShouldAbort():
+                        return
+                    experimentModel = RESOLUTION_CACHE\
+                        .GetOrCreateExperiment(folderModel)
                 except Exception as err:
                     if self.failed:
                         return
@@ -518,8 +554,8 @@ class FoldersController(object):
                     return
                 folderModel.experimentModel = experimentModel
                 try:
-                    folderModel.datasetModel = DatasetModel\
-                        .CreateDatasetIfNecessary(folderModel)
+                    folderModel.datasetModel = RESOLUTION_CACHE\
+                        .GetOrCreateDataset(folderModel)
                 except Exception as err:
                     logger.error(traceback.format_exc())
                     PostEvent(
@@ -528,6 +564,19 @@ class FoldersController(object):
                             message=str(err),
                             icon=wx.ICON_ERROR))
                     return
+                if SETTINGS.miscellaneous.incrementalScans and \
+                        self.HandleUnchangedFolder(folderModel):
+                    # There's no need to look up the folder's files on
+                    # MyTardis:
+                    logger.debug(
+                        "StartUploadsForFolder: No new or modified files "
+                        "found in folder: " + folderModel.folderName)
+                    with LOCKS.finishedCounting:
+                        self.finishedCountingVerifications[folderModel].set()
+                    wx.CallAfter(
+                        self.CountCompletedUploadsAndVerifications,
+                        event=None)
+                    return
                 self.VerifyDatafiles(folderModel)
             except requests.exceptions.ConnectionError as err:
                 logger.error(str(err))
@@ -565,12 +614,31 @@ class FoldersController(object):
         for uploading local data files to
         the MyTardis server.
         """
+        # Tasks taken from the queue while collecting a batch, which
+        # couldn't be added to it (see UploadBatchRunnable.CollectBatch):
+        nextTasks = []
         while True:
             if self.IsShuttingDown():
                 return
-            task = self.uploadsQueue.get()
+            if nextTasks:
+                task = nextTasks.pop(0)
+            else:
+                task = self.uploadsQueue.get()
             if task is None:
                 return
+            if SETTINGS.miscellaneous.batchSmallFileUploads and \
+                    self.uploadMethod == UploadMethod.VIA_STAGING and \
+                    UploadBatchRunnable.CanBatch(task):
+                task, nextTasks = UploadBatchRunnable.CollectBatch(
+                    task, self.uploadsQueue)
+            if isinstance(task, UploadBatchRunnable):
+                runnables = task.runnables
+            else:
+                runnables = [task]
+            for runnable in runnables:
+                if runnable.prepared:
+                    # Let a hashing worker prepare another upload:
+                    self.hashedUploadSlots.release()
             try:
                 task.Run()
             except ValueError as err:
@@ -589,6 +657,44 @@ class FoldersController(object):
                 self.uploadsQueue.task_done()
                 return
 
+    def HashingWorker(self):
+        """
+        One worker per thread.
+        Hashing workers prepare uploads (calculating their MD5 checksums)
+        and add them to the uploads queue, so that files can be hashed
+        while other files are being uploaded.
+        """
+        while True:
+            # Wait until fewer than the maximum number of hashed uploads
+            # are waiting for upload workers:
+            self.hashedUploadSlots.acquire()
+            if self.IsShuttingDown():
+                return
+            task = self.hashingQueue.get()
+            if task is None:
+                return
+            try:
+                if task.Prepare():
+                    self.uploadsQueue.put(task)
+                else:
+                    self.hashedUploadSlots.release()
+            except:
+                # Fail this upload, rather than stopping the hashing worker
+                # (and leaking its slot), so the remaining uploads continue:
+                logger.error(traceback.format_exc())
+                if task.uploadModel:
+                    uploadsModel = DATAVIEW_MODELS['uploads']
+                    uploadsModel.SetMessage(
+                        task.uploadModel, "Failed to prepare upload.")
+                    uploadsModel.SetStatus(
+                        task.uploadModel, UploadStatus.FAILED)
+                self.hashedUploadSlots.release()
+                PostEvent(
+                    MYDATA_EVENTS.UploadFailedEvent(
+                        folderModel=task.folderModel,
+                        dataFileIndex=task.dataFileIndex,
+                        uploadModel=task.uploadModel))
+
     def VerificationWorker(self):
         # Could be moved to verifications controller
         """
@@ -645,8 +751,15 @@ class FoldersController(object):
         numVerificationsCompleted = \
             DATAVIEW_MODELS['verifications'].GetCompletedCount()
 
+        # Uploads are added to the Uploads view when they are prepared,
+        # which happens before they are added to the uploads queue if
+        # hashing workers are enabled:
+        if self.numHashingWorkerThreads > 0:
+            queuedUploads = self.hashingQueue.qsize()
+        else:
+            queuedUploads = self.uploadsQueue.qsize()
         uploadsToBePerformed = DATAVIEW_MODELS['uploads'].GetRowCount() + \
-            self.uploadsQueue.qsize()
+            queuedUploads
 
         uploadsCompleted = DATAVIEW_MODELS['uploads'].GetCompletedCount()
         uploadsFailed = DATAVIEW_MODELS['uploads'].GetFailedCount()
@@ -710,8 +823,10 @@ class FoldersController(object):
         self.SetShuttingDown(True)
         app = wx.GetApp()
         if SETTINGS.miscellaneous.cacheDataFileLookups:
-            threading.Thread(
-                target=SETTINGS.SaveVerifiedDatafilesCache).start()
+            SETTINGS.CloseVerifiedDatafilesCache()
+        SETTINGS.CloseLookupCache()
+        SETTINGS.CloseChecksumCache()
+        SETTINGS.CloseScanManifest()
         # Reset self.started so that scheduled tasks know that's OK to start
         # new scan-and-upload tasks:
         self.started = False
@@ -747,6 +862,14 @@ class FoldersController(object):
         else:
             self.canceled = True
             DATAVIEW_MODELS['uploads'].CancelRemaining()
+        logger.debug("Shutting down FoldersController hashing worker "
+                     "threads.")
+        for _ in range(self.numHashingWorkerThreads):
+            self.hashingQueue.put(None)
+            # Wake up any hashing workers waiting for the upload workers:
+            self.hashedUploadSlots.release()
+        for thread in self.hashingWorkerThreads:
+            thread.join()
         logger.debug("Shutting down FoldersController upload worker threads.")
         for _ in range(self.numUploadWorkerThreads):
             self.uploadsQueue.put(None)
@@ -759,6 +882,8 @@ class FoldersController(object):
             CleanUpScpAndSshProcesses()
         for thread in self.uploadWorkerThreads:
             thread.join()
+        if self.uploadMethod == UploadMethod.VIA_STAGING:
+            SFTP_POOL.CloseAll()
         logger.debug("Shutting down FoldersController verification "
                      "worker threads.")
         for _ in range(self.numVerificationWorkerThreads):
@@ -769,6 +894,7 @@ class FoldersController(object):
         logger.debug("Joining remaining threads...")
         MYDATA_THREADS.Join()
         logger.debug("Joined remaining threads.")
+        MYTARDIS_API.Close()
 
         if FLAGS.testRunRunning:
             LogTestRunSummary()
@@ -833,15 +959,273 @@ class FoldersController(object):
             sys.stdout.write("%s\n" % message)
             app.ShutDownCleanlyAndExit(event, confirm=False)
 
+    def AddWatchedFile(self, dataFilePath):
+        """
+        Queue a lookup (and upload if necessary) for a new file detected by
+        MyData's watch mode (see WatchController).
+
+        This is only possible while scans and uploads are in progress and
+        the file belongs to a dataset folder whose existing files have
+        already been counted.  Otherwise, False is returned, and the file
+        will be found by the next scan.
+        """
+        if not self.started or self.IsShuttingDown() or \
+                self.completed or self.canceled or self.failed or \
+                FLAGS.testRunRunning:
+            return False
+        folderModel = DATAVIEW_MODELS['folders'].FindFolderForFile(
+            dataFilePath)
+        if not folderModel or not folderModel.datasetModel:
+            return False
+        with LOCKS.finishedCounting:
+            finishedCounting = \
+                self.finishedCountingVerifications.get(folderModel)
+            if not finishedCounting or not finishedCounting.isSet():
+                return False
+        dataFileIndex = folderModel.AddWatchedFile(dataFilePath)
+        if dataFileIndex is None:
+            # Ignored by the includes or excludes file, or already found:
+            return True
+        logger.debug("Found new file in folder %s: %s"
+                     % (folderModel.folderName, dataFilePath))
+        with LOCKS.numVerificationsToBePerformed:
+            self.numVerificationsToBePerformed += 1
+        DATAVIEW_MODELS['folders'].FolderStatusUpdated(
+            folderModel, delay=True)
+        self.verificationsQueue.put(
+            VerifyDatafileRunnable(folderModel, dataFileIndex))
+        return True
+
+    @staticmethod
+    def DataFileBatches(folderModel):
+        """
+        Yield lists of the folder's DataFile indices to verify.
+
+        If the folder has already been scanned, all of its files are
+        yielded in one batch.  Otherwise, the folder is scanned here and
+        its files are yielded in batches of STREAMING_BATCH_SIZE as they
+        are found, with a final batch when the scan is complete.
+        """
+        if folderModel.scanComplete.isSet():
+            yield range(0, folderModel.numFiles)
+            return
+        batch = []
+        for dataFileIndex in folderModel.ScanDataFiles():
+            batch.append(dataFileIndex)
+            if len(batch) == STREAMING_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def HandleUnchangedFolder(folderModel):
+        """
+        If the folder hasn't changed since all of its files were last found
+        to be verified in its dataset on MyTardis, mark all of its files as
+        uploaded, counting them as cache hits, and return True.  The
+        folder's dataset must already have been looked up.
+
+        The folder's fingerprint is compared with the fingerprint recorded
+        in the scan manifest for the folder's dataset first, so that a
+        folder which never changes can be marked as uploaded in one step,
+        without checking each of its files.
+
+        A dataset which was created in this session can't contain any of
+        the folder's files yet, so the manifest isn't checked for it.
+        """
+        if not folderModel.scanComplete.isSet() or \
+                folderModel.numFiles == 0 or \
+                not folderModel.datasetModel or \
+                folderModel.datasetModel.newlyCreated:
+            return False
+        try:
+            fingerprintMatches = \
+                SETTINGS.scanManifest.GetFingerprint(
+                    folderModel.GetAbsPath(),
+                    folderModel.datasetModel.datasetId) == \
+                folderModel.GetFingerprint()
+        except:
+            logger.debug(traceback.format_exc())
+            fingerprintMatches = False
+        if fingerprintMatches:
+            DATAVIEW_MODELS['verifications'].IncrementCacheHits(
+                folderModel.numFiles)
+            folderModel.SetDataFilesUploaded(range(0, folderModel.numFiles))
+            DATAVIEW_MODELS['folders'].FolderStatusUpdated(
+                folderModel, delay=True)
+            return True
+        return bool(FoldersController.HandleUnchangedDataFiles(
+            folderModel, range(0, folderModel.numFiles), allOrNothing=True))
+
+    @staticmethod
+    def HandleUnchangedDataFiles(folderModel, dataFileIndices,
+                                 allOrNothing=False):
+        """
+        Check the specified files against the scan manifest, and mark the
+        files which haven't changed since they were last found to be
+        verified in the folder's dataset on MyTardis as uploaded, counting
+        them as cache hits.
+
+        If allOrNothing is True, the files are only marked as uploaded if
+        none of them have changed.
+
+        Returns the set of unchanged DataFile indices which were marked
+        as uploaded.
+        """
+        if not folderModel.datasetModel or \
+                folderModel.datasetModel.newlyCreated:
+            return set()
+        try:
+            unchangedDataFileIndices = set(
+                dataFileIndices[index] for index in
+                SETTINGS.scanManifest.FindUnchanged(
+                    folderModel.GetAbsPath(),
+                    folderModel.datasetModel.datasetId,
+                    folderModel.GetManifestEntries(dataFileIndices)))
+        except:
+            # If an unhandled exception occurs while reading the manifest,
+            # don't bail out - we can look up the files on MyTardis instead.
+            logger.debug(traceback.format_exc())
+            return set()
+        if allOrNothing and \
+                len(unchangedDataFileIndices) < len(dataFileIndices):
+            return set()
+        if unchangedDataFileIndices:
+            DATAVIEW_MODELS['verifications'].IncrementCacheHits(
+                len(unchangedDataFileIndices))
+            folderModel.SetDataFilesUploaded(unchangedDataFileIndices)
+            folderModel.CountVerifiedDataFiles(len(unchangedDataFileIndices))
+            DATAVIEW_MODELS['folders'].FolderStatusUpdated(
+                folderModel, delay=True)
+        return unchangedDataFileIndices
+
+    @staticmethod
+    def HandleCachedDataFiles(folderModel, dataFileIndices):
+        """
+        Check the specified files against the verified DataFiles cache
+        with one query, and mark the cache hits as uploaded, updating
+        the cache hit count and the folder's status once for the batch.
+
+        Returns the set of cached DataFile indices.
+        """
+        files = [(folderModel.GetDataFilePath(dfi),
+                  folderModel.GetDataFileSize(dfi),
+                  folderModel.GetDataFileMtime(dfi))
+                 for dfi in dataFileIndices]
+        try:
+            cachedDataFileIndices = set(
+                dataFileIndices[index] for index in
+                SETTINGS.verifiedDatafilesCache.FindCached(
+                    folderModel.datasetModel.datasetId, files))
+        except:
+            # If an unhandled exception occurs during the cache lookups,
+            # don't bail out - we can look them up on the MyTardis server.
+            logger.debug(traceback.format_exc())
+            return set()
+        if cachedDataFileIndices:
+            DATAVIEW_MODELS['verifications'].IncrementCacheHits(
+                len(cachedDataFileIndices))
+            folderModel.SetDataFilesUploaded(cachedDataFileIndices)
+            folderModel.CountVerifiedDataFiles(len(cachedDataFileIndices))
+            if SETTINGS.miscellaneous.incrementalScans:
+                SETTINGS.scanManifest.Record(
+                    folderModel.GetAbsPath(),
+                    folderModel.datasetModel.datasetId,
+                    folderModel.GetManifestEntries(
+                        sorted(cachedDataFileIndices)),
+                    VerificationStatus.FOUND_VERIFIED)
+            DATAVIEW_MODELS['folders'].FolderStatusUpdated(
+                folderModel, delay=True)
+        return cachedDataFileIndices
+
+    @staticmethod
+    def CreateLookupIndex(folderModel):
+        """
+        List all of the DataFiles in the folder's dataset with one paginated
+        query, so that they don't need to be looked up individually.
+
+        Returns None if the DataFiles couldn't be listed.
+        """
+        try:
+            lookupIndex = DataFileLookupIndex.CreateForDataset(
+                folderModel.datasetModel)
+            logger.debug(
+                "Found %s DataFile record(s) in dataset %s for folder %s"
+                % (lookupIndex.numDataFiles,
+                   folderModel.datasetModel.datasetId,
+                   folderModel.folderName))
+            return lookupIndex
+        except (requests.exceptions.RequestException, ValueError, KeyError,
+                TypeError):
+            # A malformed response (e.g. truncated JSON) shouldn't stop
+            # the verification worker:
+            logger.warning(
+                "Couldn't list DataFiles for folder %s, so they will "
+                "be looked up individually." % folderModel.folderName)
+            logger.debug(traceback.format_exc())
+            return None
+
     def VerifyDatafiles(self, folderModel):
         """
         Verify datafiles in the specified folder
+
+        If the folder's dataset was created during this session, it can't
+        contain any DataFiles yet, so rather than queueing lookups for the
+        verification workers, each file is classified as "not found" in
+        this thread, which queues its upload without querying MyTardis.
+
+        Files found in the verified DataFiles cache are handled in one
+        pass by HandleCachedDataFiles, so only cache misses are queued.
+
+        If incremental scans are enabled, files which haven't changed since
+        they were last found to be verified on MyTardis (according to the
+        scan manifest) aren't looked up again.
+
+        If the folder hasn't been scanned yet (see the stream_folder_scans
+        setting), it is scanned here, and its files' lookups are queued in
+        batches while the rest of the folder is still being scanned.
         """
-        for dfi in range(0, folderModel.numFiles):
+        newDataset = folderModel.datasetModel is not None and \
+            folderModel.datasetModel.newlyCreated
+        streaming = not folderModel.scanComplete.isSet()
+        lookupIndex = None
+        lookupIndexCreated = False
+        for dataFileIndices in self.DataFileBatches(folderModel):
             if self.IsShuttingDown():
                 return
-            verifyDatafileRunnable = VerifyDatafileRunnable(folderModel, dfi)
-            if wx.PyApp.IsMainLoopRunning():
-                self.verificationsQueue.put(verifyDatafileRunnable)
-            else:
-                verifyDatafileRunnable.Run()
+            if streaming:
+                with LOCKS.numVerificationsToBePerformed:
+                    self.numVerificationsToBePerformed += len(dataFileIndices)
+            if SETTINGS.miscellaneous.incrementalScans:
+                unchangedDataFileIndices = self.HandleUnchangedDataFiles(
+                    folderModel, dataFileIndices)
+                dataFileIndices = [dfi for dfi in dataFileIndices
+                                   if dfi not in unchangedDataFileIndices]
+            cachedDataFileIndices = set()
+            if SETTINGS.miscellaneous.cacheDataFileLookups and \
+                    folderModel.datasetModel and not newDataset and \
+                    dataFileIndices:
+                cachedDataFileIndices = self.HandleCachedDataFiles(
+                    folderModel, dataFileIndices)
+            if SETTINGS.miscellaneous.bulkDataFileLookups and \
+                    folderModel.datasetModel and not newDataset and \
+                    not lookupIndexCreated and \
+                    len(dataFileIndices) > len(cachedDataFileIndices):
+                lookupIndex = self.CreateLookupIndex(folderModel)
+                lookupIndexCreated = True
+            for dfi in dataFileIndices:
+                if self.IsShuttingDown():
+                    return
+                if dfi in cachedDataFileIndices:
+                    continue
+                verifyDatafileRunnable = VerifyDatafileRunnable(
+                    folderModel, dfi, lookupIndex)
+                if wx.PyApp.IsMainLoopRunning() and not newDataset:
+                    self.verificationsQueue.put(verifyDatafileRunnable)
+                else:
+                    verifyDatafileRunnable.Run()
+        if streaming:
+            # The folder's files may have all been found to be verified
+            # before the folder's scan was complete:
+            folderModel.CountVerifiedDataFiles(0)
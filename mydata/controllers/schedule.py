@@ -61,6 +61,9 @@ class ScheduleController(object):
         the Schedule tab of the Settings dialog.
         """
         logger.debug("runManually: %s" % str(runManually))
+        app = wx.GetApp()
+        if hasattr(app, "watchController"):
+            app.watchController.ApplySettings()
         scheduleType = SETTINGS.schedule.scheduleType
         logger.debug("Schedule Type: %s" % scheduleType)
         if scheduleType == "On Startup" and \
@@ -164,6 +167,25 @@ class ScheduleController(object):
         ScheduleController.CreateTask(
             event, needToValidateSettings, startTime, scheduleType, msg)
 
+    @staticmethod
+    def CreateWatchTask():
+        """
+        Create a task to run when MyData's watch mode detects new files
+        which can't be added to a scan which is already in progress
+        (see WatchController).
+        """
+        scheduleType = "Watch"
+        logger.debug("Creating task for new files found by watch mode.")
+        startTime = datetime.now() + timedelta(seconds=1)
+        timeString = startTime.strftime("%I:%M %p")
+        dateString = \
+            "{d:%A} {d.day}/{d.month}/{d.year}".format(d=startTime)
+        msg = ("The \"%s\" task is scheduled "
+               "to run at %s on %s (new files found)"
+               % (JOB_DESC, timeString, dateString))
+        ScheduleController.CreateTask(
+            None, False, startTime, scheduleType, msg)
+
     @staticmethod
     def CreateOnceTask(event, needToValidateSettings):
         """
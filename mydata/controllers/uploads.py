@@ -2,19 +2,23 @@
 The main controller class for managing datafile uploads.
 """
 import os
-# urllib2 is not available in Python 3, but it is only used
-# for poster which can be replaced by requests-toolbelt:
-import urllib2
+import hashlib
 import json
 import traceback
 import mimetypes
 import threading
 from datetime import datetime
+from Queue import Empty
 
+from requests.exceptions import HTTPError
 import wx
 
 from ..utils.localcopy import CopyFile
+from ..utils.openssh import ResumeUploadFile
 from ..utils.openssh import UploadFile
+from ..utils.openssh import UploadFilesWithTar
+from ..utils.sftp import ResumeUploadFileWithSftp
+from ..utils.sftp import UploadFileWithSftp
 
 from ..settings import SETTINGS
 from ..dataviewmodels.dataview import DATAVIEW_MODELS
@@ -31,6 +35,12 @@ from ..events import MYDATA_EVENTS
 from ..events import PostEvent
 from ..logs import logger
 
+# When the batch_small_file_uploads setting is enabled, files uploaded via
+# staging which are no larger than this are uploaded in batches:
+BATCH_MAX_FILE_SIZE = 1024 * 1024
+BATCH_MAX_FILES = 100
+BATCH_MAX_BYTES = 64 * 1024 * 1024
+
 
 class UploadMethod(object):
     """
@@ -87,12 +97,64 @@ class UploadDatafileRunnable(object):
         self.verificationModel = verificationModel
         self.bytesUploadedPreviously = bytesUploadedPreviously
         self.mimeTypes = mimetypes.MimeTypes()
+        # Set by Prepare, if the upload is prepared by a hashing worker
+        # before an upload worker runs it:
+        self.prepared = False
+        self.dataFileDict = None
+        # Set if the DataFile record's MD5 checksum needs to be set after
+        # the file is uploaded (see HashWhileUploading):
+        self.md5SumPending = False
 
     def Run(self):
         """
         Upload the file specified by the folderModel and dataFileIndex
         using foldersController.uploadMethod
         """
+        foldersController = wx.GetApp().foldersController
+        uploadsModel = DATAVIEW_MODELS['uploads']
+        if not self.prepared:
+            self.Prepare()
+        dataFileDict = self.dataFileDict
+        if dataFileDict is None:
+            return
+
+        message = "Uploading..."
+        uploadsModel.SetMessage(self.uploadModel, message)
+        self.uploadModel.startTime = datetime.now()
+
+        try:
+            if foldersController.uploadMethod == UploadMethod.HTTP_POST:
+                self.UploadFileWithPost(dataFileDict)
+            elif foldersController.uploadMethod == UploadMethod.VIA_STAGING:
+                self.UploadFileToStaging(dataFileDict)
+            else:
+                self.CopyFileToStaging(dataFileDict)
+        except Exception as err:
+            logger.error(traceback.format_exc())
+            StopUploadsAsFailed(SafeStr(err), showError=True)
+            return
+
+    def Prepare(self):
+        """
+        Prepare the upload (see PrepareUpload), which can be done by a
+        hashing worker, so that the file's MD5 checksum is calculated
+        while other files are being uploaded.  Returns True if the file
+        should still be uploaded.
+        """
+        self.dataFileDict = self.PrepareUpload()
+        self.prepared = True
+        if self.dataFileDict is not None and self.uploadModel:
+            DATAVIEW_MODELS['uploads'].SetMessage(
+                self.uploadModel, "Waiting to upload...")
+        return self.dataFileDict is not None
+
+    def PrepareUpload(self):
+        """
+        Add the upload to the Uploads view, check that the file can still
+        be uploaded and calculate its MD5 checksum, returning the
+        dictionary of DataFile attributes to upload the file with, or None
+        if the file shouldn't be uploaded.
+        """
         # pylint: disable=too-many-statements
         # pylint: disable=too-many-branches
         foldersController = wx.GetApp().foldersController
@@ -110,9 +172,18 @@ class UploadDatafileRunnable(object):
 
         dataFilePath = self.folderModel.GetDataFilePath(self.dataFileIndex)
 
-        if not os.path.exists(dataFilePath) or \
+        # The file's size and timestamps were recorded when its folder was
+        # scanned, so we check them again just before uploading the file:
+        try:
+            if self.folderModel.RefreshDataFileStat(self.dataFileIndex):
+                logger.debug("%s has been modified since it was scanned."
+                             % dataFilePath)
+            fileExists = True
+        except OSError:
+            fileExists = False
+        if not fileExists or \
                 self.folderModel.FileIsTooNewToUpload(self.dataFileIndex):
-            if not os.path.exists(dataFilePath):
+            if not fileExists:
                 message = ("Not uploading file, because it has been "
                            "moved, renamed or deleted.")
             else:
@@ -145,6 +216,16 @@ class UploadDatafileRunnable(object):
             if SETTINGS.miscellaneous.fakeMd5Sum:
                 dataFileMd5Sum = MiscellaneousSettingsModel.GetFakeMd5Sum()
                 logger.warning("Faking MD5 sum for %s" % dataFilePath)
+            elif self.HashWhileUploading():
+                dataFileMd5Sum = \
+                    self.folderModel.GetCachedMd5Sum(self.dataFileIndex)
+                if not dataFileMd5Sum:
+                    # The DataFile record is created with a placeholder
+                    # checksum, which is replaced once the file has been
+                    # uploaded:
+                    dataFileMd5Sum = \
+                        MiscellaneousSettingsModel.GetFakeMd5Sum()
+                    self.md5SumPending = True
             else:
                 dataFileMd5Sum = \
                     self.folderModel.CalculateMd5Sum(
@@ -160,6 +241,13 @@ class UploadDatafileRunnable(object):
                 return
         else:
             dataFileSize = int(self.existingUnverifiedDatafile.size)
+            if self.existingUnverifiedDatafile.md5sum == \
+                    MiscellaneousSettingsModel.GetFakeMd5Sum() and \
+                    not SETTINGS.miscellaneous.fakeMd5Sum:
+                # The DataFile record still has the placeholder checksum
+                # from an interrupted upload which was calculating the
+                # file's checksum while uploading it:
+                self.md5SumPending = True
 
         self.uploadModel.SetProgress(0)
         uploadsModel.UploadProgressUpdated(self.uploadModel)
@@ -202,22 +290,47 @@ class UploadDatafileRunnable(object):
                 return
         else:
             dataFileDict = self.existingUnverifiedDatafile.json
+        return dataFileDict
 
-        message = "Uploading..."
-        uploadsModel.SetMessage(self.uploadModel, message)
-        self.uploadModel.startTime = datetime.now()
+    def HashWhileUploading(self):
+        """
+        Return True if the file's MD5 checksum should be calculated while
+        it is being uploaded to staging (see the hash_while_uploading
+        setting), rather than before its DataFile record is created.
 
-        try:
-            if foldersController.uploadMethod == UploadMethod.HTTP_POST:
-                self.UploadFileWithPost(dataFileDict)
-            elif foldersController.uploadMethod == UploadMethod.VIA_STAGING:
-                self.UploadFileToStaging(dataFileDict)
-            else:
-                self.CopyFileToStaging(dataFileDict)
-        except Exception as err:
-            logger.error(traceback.format_exc())
-            StopUploadsAsFailed(SafeStr(err), showError=True)
-            return
+        Only MyData's built-in SFTP client can do this.  Files uploaded in
+        tar batches or via HTTP POST are still hashed before uploading,
+        because their checksums are needed before the upload begins.
+        """
+        foldersController = wx.GetApp().foldersController
+        return SETTINGS.miscellaneous.hashWhileUploading and \
+            SETTINGS.miscellaneous.sftpUploads and \
+            foldersController.uploadMethod == UploadMethod.VIA_STAGING and \
+            not self.existingUnverifiedDatafile and \
+            not (SETTINGS.miscellaneous.batchSmallFileUploads and
+                 UploadBatchRunnable.CanBatch(self))
+
+    def SetPendingMd5Sum(self, datafileId, checksumKey=None, md5=None):
+        """
+        Replace the placeholder MD5 checksum in an uploaded file's DataFile
+        record, using the checksum calculated while uploading the file if
+        md5 (a hashlib.md5 object) is supplied, or otherwise calculating
+        it now.  Returns False if the calculation is canceled.
+
+        :raises requests.exceptions.HTTPError:
+        """
+        if md5:
+            md5sum = md5.hexdigest()
+            self.folderModel.CacheMd5Sum(
+                self.dataFileIndex, checksumKey, md5sum)
+        else:
+            md5sum = self.folderModel.CalculateMd5Sum(
+                self.dataFileIndex, canceledCallback=self.CanceledCallback)
+            if not md5sum:
+                return False
+        DataFileModel.SetMd5Sum(datafileId, md5sum)
+        self.md5SumPending = False
+        return True
 
     def CanceledCallback(self):
         """
@@ -288,18 +401,10 @@ class UploadDatafileRunnable(object):
         significant server memory during deserialization.
         """
         dataFilePath = self.folderModel.GetDataFilePath(self.dataFileIndex)
-
-        def PosterCallback(param, current, total):
-            """
-            Callback for progress updates from POST uploads
-            """
-            # pylint: disable=unused-argument
-            self.ProgressCallback(current, total)
-
         try:
             _ = DataFileModel.UploadDataFileWithPost(
                 dataFilePath, dataFileDict,
-                self.uploadModel, PosterCallback)
+                self.uploadModel, self.ProgressCallback)
             self.FinalizeUpload(uploadSuccess=True)
             return
         except ValueError as err:
@@ -314,10 +419,10 @@ class UploadDatafileRunnable(object):
                 logger.error(traceback.format_exc())
                 StopUploadsAsFailed(SafeStr(err), showError=True)
             return
-        except urllib2.HTTPError as err:
+        except HTTPError as err:
             self.uploadModel.traceback = traceback.format_exc()
             logger.error(traceback.format_exc())
-            errorResponse = err.read()
+            errorResponse = err.response.text
             logger.error(errorResponse)
             PostEvent(MYDATA_EVENTS.ShutdownUploadsEvent(failed=True))
             message = "An error occured while trying to POST data to " \
@@ -329,7 +434,7 @@ class UploadDatafileRunnable(object):
                     % json.loads(errorResponse)['error_message']
             except:
                 message += SafeStr(err)
-            if err.code == 409:
+            if err.response.status_code == 409:
                 message += \
                     "\n\nA Duplicate Key error occurred, suggesting that " \
                     "multiple MyData instances could be trying to create " \
@@ -390,14 +495,47 @@ class UploadDatafileRunnable(object):
             remoteFilePath = tempUrl
             dataFileId = response.headers['Location'].split('/')[-2]
             self.uploadModel.dataFileId = dataFileId
+        if SETTINGS.miscellaneous.sftpUploads:
+            uploadFile = UploadFileWithSftp
+            resumeUploadFile = ResumeUploadFileWithSftp
+        else:
+            uploadFile = UploadFile
+            resumeUploadFile = ResumeUploadFile
+        bytesUploadedPreviously = self.GetResumableByteCount(dataFileSize)
+        md5 = None
+        checksumKey = None
+        if self.md5SumPending:
+            checksumKey = self.folderModel.GetChecksumKey(self.dataFileIndex)
         while True:
             # Upload retries loop:
             try:
-                UploadFile(
+                if bytesUploadedPreviously:
+                    logger.debug(
+                        "Resuming upload of %s from byte %s"
+                        % (dataFilePath, bytesUploadedPreviously))
+                    resumed = resumeUploadFile(
+                        dataFilePath, dataFileSize, bytesUploadedPreviously,
+                        self.existingUnverifiedDatafile.md5sum, username,
+                        SETTINGS.uploaderModel.sshKeyPair.privateKeyFilePath,
+                        host, port, remoteFilePath, self.ProgressCallback,
+                        self.uploadModel)
+                    if resumed or self.uploadModel.canceled or \
+                            foldersController.IsShuttingDown():
+                        break
+                    logger.warning(
+                        "Couldn't resume upload of %s, so uploading the "
+                        "whole file again." % dataFilePath)
+                    bytesUploadedPreviously = 0
+                    self.uploadModel.SetProgress(0)
+                uploadKwargs = dict()
+                if self.md5SumPending and SETTINGS.miscellaneous.sftpUploads:
+                    md5 = hashlib.md5()
+                    uploadKwargs['md5'] = md5
+                uploadFile(
                     dataFilePath, dataFileSize, username,
                     SETTINGS.uploaderModel.sshKeyPair.privateKeyFilePath,
                     host, port, remoteFilePath, self.ProgressCallback,
-                    self.uploadModel)
+                    self.uploadModel, **uploadKwargs)
                 # Break out of upload retries loop.
                 break
             except SshException as err:
@@ -411,6 +549,9 @@ class UploadDatafileRunnable(object):
                     logger.warning(SafeStr(err))
                     self.uploadModel.retries += 1
                     logger.debug("Restarting upload for " + dataFilePath)
+                    # The staged bytes may not be usable if resuming the
+                    # upload failed, so the whole file is uploaded again:
+                    bytesUploadedPreviously = 0
                     self.uploadModel.SetProgress(0)
                     continue
                 else:
@@ -437,32 +578,38 @@ class UploadDatafileRunnable(object):
             else:
                 location = response.headers['location']
                 datafileId = location.split("/")[-2]
-            verificationDelay = SETTINGS.miscellaneous.verificationDelay
-
-            def RequestVerification():
-                """
-                Request verification via MyTardis API
-
-                POST-uploaded files are verified automatically by MyTardis, but
-                for staged files, we need to request verification after
-                uploading to staging.
-                """
-                DataFileModel.Verify(datafileId)
-            if wx.PyApp.IsMainLoopRunning() and \
-                    int(verificationDelay) > 0:
-                timer = threading.Timer(verificationDelay,
-                                        RequestVerification)
-                timer.start()
-                self.uploadModel.verificationTimer = timer
-            else:
-                # Don't use a timer if we are running
-                # unit tests:
-                RequestVerification()
+            if self.md5SumPending and \
+                    not self.SetPendingMd5Sum(datafileId, checksumKey, md5):
+                return
+            self.RequestVerification(datafileId)
         else:
             uploadSuccess = False
         self.FinalizeUpload(uploadSuccess)
         return
 
+    def GetResumableByteCount(self, dataFileSize):
+        """
+        Return the number of bytes of a partial upload to staging which
+        can be kept, so only the rest of the file needs to be uploaded, or
+        0 if the whole file needs to be uploaded.
+
+        The partial upload can only be resumed if the local file's size
+        still matches the size recorded in the existing DataFile record,
+        and the record's MD5 checksum is genuine, because it is used to
+        check the resumed upload before requesting verification.
+        """
+        if not self.existingUnverifiedDatafile or \
+                not self.bytesUploadedPreviously:
+            return 0
+        bytesUploadedPreviously = int(self.bytesUploadedPreviously)
+        md5sum = self.existingUnverifiedDatafile.md5sum
+        if bytesUploadedPreviously >= dataFileSize or \
+                dataFileSize != int(self.existingUnverifiedDatafile.size) or \
+                not md5sum or \
+                md5sum == MiscellaneousSettingsModel.GetFakeMd5Sum():
+            return 0
+        return bytesUploadedPreviously
+
     def CopyFileToStaging(self, dataFileDict):
         """
         Copy a file to staging (using local copy).
@@ -512,7 +659,7 @@ class UploadDatafileRunnable(object):
                      targetFilePath,
                      self.ProgressCallback,
                      self.uploadModel)
-        except IOError as err:
+        except (IOError, OSError) as err:
             if foldersController.IsShuttingDown() or \
                     self.uploadModel.canceled:
                 return
@@ -539,32 +686,35 @@ class UploadDatafileRunnable(object):
             else:
                 location = response.headers['location']
                 datafileId = location.split("/")[-2]
-            verificationDelay = SETTINGS.miscellaneous.verificationDelay
-
-            def RequestVerification():
-                """
-                Request verification via MyTardis API
-
-                POST-uploaded files are verified automatically by MyTardis, but
-                for staged files, we need to request verification after
-                uploading to staging.
-                """
-                DataFileModel.Verify(datafileId)
-            if wx.PyApp.IsMainLoopRunning() and \
-                    int(verificationDelay) > 0:
-                timer = threading.Timer(verificationDelay,
-                                        RequestVerification)
-                timer.start()
-                self.uploadModel.verificationTimer = timer
-            else:
-                # Don't use a timer if we are running
-                # unit tests:
-                RequestVerification()
+            if self.md5SumPending and \
+                    not self.SetPendingMd5Sum(datafileId):
+                return
+            self.RequestVerification(datafileId)
         else:
             uploadSuccess = False
         self.FinalizeUpload(uploadSuccess)
         return
 
+    def RequestVerification(self, datafileId):
+        """
+        Request verification via MyTardis API
+
+        POST-uploaded files are verified automatically by MyTardis, but
+        for staged files, we need to request verification after
+        uploading to staging.
+        """
+        verificationDelay = SETTINGS.miscellaneous.verificationDelay
+        if wx.PyApp.IsMainLoopRunning() and \
+                int(verificationDelay) > 0:
+            timer = threading.Timer(verificationDelay,
+                                    DataFileModel.Verify, args=[datafileId])
+            timer.start()
+            self.uploadModel.verificationTimer = timer
+        else:
+            # Don't use a timer if we are running
+            # unit tests:
+            DataFileModel.Verify(datafileId)
+
     def FinalizeUpload(self, uploadSuccess, message=None):
         """
         Finalize upload
@@ -612,3 +762,203 @@ class UploadDatafileRunnable(object):
                 self.uploadModel.bufferedReader.close()
             except:
                 logger.error(traceback.format_exc())
+
+
+class UploadBatchRunnable(object):
+    """
+    Uploads a batch of small files from one dataset folder to staging,
+    streaming them through a single tar archive over one SSH connection,
+    rather than running ssh mkdir, scp and ssh chmod for each file.
+
+    Each file still has its own row in the Uploads view, its own DataFile
+    record and its own verification request.
+    """
+    def __init__(self, runnables):
+        self.runnables = runnables
+
+    @staticmethod
+    def CanBatch(task):
+        """
+        Return True if the upload task can be included in a batch
+        """
+        return isinstance(task, UploadDatafileRunnable) and \
+            not task.existingUnverifiedDatafile and \
+            task.folderModel.GetDataFileSize(task.dataFileIndex) <= \
+            BATCH_MAX_FILE_SIZE
+
+    @staticmethod
+    def CollectBatch(task, uploadsQueue):
+        """
+        Collect the queued upload tasks for small files in the same folder
+        as task which immediately follow it in the queue, returning a
+        (batch, nextTasks) tuple, where batch is an UploadBatchRunnable
+        for them, or task itself if there are no such tasks.
+
+        nextTasks is a list containing the first queued task which
+        couldn't be added to the batch (which is None if the upload
+        workers are being shut down), or an empty list.  Rather than being
+        put back at the tail of the queue, that task is run next by the
+        same upload worker, so tasks are still run in queue order.
+        """
+        runnables = [task]
+        batchBytes = task.folderModel.GetDataFileSize(task.dataFileIndex)
+        nextTasks = []
+        while len(runnables) < BATCH_MAX_FILES and \
+                batchBytes < BATCH_MAX_BYTES:
+            try:
+                otherTask = uploadsQueue.get_nowait()
+            except Empty:
+                break
+            if otherTask is not None and \
+                    UploadBatchRunnable.CanBatch(otherTask) and \
+                    otherTask.folderModel == task.folderModel:
+                runnables.append(otherTask)
+                batchBytes += otherTask.folderModel.GetDataFileSize(
+                    otherTask.dataFileIndex)
+            else:
+                nextTasks.append(otherTask)
+                break
+        if len(runnables) == 1:
+            return task, nextTasks
+        return UploadBatchRunnable(runnables), nextTasks
+
+    def Run(self):
+        """
+        Upload the batch of files
+        """
+        foldersController = wx.GetApp().foldersController
+        uploadsModel = DATAVIEW_MODELS['uploads']
+        uploadToStagingRequest = SETTINGS.uploaderModel.uploadToStagingRequest
+        try:
+            host = uploadToStagingRequest.scpHostname
+            port = uploadToStagingRequest.scpPort
+            username = uploadToStagingRequest.scpUsername
+        except StorageBoxAttributeNotFound as err:
+            StopUploadsAsFailed(SafeStr(err), showError=True)
+            return
+        files = []
+        try:
+            for runnable in self.runnables:
+                if foldersController.IsShuttingDown():
+                    return
+                if not runnable.prepared:
+                    runnable.Prepare()
+                dataFileDict = runnable.dataFileDict
+                if dataFileDict is None:
+                    continue
+                uploadModel = runnable.uploadModel
+                uploadsModel.SetMessage(uploadModel, "Uploading...")
+                uploadModel.startTime = datetime.now()
+                response = DataFileModel.CreateDataFileForStagingUpload(
+                    AddUploaderInfo(dataFileDict))
+                response.raise_for_status()
+                uploadModel.dataFileId = \
+                    response.headers['Location'].split('/')[-2]
+                # The temporary location to upload the file to:
+                remoteFilePath = response.text
+                files.append(
+                    (runnable.folderModel.GetDataFilePath(
+                        runnable.dataFileIndex),
+                     dataFileDict['size'], remoteFilePath,
+                     runnable.ProgressCallback, uploadModel))
+            if not files:
+                return
+            logger.debug(
+                "Uploading a batch of %d files from %s"
+                % (len(files), self.runnables[0].folderModel.folderName))
+            try:
+                uploaded = self.UploadBatch(files, username, host, port)
+            except Exception as err:
+                logger.warning(
+                    "Couldn't upload a batch of %d files from %s, so "
+                    "uploading them one at a time: %s"
+                    % (len(files), self.runnables[0].folderModel.folderName,
+                       SafeStr(err)))
+                logger.debug(traceback.format_exc())
+                uploaded = self.UploadFilesIndividually(
+                    files, username, host, port)
+            if not uploaded:
+                return
+        except Exception as err:
+            logger.error(traceback.format_exc())
+            StopUploadsAsFailed(SafeStr(err), showError=True)
+            return
+        for runnable in self.runnables:
+            uploadModel = runnable.uploadModel
+            if not uploadModel or uploadModel.dataFileId is None or \
+                    uploadModel.canceled:
+                continue
+            dataFileSize = runnable.folderModel.GetDataFileSize(
+                runnable.dataFileIndex)
+            uploadSuccess = \
+                uploadModel.bytesUploaded == dataFileSize and \
+                uploadModel.status != UploadStatus.CANCELED and \
+                uploadModel.status != UploadStatus.FAILED
+            if uploadSuccess:
+                runnable.RequestVerification(uploadModel.dataFileId)
+            runnable.FinalizeUpload(uploadSuccess)
+
+    def UploadBatch(self, files, username, host, port):
+        """
+        Upload the batch's files, retrying (up to the maximum number of
+        upload retries) if the upload fails.  Returns False if uploads are
+        being shut down.
+        """
+        foldersController = wx.GetApp().foldersController
+        privateKeyFilePath = \
+            SETTINGS.uploaderModel.sshKeyPair.privateKeyFilePath
+        retries = 0
+        while True:
+            try:
+                UploadFilesWithTar(
+                    files, username, privateKeyFilePath, host, port)
+                return True
+            except SshException as err:
+                if foldersController.IsShuttingDown():
+                    return False
+                if retries >= SETTINGS.advanced.maxUploadRetries:
+                    raise
+                logger.warning(SafeStr(err))
+                retries += 1
+                logger.debug("Restarting batch upload from %s"
+                             % self.runnables[0].folderModel.folderName)
+                for runnable in self.runnables:
+                    if runnable.uploadModel:
+                        runnable.uploadModel.retries += 1
+                        runnable.uploadModel.SetProgress(0)
+
+    @staticmethod
+    def UploadFilesIndividually(files, username, host, port):
+        """
+        Upload the batch's files one at a time, after uploading them in a
+        tar batch has failed.  A file which still can't be uploaded is
+        marked as failed, without stopping the other uploads.  Returns
+        False if uploads are being shut down.
+        """
+        foldersController = wx.GetApp().foldersController
+        uploadsModel = DATAVIEW_MODELS['uploads']
+        privateKeyFilePath = \
+            SETTINGS.uploaderModel.sshKeyPair.privateKeyFilePath
+        if SETTINGS.miscellaneous.sftpUploads:
+            uploadFile = UploadFileWithSftp
+        else:
+            uploadFile = UploadFile
+        for dataFilePath, dataFileSize, remoteFilePath, progressCallback, \
+                uploadModel in files:
+            if foldersController.IsShuttingDown():
+                return False
+            if uploadModel.canceled:
+                continue
+            uploadModel.SetBytesUploaded(0)
+            uploadModel.SetProgress(0)
+            try:
+                uploadFile(
+                    dataFilePath, dataFileSize, username, privateKeyFilePath,
+                    host, port, remoteFilePath, progressCallback, uploadModel)
+            except SshException as err:
+                if foldersController.IsShuttingDown():
+                    return False
+                uploadModel.traceback = traceback.format_exc()
+                logger.error(SafeStr(err))
+                uploadsModel.SetStatus(uploadModel, UploadStatus.FAILED)
+        return True
@@ -48,10 +48,13 @@ class VerifyDatafileRunnable(object):
     verified, and if not, whether they have been completely or
     partially uploaded.
     """
-    def __init__(self, folderModel, dataFileIndex):
+    def __init__(self, folderModel, dataFileIndex, lookupIndex=None):
         self.folderModel = folderModel
         self.dataFileIndex = dataFileIndex
         self.verificationModel = None
+        # If a DataFileLookupIndex is supplied, DataFile records are
+        # looked up in it, instead of querying MyTardis once per file:
+        self.lookupIndex = lookupIndex
 
     def Run(self):
         """
@@ -72,24 +75,6 @@ class VerifyDatafileRunnable(object):
 
         dataset = self.folderModel.datasetModel
 
-        try:
-            if dataset:  # test runs don't create required datasets
-                cacheKey = \
-                    "%s,%s" % (dataset.datasetId, dataFilePath.encode('utf8'))
-            else:
-                cacheKey = None
-            if SETTINGS.miscellaneous.cacheDataFileLookups and \
-                    cacheKey in SETTINGS.verifiedDatafilesCache:
-                verificationsModel.IncrementCacheHits()
-                self.folderModel.SetDataFileUploaded(self.dataFileIndex, True)
-                DATAVIEW_MODELS['folders'].FolderStatusUpdated(
-                    self.folderModel, delay=True)
-                return
-        except:
-            # If an unhandled exception occurs during a cache lookup,
-            # don't bail out - we can look it up on the MyTardis server instead.
-            logger.debug(traceback.format_exc())
-
         with LOCKS.addVerification:
             verificationDataViewId = \
                 verificationsModel.GetMaxDataViewId() + 1
@@ -99,7 +84,10 @@ class VerifyDatafileRunnable(object):
                                   dataFileIndex=self.dataFileIndex)
             verificationsModel.AddRow(self.verificationModel)
 
-        if not dataset:  # test runs don't create required datasets
+        if not dataset or dataset.newlyCreated:
+            # Test runs don't create required datasets, and a dataset
+            # created during this session can't contain any DataFiles,
+            # so there's no need to look up the file on MyTardis:
             self.HandleNonExistentDataFile()
             return
 
@@ -108,9 +96,13 @@ class VerifyDatafileRunnable(object):
                 "Looking for matching file on MyTardis server..."
             self.verificationModel.status = VerificationStatus.IN_PROGRESS
             verificationsModel.MessageUpdated(self.verificationModel)
-            existingDatafile = DataFileModel.GetDataFile(
-                dataset=dataset, filename=dataFileName,
-                directory=dataFileDirectory)
+            if self.lookupIndex:
+                existingDatafile = self.lookupIndex.GetDataFile(
+                    filename=dataFileName, directory=dataFileDirectory)
+            else:
+                existingDatafile = DataFileModel.GetDataFile(
+                    dataset=dataset, filename=dataFileName,
+                    directory=dataFileDirectory)
             self.verificationModel.message = \
                 "Found datafile on MyTardis server."
             verificationsModel.SetFoundVerified(self.verificationModel)
@@ -235,9 +227,23 @@ class VerifyDatafileRunnable(object):
         DATAVIEW_MODELS['folders'].FolderStatusUpdated(self.folderModel)
         if existingDatafile and not FLAGS.testRunRunning:
             if existingDatafile.md5sum == \
-                    MiscellaneousSettingsModel.GetFakeMd5Sum():
+                    MiscellaneousSettingsModel.GetFakeMd5Sum() and \
+                    SETTINGS.miscellaneous.fakeMd5Sum:
                 logger.warning("MD5(%s): %s" %
                                (dataFilePath, existingDatafile.md5sum))
+            elif existingDatafile.md5sum == \
+                    MiscellaneousSettingsModel.GetFakeMd5Sum():
+                # The file was uploaded by an upload which was calculating
+                # its checksum while uploading it, but which was interrupted
+                # before it could replace the placeholder checksum:
+                foldersController = wx.GetApp().foldersController
+                md5sum = self.folderModel.CalculateMd5Sum(
+                    self.dataFileIndex,
+                    canceledCallback=foldersController.IsShuttingDown)
+                if md5sum:
+                    datafileId = existingDatafile.datafileId
+                    DataFileModel.SetMd5Sum(datafileId, md5sum)
+                    DataFileModel.Verify(datafileId)
             else:
                 DataFileModel.Verify(existingDatafile.datafileId)
         verificationsModel.SetComplete(self.verificationModel)
@@ -252,7 +258,8 @@ class VerifyDatafileRunnable(object):
     def HandleIncompleteStagedUpload(self, existingDatafile,
                                      bytesUploadedPreviously):
         """
-        Re-upload file (resuming partial uploads is not supported).
+        Upload the rest of the file, resuming from the bytes already in
+        staging if possible (see UploadDatafileRunnable.UploadFileToStaging).
         """
         if wx.GetApp().foldersController.IsShuttingDown():
             return
@@ -263,7 +270,7 @@ class VerifyDatafileRunnable(object):
         verificationsModel.SetFoundUnverifiedNotFullSize(
             self.verificationModel)
         verificationsModel.MessageUpdated(self.verificationModel)
-        logger.debug("Re-uploading \"%s\" to staging, because "
+        logger.debug("Resuming upload of \"%s\" to staging, because "
                      "the file size is %s bytes in staging, "
                      "but it should be %s bytes."
                      % (dataFilePath, bytesUploadedPreviously,
@@ -327,12 +334,19 @@ class VerifyDatafileRunnable(object):
             return
         verificationsModel = DATAVIEW_MODELS['verifications']
         dataFilePath = self.folderModel.GetDataFilePath(self.dataFileIndex)
-        cacheKey = "%s,%s" % (self.folderModel.datasetModel.datasetId,
-                              dataFilePath.encode('utf8'))
         if SETTINGS.miscellaneous.cacheDataFileLookups:
-            with LOCKS.updateCache:
-                SETTINGS.verifiedDatafilesCache[cacheKey] = True
+            SETTINGS.verifiedDatafilesCache.Add(
+                self.folderModel.datasetModel.datasetId, dataFilePath,
+                self.folderModel.GetDataFileSize(self.dataFileIndex),
+                self.folderModel.GetDataFileMtime(self.dataFileIndex))
+        if SETTINGS.miscellaneous.incrementalScans:
+            SETTINGS.scanManifest.Record(
+                self.folderModel.GetAbsPath(),
+                self.folderModel.datasetModel.datasetId,
+                self.folderModel.GetManifestEntries([self.dataFileIndex]),
+                VerificationStatus.FOUND_VERIFIED)
         self.folderModel.SetDataFileUploaded(self.dataFileIndex, True)
+        self.folderModel.CountVerifiedDataFiles()
         DATAVIEW_MODELS['folders'].FolderStatusUpdated(self.folderModel)
         verificationsModel.SetComplete(self.verificationModel)
         PostEvent(MYDATA_EVENTS.FoundVerifiedDatafileEvent(
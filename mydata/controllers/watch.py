@@ -0,0 +1,219 @@
+"""
+Watch mode, which uses inotify (on Linux) to detect new files in MyData's
+data directory, so they can be uploaded as they are written, rather than
+waiting for the next scheduled scan.
+
+New files are reported when they are closed after writing or moved into
+the data directory.  Once a file has settled (i.e. it is old enough not to
+be skipped by the "Ignore files newer than" filter), it is handed to the
+FoldersController, which queues its lookup and upload if scans and uploads
+are in progress and the file belongs to a dataset folder found by the
+current scan.  Otherwise, a scan-and-upload task is started.  The
+scheduled scans still run as an occasional reconciliation pass, which
+will pick up any files which watch mode missed.
+"""
+import os
+import sys
+import threading
+import time
+import traceback
+
+import wx
+
+from ..settings import SETTINGS
+from ..logs import logger
+from ..utils import inotify
+from ..utils.scanning import walk
+
+# Files closed or moved in less than this many seconds ago may still be
+# in the process of being written (e.g. by an instrument which opens and
+# closes a file multiple times):
+DEFAULT_SETTLE_SECONDS = 5
+
+# After watch mode starts a scan-and-upload task, it won't start another
+# one for this many seconds:
+MIN_SECONDS_BETWEEN_SCANS = 30
+
+WATCH_MASK = inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO | inotify.IN_CREATE
+
+
+class WatchController(object):
+    """
+    Watches MyData's data directory for new files.
+    """
+    def __init__(self):
+        self.thread = None
+        self.stopRequested = threading.Event()
+        self.dataDirectory = None
+
+        # The following are only accessed by the watch thread:
+        self.inotify = None
+        self.watchedDirectories = dict()
+        # Paths of new files which haven't settled yet, with the times
+        # of their most recent events:
+        self.pendingFiles = dict()
+
+        # Set when a scan-and-upload task is required, e.g. for new files
+        # which couldn't be added to the current scan:
+        self.scanRequested = threading.Event()
+        # Only accessed by the main thread:
+        self.lastScanRequestTime = 0
+
+    def ApplySettings(self):
+        """
+        Start or stop watching the data directory, according to MyData's
+        settings.  Called whenever the schedule is applied.
+        """
+        dataDirectory = SETTINGS.general.dataDirectory
+        if not SETTINGS.miscellaneous.watchDataDirectory or \
+                not dataDirectory or not os.path.isdir(dataDirectory):
+            self.Stop()
+            return
+        if not inotify.IsAvailable():
+            logger.warning("Can't watch the data directory for new files, "
+                           "because inotify is not available.")
+            return
+        if self.IsRunning() and self.dataDirectory == dataDirectory:
+            return
+        self.Stop()
+        self.Start(dataDirectory)
+
+    def IsRunning(self):
+        """
+        Return True if the data directory is being watched
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def Start(self, dataDirectory):
+        """
+        Start watching dataDirectory in a dedicated thread
+        """
+        self.dataDirectory = dataDirectory
+        self.stopRequested.clear()
+        self.thread = threading.Thread(
+            target=self.Run, name="WatchDataDirectoryThread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def Stop(self):
+        """
+        Stop watching the data directory
+        """
+        if self.thread:
+            self.stopRequested.set()
+            self.thread.join()
+            self.thread = None
+
+    def Run(self):
+        """
+        Watch the data directory until Stop is called
+        """
+        logger.info("Watching %s for new files." % self.dataDirectory)
+        try:
+            self.inotify = inotify.Inotify()
+            self.watchedDirectories.clear()
+            self.pendingFiles.clear()
+            self.WatchDirectoryTree(self.dataDirectory, addFiles=False)
+            while not self.stopRequested.isSet():
+                for wd, mask, _, name in self.inotify.ReadEvents(timeout=1):
+                    try:
+                        self.HandleEvent(wd, mask, name)
+                    except:
+                        # Don't stop watching the data directory because
+                        # of one event, e.g. for an undecodable filename:
+                        logger.warning(
+                            "Couldn't handle event for %r in %r"
+                            % (name, self.watchedDirectories.get(wd)))
+                        logger.warning(traceback.format_exc())
+                settledFiles = self.GetSettledFiles()
+                if settledFiles or self.scanRequested.isSet():
+                    wx.CallAfter(self.HandleSettledFiles, settledFiles)
+        except:
+            logger.error(traceback.format_exc())
+        finally:
+            if self.inotify:
+                self.inotify.Close()
+                self.inotify = None
+            logger.info("Stopped watching %s for new files."
+                        % self.dataDirectory)
+
+    def WatchDirectoryTree(self, path, addFiles=True):
+        """
+        Watch a directory and its subdirectories.  If addFiles is True
+        (e.g. for a directory which was just created or moved into the
+        data directory), any files already within it are treated as new
+        files, because their events may have been missed.
+        """
+        for dirname, _, files in walk(path):
+            try:
+                wd = self.inotify.AddWatch(dirname, WATCH_MASK)
+            except OSError as err:
+                logger.warning("Couldn't watch %s: %s" % (dirname, err))
+                continue
+            self.watchedDirectories[wd] = dirname
+            if addFiles:
+                for filename in files:
+                    self.pendingFiles[os.path.join(dirname, filename)] = \
+                        time.time()
+
+    def HandleEvent(self, wd, mask, name):
+        """
+        Handle an inotify event
+        """
+        if mask & inotify.IN_Q_OVERFLOW:
+            # Some events were lost, so a full scan is required:
+            logger.warning("Too many new files to watch individually.")
+            self.scanRequested.set()
+            return
+        if mask & inotify.IN_IGNORED:
+            self.watchedDirectories.pop(wd, None)
+            return
+        dirname = self.watchedDirectories.get(wd)
+        if dirname is None or not name:
+            return
+        if isinstance(name, unicode) and not isinstance(dirname, unicode):
+            # Paths within a data directory whose path is a byte string
+            # are byte strings too, like the paths found by scanning it:
+            name = name.encode(sys.getfilesystemencoding() or 'utf8')
+        path = os.path.join(dirname, name)
+        if mask & inotify.IN_ISDIR:
+            if mask & (inotify.IN_CREATE | inotify.IN_MOVED_TO):
+                self.WatchDirectoryTree(path)
+        elif mask & (inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO):
+            self.pendingFiles[path] = time.time()
+
+    def GetSettledFiles(self):
+        """
+        Remove and return the paths of pending files which have settled
+        """
+        settleSeconds = DEFAULT_SETTLE_SECONDS
+        if SETTINGS.filters.ignoreNewFiles:
+            settleSeconds = max(
+                settleSeconds, SETTINGS.filters.ignoreNewFilesMinutes * 60)
+        now = time.time()
+        settledFiles = [path for path, eventTime in self.pendingFiles.items()
+                        if now - eventTime > settleSeconds]
+        for path in settledFiles:
+            del self.pendingFiles[path]
+        return sorted(settledFiles)
+
+    def HandleSettledFiles(self, settledFiles):
+        """
+        Queue lookups and uploads for settled files if possible, otherwise
+        start a scan-and-upload task (once any scans and uploads which are
+        already in progress have finished).
+
+        Runs in the main thread.
+        """
+        app = wx.GetApp()
+        for path in settledFiles:
+            if not os.path.isfile(path):
+                continue
+            if not app.foldersController.AddWatchedFile(path):
+                self.scanRequested.set()
+        if self.scanRequested.isSet() and not app.Processing() and \
+                time.time() - self.lastScanRequestTime > \
+                MIN_SECONDS_BETWEEN_SCANS:
+            self.scanRequested.clear()
+            self.lastScanRequestTime = time.time()
+            app.scheduleController.CreateWatchTask()
@@ -8,7 +8,7 @@ import os
 import sys
 import traceback
 from datetime import datetime
-from glob import glob
+from multiprocessing.pool import ThreadPool
 
 import wx
 
@@ -20,6 +20,8 @@ from ..logs import logger
 from ..utils.exceptions import InvalidFolderStructure
 from ..utils.exceptions import DoesNotExist
 from ..utils import Compare
+from ..utils.scanning import FileNames
+from ..utils.scanning import SubdirectoryNames
 from ..events import MYDATA_EVENTS
 from ..events import PostEvent
 from ..events.stop import RaiseExceptionIfUserAborted
@@ -60,6 +62,10 @@ class FoldersModel(MyDataDataViewModel):
         # event:
         self.foldersToUpdate = collections.deque()
 
+        # The thread pool used to scan folders concurrently, which only
+        # exists while ScanFolders is running:
+        self.scanPool = None
+
     def GetFolderRecord(self, row):
         """
         Return the folder model at a given row number (starting with row 0).
@@ -164,6 +170,10 @@ class FoldersModel(MyDataDataViewModel):
     def ScanFolders(self, writeProgressUpdateToStatusBar):
         """
         Scan dataset folders.
+
+        User folders and dataset folders are scanned concurrently by a
+        bounded pool of threads (see CreateFolderModels), but rows are
+        still added to the Folders view in a deterministic order.
         """
         if self.GetCount() > 0:
             self.DeleteAllRows()
@@ -176,38 +186,61 @@ class FoldersModel(MyDataDataViewModel):
         defaultOwner = SETTINGS.general.defaultOwner
         folderStructure = SETTINGS.advanced.folderStructure
         logger.debug("FoldersModel.ScanFolders(): Scanning " + dataDir + "...")
-        if folderStructure.startswith("Username") or \
-                folderStructure.startswith("Email"):
-            self.ScanForUserFolders(writeProgressUpdateToStatusBar)
-        elif folderStructure.startswith("User Group"):
-            self.ScanForGroupFolders(writeProgressUpdateToStatusBar)
-        elif folderStructure.startswith("Experiment"):
-            self.ScanForExperimentFolders(dataDir, defaultOwner,
-                                          defaultOwner.username)
-        elif folderStructure.startswith("Dataset"):
-            self.ScanForDatasetFolders(dataDir, defaultOwner,
-                                       defaultOwner.username)
+        self.scanPool = ThreadPool(
+            max(1, SETTINGS.miscellaneous.maxScanThreads))
+        try:
+            if folderStructure.startswith("Username") or \
+                    folderStructure.startswith("Email"):
+                self.ScanForUserFolders(writeProgressUpdateToStatusBar)
+            elif folderStructure.startswith("User Group"):
+                self.ScanForGroupFolders(writeProgressUpdateToStatusBar)
+            elif folderStructure.startswith("Experiment"):
+                self.ScanForExperimentFolders(dataDir, defaultOwner,
+                                              defaultOwner.username)
+            elif folderStructure.startswith("Dataset"):
+                self.ScanForDatasetFolders(dataDir, defaultOwner,
+                                           defaultOwner.username)
+            else:
+                raise InvalidFolderStructure("Unknown folder structure.")
+        except:
+            self.scanPool.terminate()
+            raise
         else:
-            raise InvalidFolderStructure("Unknown folder structure.")
+            self.scanPool.close()
+        finally:
+            self.scanPool.join()
+            self.scanPool = None
+
+    def CreateFolderModels(self, datasetFolders):
+        """
+        Create FolderModels for the DatasetFolder tuples in datasetFolders,
+        using the scan thread pool, so that multiple folders' files can be
+        listed concurrently.
+
+        The FolderModels are yielded in the same order as datasetFolders,
+        (skipping any folders which are too old or too new to upload), and
+        their dataViewIds are assigned as they are yielded.
+        """
+        for folderModel in self.scanPool.imap(CreateFolderModel,
+                                              datasetFolders):
+            if folderModel:
+                folderModel.dataViewId = self.GetMaxDataViewId() + 1
+                yield folderModel
 
     def ScanForUserFolders(self, writeProgressUpdateToStatusBar):
         """
         Scan for user folders.
+
+        The MyTardis user records for the user folders are looked up
+        concurrently, but the user folders are processed in order.
         """
         folderStructure = SETTINGS.advanced.folderStructure
         uploadInvalidUserOrGroupFolders = \
             SETTINGS.advanced.uploadInvalidUserOrGroupFolders
         numUserFoldersScanned = 0
-        for userFolderName in \
-                UserFolderNames(SETTINGS.general.dataDirectory):
-            RaiseExceptionIfUserAborted()
-            logger.debug(
-                "Found folder assumed to be %s: %s" % (UserFolderType(),
-                                                       userFolderName))
-            try:
-                userRecord = UserModel.GetUserForFolder(userFolderName)
-            except DoesNotExist:
-                userRecord = None
+        for userFolderName, userRecord in self.scanPool.imap(
+                GetUserForFolder,
+                UserFolderNames(SETTINGS.general.dataDirectory)):
             RaiseExceptionIfUserAborted()
             usersDataViewId = DATAVIEW_MODELS['users'].GetMaxDataViewId() + 1
             if not userRecord:
@@ -266,22 +299,20 @@ class FoldersModel(MyDataDataViewModel):
     def ScanForGroupFolders(self, writeProgressUpdateToStatusBar):
         """
         Scan for group folders.
+
+        The MyTardis group records for the group folders are looked up
+        concurrently, but the group folders are processed in order.
         """
         folderStructure = SETTINGS.advanced.folderStructure
         uploadInvalidUserOrGroupFolders = \
             SETTINGS.advanced.uploadInvalidUserOrGroupFolders
         numGroupFoldersScanned = 0
-        for groupFolderName in \
-                GroupFolderNames(SETTINGS.general.dataDirectory):
+        for groupFolderName, groupRecord in self.scanPool.imap(
+                GetGroupForFolder,
+                GroupFolderNames(SETTINGS.general.dataDirectory)):
             RaiseExceptionIfUserAborted()
-            logger.debug("Found folder assumed to be user group name: " +
-                         groupFolderName)
             groupsDataViewId = DATAVIEW_MODELS['groups'].GetMaxDataViewId() + 1
-            try:
-                groupName = SETTINGS.advanced.groupPrefix + groupFolderName
-                groupRecord = GroupModel.GetGroupByName(groupName)
-            except DoesNotExist:
-                groupRecord = None
+            if not groupRecord:
                 message = "Didn't find a MyTardis user group record for " \
                     "folder \"%s\" in %s" % (groupFolderName,
                                              SETTINGS.general.dataDirectory)
@@ -328,26 +359,14 @@ class FoldersModel(MyDataDataViewModel):
         """
         try:
             logger.debug("Scanning " + pathToScan + " for dataset folders...")
-            for datasetFolderName in DatasetFolderNames(pathToScan):
-                logger.debug("Found folder assumed to be dataset: " +
-                             datasetFolderName)
-                if SETTINGS.filters.ignoreOldDatasets and \
-                        DatasetIsTooOld(pathToScan, datasetFolderName):
-                    continue
-                if SETTINGS.filters.ignoreNewDatasets and \
-                        DatasetIsTooNew(pathToScan, datasetFolderName):
-                    continue
-                dataViewId = self.GetMaxDataViewId() + 1
-                folderModel = \
-                    FolderModel(dataViewId=dataViewId,
-                                folderName=datasetFolderName,
-                                location=pathToScan,
-                                userFolderName=userFolderName,
-                                groupFolderName=groupFolderName,
-                                owner=owner,
-                                group=groupRecord)
-                RaiseExceptionIfUserAborted()
-                folderModel.SetCreatedDate()
+            datasetFolders = [
+                DatasetFolder(
+                    location=pathToScan, folderName=datasetFolderName,
+                    userFolderName=userFolderName,
+                    groupFolderName=groupFolderName,
+                    owner=owner, group=groupRecord)
+                for datasetFolderName in DatasetFolderNames(pathToScan)]
+            for folderModel in self.CreateFolderModels(datasetFolders):
                 SetExperimentTitle(folderModel, owner, groupFolderName)
                 self.AddRow(folderModel)
         except:
@@ -366,57 +385,47 @@ class FoldersModel(MyDataDataViewModel):
         given access.
         """
         folderStructure = SETTINGS.advanced.folderStructure
-        for expFolderName in ExperimentFolderNames(pathToScan):
-            expFolderPath = os.path.join(pathToScan, expFolderName)
-            for datasetFolderName in DatasetFolderNames(expFolderPath):
-                if SETTINGS.filters.ignoreOldDatasets and \
-                        DatasetIsTooOld(expFolderPath, datasetFolderName):
-                    continue
-                if SETTINGS.filters.ignoreNewDatasets and \
-                        DatasetIsTooNew(expFolderPath, datasetFolderName):
-                    continue
-                dataViewId = self.GetMaxDataViewId() + 1
-                folderModel = \
-                    FolderModel(dataViewId=dataViewId,
-                                folderName=datasetFolderName,
-                                location=expFolderPath,
-                                userFolderName=userFolderName,
-                                groupFolderName=groupFolderName,
-                                owner=owner,
-                                group=groupRecord)
-                RaiseExceptionIfUserAborted()
-                if folderStructure.startswith("Username") or \
-                        folderStructure.startswith("Email") or \
-                        folderStructure.startswith("Experiment"):
-                    folderModel.experimentTitle = expFolderName
-                elif folderStructure.startswith("User Group / Experiment"):
-                    if groupRecord:
-                        groupName = groupRecord.shortName
-                    else:
-                        groupName = groupFolderName
-                    folderModel.experimentTitle = \
-                        "%s - %s" % (groupName, expFolderName)
+        expFolderNames = ExperimentFolderNames(pathToScan)
+        expFolderPaths = [os.path.join(pathToScan, expFolderName)
+                          for expFolderName in expFolderNames]
+        # List the experiment folders concurrently:
+        expFolderContents = self.scanPool.map(
+            ListExperimentFolder, expFolderPaths)
+        datasetFolders = []
+        for expFolderName, expFolderPath, contents in zip(
+                expFolderNames, expFolderPaths, expFolderContents):
+            datasetFolderNames, filesDepth1 = contents
+            if folderStructure.startswith("Username") or \
+                    folderStructure.startswith("Email") or \
+                    folderStructure.startswith("Experiment"):
+                experimentTitle = expFolderName
+            elif folderStructure.startswith("User Group / Experiment"):
+                if groupRecord:
+                    groupName = groupRecord.shortName
                 else:
-                    raise InvalidFolderStructure("Unknown folder structure.")
-                folderModel.SetCreatedDate()
-                self.AddRow(folderModel)
-            filesDepth1 = FilesInTopLevel(expFolderPath)
+                    groupName = groupFolderName
+                experimentTitle = "%s - %s" % (groupName, expFolderName)
+            else:
+                raise InvalidFolderStructure("Unknown folder structure.")
+            for datasetFolderName in datasetFolderNames:
+                datasetFolders.append(DatasetFolder(
+                    location=expFolderPath, folderName=datasetFolderName,
+                    userFolderName=userFolderName,
+                    groupFolderName=groupFolderName,
+                    owner=owner, group=groupRecord,
+                    experimentTitle=experimentTitle))
             if filesDepth1:
                 logger.info("Found %s experiment file(s) in %s\n"
                             % (len(filesDepth1), expFolderPath))
-                folderModel = \
-                    FolderModel(dataViewId=self.GetMaxDataViewId() + 1,
-                                folderName="__EXPERIMENT_FILES__",
-                                location=expFolderPath,
-                                userFolderName=userFolderName,
-                                groupFolderName=groupFolderName,
-                                owner=owner,
-                                group=groupRecord,
-                                isExperimentFilesFolder=True)
-                RaiseExceptionIfUserAborted()
-                folderModel.experimentTitle = expFolderName
-                folderModel.SetCreatedDate()
-                self.AddRow(folderModel)
+                datasetFolders.append(DatasetFolder(
+                    location=expFolderPath, folderName="__EXPERIMENT_FILES__",
+                    userFolderName=userFolderName,
+                    groupFolderName=groupFolderName,
+                    owner=owner, group=groupRecord,
+                    experimentTitle=expFolderName,
+                    isExperimentFilesFolder=True))
+        for folderModel in self.CreateFolderModels(datasetFolders):
+            self.AddRow(folderModel)
 
     def ImportGroupFolders(self, groupFolderPath, groupRecord):
         """
@@ -454,40 +463,53 @@ class FoldersModel(MyDataDataViewModel):
 
             logger.debug("Scanning " + instrumentFolderPath +
                          " for user folders...")
-            userFolders = os.walk(instrumentFolderPath).next()[1]
+            userFolders = SubdirectoryNames(instrumentFolderPath)
             RaiseExceptionIfUserAborted()
-            for userFolderName in userFolders:
-                userFolderPath = os.path.join(instrumentFolderPath,
-                                              userFolderName)
-                logger.debug("Scanning " + userFolderPath +
-                             " for dataset folders...")
-                for datasetFolderName in DatasetFolderNames(userFolderPath):
-                    if SETTINGS.filters.ignoreOldDatasets and \
-                            DatasetIsTooOld(userFolderPath, datasetFolderName):
-                        continue
-                    if SETTINGS.filters.ignoreNewDatasets and \
-                            DatasetIsTooNew(userFolderPath, datasetFolderName):
-                        continue
-                    groupFolderName = os.path.basename(groupFolderPath)
-                    folderModel = \
-                        FolderModel(dataViewId=self.GetMaxDataViewId() + 1,
-                                    folderName=datasetFolderName,
-                                    location=userFolderPath,
-                                    userFolderName=userFolderName,
-                                    groupFolderName=groupFolderName,
-                                    owner=owner,
-                                    group=groupRecord)
-                    RaiseExceptionIfUserAborted()
-                    folderModel.SetCreatedDate()
-                    folderModel.experimentTitle = \
-                        "%s - %s" % (SETTINGS.general.instrumentName,
-                                     userFolderName)
-                    self.AddRow(folderModel)
+            userFolderPaths = [
+                os.path.join(instrumentFolderPath, userFolderName)
+                for userFolderName in userFolders]
+            # List the user folders concurrently:
+            userFolderContents = self.scanPool.map(
+                DatasetFolderNames, userFolderPaths)
+            groupFolderName = os.path.basename(groupFolderPath)
+            datasetFolders = []
+            for userFolderName, userFolderPath, datasetFolderNames in zip(
+                    userFolders, userFolderPaths, userFolderContents):
+                logger.debug("Found %s dataset folder(s) in %s"
+                             % (len(datasetFolderNames), userFolderPath))
+                for datasetFolderName in datasetFolderNames:
+                    datasetFolders.append(DatasetFolder(
+                        location=userFolderPath,
+                        folderName=datasetFolderName,
+                        userFolderName=userFolderName,
+                        groupFolderName=groupFolderName,
+                        owner=owner, group=groupRecord,
+                        experimentTitle="%s - %s" % (
+                            SETTINGS.general.instrumentName, userFolderName)))
+            for folderModel in self.CreateFolderModels(datasetFolders):
+                self.AddRow(folderModel)
         except InvalidFolderStructure:
             raise
         except:
             logger.error(traceback.format_exc())
 
+    def FindFolderForFile(self, dataFilePath):
+        """
+        Return the folder model for the dataset folder containing the file
+        at dataFilePath, or None if the file isn't within any of the
+        dataset folders found by the last scan.
+        """
+        dirname = os.path.dirname(dataFilePath)
+        for folderModel in list(self.rowsData):
+            absoluteFolderPath = folderModel.GetAbsPath()
+            if folderModel.isExperimentFilesFolder:
+                if dirname == absoluteFolderPath:
+                    return folderModel
+            elif dirname == absoluteFolderPath or \
+                    dirname.startswith(absoluteFolderPath + os.sep):
+                return folderModel
+        return None
+
     def GetTotalNumFiles(self):
         """
         Get total number of files.
@@ -504,14 +526,122 @@ class FoldersModel(MyDataDataViewModel):
         for folderModel in self.rowsData:
             folderModel.ResetCounts()
 
+
+class DatasetFolder(object):
+    """
+    A dataset folder found while scanning the data directory, which will
+    be represented by a FolderModel if it isn't too old or too new.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-few-public-methods
+    def __init__(self, location, folderName, userFolderName, groupFolderName,
+                 owner, group, experimentTitle=None,
+                 isExperimentFilesFolder=False):
+        self.location = location
+        self.folderName = folderName
+        self.userFolderName = userFolderName
+        self.groupFolderName = groupFolderName
+        self.owner = owner
+        self.group = group
+        self.experimentTitle = experimentTitle
+        self.isExperimentFilesFolder = isExperimentFilesFolder
+
+
+def CreateFolderModel(datasetFolder):
+    """
+    Create a FolderModel for a DatasetFolder, listing the folder's files,
+    unless they will be listed while they are being verified (see the
+    stream_folder_scans setting).
+
+    Run by the FoldersModel's scan thread pool.  The FolderModel's
+    dataViewId is assigned later, when it is added to the Folders view.
+
+    Returns None if the dataset folder is too old or too new to upload.
+    """
+    RaiseExceptionIfUserAborted()
+    if not datasetFolder.isExperimentFilesFolder:
+        logger.debug("Found folder assumed to be dataset: " +
+                     datasetFolder.folderName)
+        if SETTINGS.filters.ignoreOldDatasets and \
+                DatasetIsTooOld(datasetFolder.location,
+                                datasetFolder.folderName):
+            return None
+        if SETTINGS.filters.ignoreNewDatasets and \
+                DatasetIsTooNew(datasetFolder.location,
+                                datasetFolder.folderName):
+            return None
+    folderModel = \
+        FolderModel(dataViewId=None,
+                    folderName=datasetFolder.folderName,
+                    location=datasetFolder.location,
+                    userFolderName=datasetFolder.userFolderName,
+                    groupFolderName=datasetFolder.groupFolderName,
+                    owner=datasetFolder.owner,
+                    group=datasetFolder.group,
+                    isExperimentFilesFolder=(
+                        datasetFolder.isExperimentFilesFolder),
+                    scanFiles=not SETTINGS.miscellaneous.streamFolderScans)
+    RaiseExceptionIfUserAborted()
+    if datasetFolder.experimentTitle is not None:
+        folderModel.experimentTitle = datasetFolder.experimentTitle
+    folderModel.SetCreatedDate()
+    return folderModel
+
+
+def GetUserForFolder(userFolderName):
+    """
+    Look up the MyTardis user record for a user folder.
+
+    Run by the FoldersModel's scan thread pool.
+
+    Returns a (userFolderName, userRecord) tuple, where userRecord is
+    None if no matching MyTardis user was found.
+    """
+    RaiseExceptionIfUserAborted()
+    logger.debug(
+        "Found folder assumed to be %s: %s" % (UserFolderType(),
+                                               userFolderName))
+    try:
+        return userFolderName, UserModel.GetUserForFolder(userFolderName)
+    except DoesNotExist:
+        return userFolderName, None
+
+
+def GetGroupForFolder(groupFolderName):
+    """
+    Look up the MyTardis group record for a user group folder.
+
+    Run by the FoldersModel's scan thread pool.
+
+    Returns a (groupFolderName, groupRecord) tuple, where groupRecord is
+    None if no matching MyTardis group was found.
+    """
+    RaiseExceptionIfUserAborted()
+    logger.debug("Found folder assumed to be user group name: " +
+                 groupFolderName)
+    try:
+        return groupFolderName, GroupModel.GetGroupForFolder(groupFolderName)
+    except DoesNotExist:
+        return groupFolderName, None
+
+
+def ListExperimentFolder(expFolderPath):
+    """
+    Return the dataset folder names and the top-level files (not within
+    any dataset folder) in an experiment folder.
+
+    Run by the FoldersModel's scan thread pool.
+    """
+    RaiseExceptionIfUserAborted()
+    return DatasetFolderNames(expFolderPath), FilesInTopLevel(expFolderPath)
+
+
 def FolderNames(pathToScan, filterPattern=''):
     """
     List of folder names in path matching the filter pattern
     (or all folders in the specified path if there is no filter).
     """
-    filesDepth1 = glob(os.path.join(pathToScan, '*%s*' % filterPattern))
-    dirsDepth1 = [item for item in filesDepth1 if os.path.isdir(item)]
-    return [os.path.basename(d) for d in dirsDepth1]
+    return SubdirectoryNames(pathToScan, '*%s*' % filterPattern)
 
 
 def UserFolderNames(pathToScan):
@@ -556,9 +686,8 @@ def FilesInTopLevel(expFolderPath):
     Return a list of file names in the specified experiment
     folder path, not within any specific dataset folder.
     """
-    globDepth1 = glob(os.path.join(
-        expFolderPath, '*%s*' % SETTINGS.filters.datasetFilter))
-    return [item for item in globDepth1 if os.path.isfile(item)]
+    return [os.path.join(expFolderPath, filename) for filename in FileNames(
+        expFolderPath, '*%s*' % SETTINGS.filters.datasetFilter)]
 
 
 def DatasetIsTooOld(pathToScan, datasetFolderName):
@@ -82,12 +82,12 @@ class VerificationsModel(MyDataDataViewModel):
         with self.countLocks['foundVerified']:
             self.totals['foundVerified'] += 1
 
-    def IncrementCacheHits(self):
+    def IncrementCacheHits(self, count=1):
         """
         Increment the number of cache hits
         """
         with self.countLocks['foundInCache']:
-            self.totals['foundInCache'] += 1
+            self.totals['foundInCache'] += count
 
     def SetFoundUnverifiedFullSize(self, verificationModel):
         """
@@ -0,0 +1,234 @@
+"""
+Model classes for MyData's local caches, which are stored in SQLite
+databases, and the model class for the local cache of verified DataFile
+lookups.
+
+Each lookup is a point query on the database's primary key index, rather
+than requiring the entire cache to be loaded into memory at the start of
+each scan-and-upload task.  Entries are committed as soon as they are
+added, so they survive MyData being terminated in the middle of a run.
+
+Each verified DataFile entry records the local file's size and modified
+time, so a file which is modified locally after being verified on MyTardis
+will be looked up again, rather than being skipped forever.
+"""
+import os
+import pickle
+import sqlite3
+import traceback
+
+from ..logs import logger
+from ..threads.locks import LOCKS
+
+# The maximum number of paths in each FindCached query, which must be less
+# than SQLite's limit on the number of host parameters in a statement:
+FIND_CACHED_BATCH_SIZE = 500
+
+
+class SqliteCache(object):
+    """
+    Base class for MyData's local caches, which are stored in SQLite
+    databases.
+
+    The SQLite connection is shared by MyData's worker threads, so it is
+    only accessed while holding the cache's lock.
+    """
+    # The CREATE TABLE statements for the cache's tables:
+    tables = ()
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.path = None
+        self.connection = None
+
+    def Open(self, path):
+        """
+        Open (or create) the cache database at path, closing any cache
+        database which is already open.
+        """
+        self.Close()
+        with self.lock:
+            connection = sqlite3.connect(path, check_same_thread=False)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                for table in self.tables:
+                    connection.execute(table)
+                connection.commit()
+            except:
+                connection.close()
+                raise
+            self.path = path
+            self.connection = connection
+
+    @staticmethod
+    def Decode(path):
+        """
+        SQLite requires text to be unicode or ASCII
+        """
+        if isinstance(path, str):
+            return path.decode('utf8')
+        return path
+
+    def Close(self):
+        """
+        Close the cache database
+        """
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+                self.path = None
+
+
+class VerifiedDatafilesCache(SqliteCache):
+    """
+    Model class for the local cache of verified DataFile lookups.
+    """
+    tables = (
+        "CREATE TABLE IF NOT EXISTS verified_datafiles ("
+        "dataset_id INTEGER NOT NULL, "
+        "path TEXT NOT NULL, "
+        "size INTEGER, "
+        "mtime REAL, "
+        "PRIMARY KEY (dataset_id, path))",)
+
+    def __init__(self):
+        super(VerifiedDatafilesCache, self).__init__(LOCKS.updateCache)
+
+    def Open(self, path, legacyPicklePath=None):
+        """
+        Open (or create) the cache database at path, closing any cache
+        database which is already open.
+
+        If a legacy pickled dictionary cache exists at legacyPicklePath,
+        its entries are imported and the pickle file is renamed, so it
+        will only be imported once.
+        """
+        super(VerifiedDatafilesCache, self).Open(path)
+        if legacyPicklePath and os.path.exists(legacyPicklePath):
+            with self.lock:
+                self.ImportLegacyPickle(legacyPicklePath)
+
+    def ImportLegacyPickle(self, legacyPicklePath):
+        """
+        Import entries from the pickled dictionary used by older versions
+        of MyData, whose keys are "<dataset ID>,<UTF-8 encoded path>".
+
+        Legacy entries have no size or modified time.  These are recorded
+        the first time the entry is looked up.
+
+        Must be called while holding the cache's lock.
+        """
+        try:
+            with open(legacyPicklePath, 'rb') as cacheFile:
+                legacyCache = pickle.load(cacheFile)
+            rows = []
+            for key in legacyCache:
+                datasetId, path = key.split(",", 1)
+                rows.append((int(datasetId), path.decode('utf8')))
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO verified_datafiles "
+                "(dataset_id, path) VALUES (?, ?)", rows)
+            self.connection.commit()
+            os.rename(legacyPicklePath, legacyPicklePath + ".imported")
+            logger.info("Imported %s entries from %s"
+                        % (len(rows), legacyPicklePath))
+        except:
+            logger.warning("Couldn't import legacy verified datafiles cache.")
+            logger.warning(traceback.format_exc())
+
+    def Contains(self, datasetId, path, size, mtime):
+        """
+        Return True if the file at path (with the given size and modified
+        time) has been verified in the dataset with ID datasetId.
+        """
+        path = VerifiedDatafilesCache.Decode(path)
+        with self.lock:
+            if not self.connection:
+                return False
+            row = self.connection.execute(
+                "SELECT size, mtime FROM verified_datafiles "
+                "WHERE dataset_id = ? AND path = ?",
+                (datasetId, path)).fetchone()
+            if not row:
+                return False
+            cachedSize, cachedMtime = row
+            if cachedSize is None:
+                # Imported from a legacy cache, which didn't record
+                # the file's size and modified time:
+                self.connection.execute(
+                    "UPDATE verified_datafiles SET size = ?, mtime = ? "
+                    "WHERE dataset_id = ? AND path = ?",
+                    (size, mtime, datasetId, path))
+                self.connection.commit()
+                return True
+            return cachedSize == size and cachedMtime == mtime
+
+    def FindCached(self, datasetId, files):
+        """
+        Bulk version of Contains, for checking a batch of a folder's files
+        with one query per FIND_CACHED_BATCH_SIZE files.  The files argument
+        is a list of (path, size, mtime) tuples, and the indices of the
+        cached files in that list are returned.
+
+        Only the batch's own paths are queried, so checking a large
+        folder's files in batches doesn't fetch all of the dataset's
+        cache entries for each batch.
+        """
+        paths = [VerifiedDatafilesCache.Decode(path) for path, _, _ in files]
+        with self.lock:
+            if not self.connection:
+                return []
+            cachedEntries = dict()
+            for start in range(0, len(paths), FIND_CACHED_BATCH_SIZE):
+                batch = paths[start:start + FIND_CACHED_BATCH_SIZE]
+                query = (
+                    "SELECT path, size, mtime FROM verified_datafiles "
+                    "WHERE dataset_id = ? AND path IN (%s)"
+                    % ", ".join("?" * len(batch)))
+                for path, size, mtime in self.connection.execute(
+                        query, [datasetId] + batch):
+                    cachedEntries[path] = (size, mtime)
+            if not cachedEntries:
+                return []
+            cachedIndices = []
+            legacyEntries = []
+            for index, (path, (_, size, mtime)) in \
+                    enumerate(zip(paths, files)):
+                cachedEntry = cachedEntries.get(path)
+                if not cachedEntry:
+                    continue
+                if cachedEntry[0] is None:
+                    legacyEntries.append((size, mtime, datasetId, path))
+                    cachedIndices.append(index)
+                elif cachedEntry == (size, mtime):
+                    cachedIndices.append(index)
+            if legacyEntries:
+                self.connection.executemany(
+                    "UPDATE verified_datafiles SET size = ?, mtime = ? "
+                    "WHERE dataset_id = ? AND path = ?", legacyEntries)
+                self.connection.commit()
+            return cachedIndices
+
+    def Add(self, datasetId, path, size, mtime):
+        """
+        Record that the file at path (with the given size and modified
+        time) has been verified in the dataset with ID datasetId.
+        """
+        path = VerifiedDatafilesCache.Decode(path)
+        with self.lock:
+            if not self.connection:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO verified_datafiles "
+                "(dataset_id, path, size, mtime) VALUES (?, ?, ?, ?)",
+                (datasetId, path, size, mtime))
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            if not self.connection:
+                return 0
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM verified_datafiles").fetchone()[0]
@@ -0,0 +1,89 @@
+"""
+Model class for the local cache of MD5 checksums.
+
+The cache records the MD5 checksums calculated for local files, identified
+by their device and inode numbers, size and modified time, so a file's
+checksum never needs to be calculated twice, e.g. if its upload is
+canceled, or its DataFile record needs to be recreated.
+
+Local files' checksums don't depend on the MyTardis server they are
+uploaded to, so one checksum cache database is shared by all servers.
+"""
+import os
+
+from ..threads.locks import LOCKS
+from .cache import SqliteCache
+
+
+class ChecksumCache(SqliteCache):
+    """
+    Model class for the local cache of MD5 checksums.
+    """
+    tables = (
+        "CREATE TABLE IF NOT EXISTS checksums ("
+        "dev INTEGER NOT NULL, "
+        "ino INTEGER NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "mtime_ns INTEGER NOT NULL, "
+        "md5sum TEXT NOT NULL, "
+        "PRIMARY KEY (dev, ino))",)
+
+    def __init__(self):
+        super(ChecksumCache, self).__init__(LOCKS.updateChecksumCache)
+
+    @staticmethod
+    def GetChecksumKey(path):
+        """
+        Return the (device, inode, size, modified time in nanoseconds)
+        tuple which identifies a version of a local file in the checksum
+        cache, or None if the file can't be identified by its inode
+        number (e.g. on Windows, where Python 2's os.stat doesn't
+        provide inode numbers).
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not stat.st_ino:
+            return None
+        mtimeNs = getattr(stat, 'st_mtime_ns', None)
+        if mtimeNs is None:
+            mtimeNs = int(stat.st_mtime * 1e9)
+        # SQLite integers are signed 64-bit integers, but some file systems
+        # use unsigned 64-bit device and inode numbers:
+        dev, ino = [value - 2 ** 64 if value >= 2 ** 63 else value
+                    for value in (stat.st_dev, stat.st_ino)]
+        return dev, ino, stat.st_size, mtimeNs
+
+    def GetMd5Sum(self, checksumKey):
+        """
+        Return the MD5 checksum recorded for the version of a local file
+        identified by checksumKey (see GetChecksumKey), or None if there
+        isn't one.
+        """
+        dev, ino, size, mtimeNs = checksumKey
+        with self.lock:
+            if not self.connection:
+                return None
+            row = self.connection.execute(
+                "SELECT md5sum FROM checksums "
+                "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                (dev, ino, size, mtimeNs)).fetchone()
+            return str(row[0]) if row else None
+
+    def SetMd5Sum(self, checksumKey, md5sum):
+        """
+        Record the MD5 checksum calculated for the version of a local file
+        identified by checksumKey, replacing any checksum recorded for an
+        earlier version of the file (or for an earlier file with the same
+        inode number).
+        """
+        dev, ino, size, mtimeNs = checksumKey
+        with self.lock:
+            if not self.connection:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checksums "
+                "(dev, ino, size, mtime_ns, md5sum) VALUES (?, ?, ?, ?, ?)",
+                (dev, ino, size, mtimeNs, md5sum))
+            self.connection.commit()
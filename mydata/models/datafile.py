@@ -5,16 +5,15 @@ See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 
 import io
 import json
+import os
 import urllib
-# Only used for poster which will be replaced by requests-toolbelt:
-import urllib2
 
-import requests
-# poster will soon be replaced by requests-toolbelt:
-import poster
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from requests_toolbelt.multipart.encoder import MultipartEncoderMonitor
 
 from ..dataviewmodels.dataview import DATAVIEW_MODELS
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..logs import logger
 from ..utils.exceptions import DoesNotExist
 from ..utils.exceptions import MultipleObjectsReturned
@@ -69,7 +68,7 @@ class DataFileModel(object):
             "&dataset__id=" + str(dataset.datasetId) + \
             "&filename=" + urllib.quote(filename.encode('utf-8')) + \
             "&directory=" + urllib.quote(directory.encode('utf-8'))
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         dataFilesJson = response.json()
         numDataFilesFound = dataFilesJson['meta']['total_count']
@@ -86,6 +85,37 @@ class DataFileModel(object):
             return DataFileModel(
                 dataset=dataset, dataFileJson=dataFilesJson['objects'][0])
 
+    @staticmethod
+    def GetDataFiles(dataset, pageSize=500):
+        """
+        List all of the DataFile records in a dataset, using one paginated
+        query per pageSize records, instead of one query per file.
+
+        :raises requests.exceptions.HTTPError:
+        :raises ValueError: if a response isn't valid JSON
+        :raises KeyError: if a response is missing an expected key
+        """
+        myTardisUrl = SETTINGS.general.myTardisUrl
+        dataFiles = []
+        offset = 0
+        while True:
+            url = myTardisUrl + "/api/v1/mydata_dataset_file/?format=json" + \
+                "&dataset__id=" + str(dataset.datasetId) + \
+                "&limit=%s&offset=%s" % (pageSize, offset)
+            response = MYTARDIS_API.Get(url, SETTINGS)
+            response.raise_for_status()
+            dataFilesJson = response.json()
+            for dataFileJson in dataFilesJson['objects']:
+                dataFiles.append(
+                    DataFileModel(dataset=dataset, dataFileJson=dataFileJson))
+            # The server may return fewer than pageSize records per page
+            # (e.g. if Tastypie's max_limit is smaller than pageSize):
+            offset += len(dataFilesJson['objects'])
+            if not dataFilesJson['objects'] or \
+                    offset >= dataFilesJson['meta']['total_count']:
+                break
+        return dataFiles
+
     @staticmethod
     def GetDataFileFromId(dataFileId):
         """
@@ -96,7 +126,7 @@ class DataFileModel(object):
         myTardisUrl = SETTINGS.general.myTardisUrl
         url = "%s/api/v1/mydata_dataset_file/%s/?format=json" \
             % (myTardisUrl, dataFileId)
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         dataFileJson = response.json()
         return DataFileModel(dataset=None, dataFileJson=dataFileJson)
@@ -108,7 +138,7 @@ class DataFileModel(object):
         """
         myTardisUrl = SETTINGS.general.myTardisUrl
         url = myTardisUrl + "/api/v1/dataset_file/%s/verify/" % datafileId
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         if response.status_code < 200 or response.status_code >= 300:
             logger.warning("Failed to verify datafile id \"%s\" " % datafileId)
             logger.warning(response.text)
@@ -119,6 +149,21 @@ class DataFileModel(object):
         # Celery queue.
         return True
 
+    @staticmethod
+    def SetMd5Sum(datafileId, md5sum):
+        """
+        Update a DataFile record's MD5 checksum via the MyTardis API, e.g.
+        for a file whose checksum was calculated while it was uploaded,
+        so that MyTardis can verify it.
+
+        :raises requests.exceptions.HTTPError:
+        """
+        myTardisUrl = SETTINGS.general.myTardisUrl
+        url = myTardisUrl + "/api/v1/dataset_file/%s/" % datafileId
+        response = MYTARDIS_API.Patch(
+            url, SETTINGS, data=json.dumps({'md5sum': md5sum}))
+        response.raise_for_status()
+
     @staticmethod
     def CreateDataFileForStagingUpload(dataFileDict):
         """
@@ -127,29 +172,113 @@ class DataFileModel(object):
         """
         url = "%s/api/v1/mydata_dataset_file/" % SETTINGS.general.myTardisUrl
         dataFileJson = json.dumps(dataFileDict)
-        response = requests.post(headers=SETTINGS.defaultHeaders,
-                                 url=url, data=dataFileJson)
+        response = MYTARDIS_API.Post(url, SETTINGS, data=dataFileJson)
         return response
 
     @staticmethod
     def UploadDataFileWithPost(dataFilePath, dataFileDict,
-                               uploadModel, posterCallback):
+                               uploadModel, progressCallback):
         """
         Upload a file to the MyTardis API via POST, creating a new
         DataFile record.
+
+        The multipart request body is streamed from disk as it is sent,
+        and the request uses the upload thread's own MyTardis API session,
+        so multiple upload threads can POST files concurrently.
+
+        progressCallback is called with the number of bytes of the
+        request body sent so far and the request body's total size.
+
+        :raises requests.exceptions.HTTPError:
         """
         url = "%s/api/v1/mydata_dataset_file/" % SETTINGS.general.myTardisUrl
         message = "Initializing buffered reader..."
         DATAVIEW_MODELS['uploads'].SetMessage(uploadModel, message)
         datafileBufferedReader = io.open(dataFilePath, 'rb')
         uploadModel.bufferedReader = datafileBufferedReader
+        try:
+            encoder = MultipartEncoder(fields=[
+                ("json_data", json.dumps(dataFileDict)),
+                ("attached_file", (os.path.basename(dataFilePath),
+                                   datafileBufferedReader,
+                                   "application/octet-stream"))])
+            monitor = MultipartEncoderMonitor(
+                encoder,
+                lambda monitor: progressCallback(
+                    monitor.bytes_read, monitor.len))
+            headers = dict(MYTARDIS_API.GetHeaders(SETTINGS))
+            headers['Content-Type'] = monitor.content_type
+            response = MYTARDIS_API.Post(
+                url, SETTINGS, data=monitor, headers=headers)
+            response.raise_for_status()
+            return response
+        finally:
+            datafileBufferedReader.close()
 
-        datagen, headers = poster.encode.multipart_encode(
-            {"json_data": json.dumps(dataFileDict),
-             "attached_file": datafileBufferedReader},
-            cb=posterCallback)
-        opener = poster.streaminghttp.register_openers()
-        opener.addheaders = SETTINGS.defaultHeaders.items()
-        request = urllib2.Request(url, datagen, headers)
-        response = urllib2.urlopen(request)
-        return response
+
+class DataFileLookupIndex(object):
+    """
+    In-memory index of a dataset's DataFile records, keyed by
+    (directory, filename).
+
+    Built from a single paginated listing of the dataset's DataFiles,
+    so that the verification workers can classify each local file
+    without sending one MyTardis API query per file.
+    """
+    def __init__(self, dataset, dataFiles):
+        self.dataset = dataset
+        self.dataFiles = dict()
+        for dataFile in dataFiles:
+            key = DataFileLookupIndex.GetKey(dataFile.directory,
+                                             dataFile.filename)
+            self.dataFiles.setdefault(key, []).append(dataFile)
+
+    @staticmethod
+    def CreateForDataset(dataset):
+        """
+        Fetch all of the dataset's DataFile records and index them.
+
+        :raises requests.exceptions.HTTPError:
+        :raises ValueError: if a response isn't valid JSON
+        :raises KeyError: if a response is missing an expected key
+        """
+        return DataFileLookupIndex(dataset,
+                                   DataFileModel.GetDataFiles(dataset))
+
+    @staticmethod
+    def GetKey(directory, filename):
+        """
+        MyTardis uses an empty string (or None) for the directory of a
+        file in the dataset's top-level directory.  Keys are unicode, so
+        that byte strings from os.walk match the server's JSON strings.
+        """
+        if not directory:
+            directory = u""
+        if isinstance(directory, str):
+            directory = directory.decode('utf-8')
+        if isinstance(filename, str):
+            filename = filename.decode('utf-8')
+        return (directory, filename)
+
+    def GetDataFile(self, filename, directory):
+        """
+        Lookup datafile by filename and directory, raising the same
+        exceptions as DataFileModel.GetDataFile
+        """
+        matches = self.dataFiles.get(
+            DataFileLookupIndex.GetKey(directory, filename), [])
+        if not matches:
+            raise DoesNotExist(
+                message="Datafile \"%s\" was not found in MyTardis" % filename)
+        elif len(matches) > 1:
+            raise MultipleObjectsReturned(
+                "Multiple datafiles matching %s were found in MyTardis"
+                % filename)
+        return matches[0]
+
+    @property
+    def numDataFiles(self):
+        """
+        Return the number of DataFile records in the index
+        """
+        return sum(len(matches) for matches in self.dataFiles.values())
@@ -4,21 +4,29 @@ See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 import urllib
 import json
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..threads.flags import FLAGS
 from ..logs import logger
 from ..utils.exceptions import DoesNotExist
 
+# The URLs of MyTardis servers which can't filter datasets by instrument,
+# so that GetDataset doesn't need to retry each query without the filter:
+INSTRUMENT_FILTER_UNSUPPORTED = set()
+
 
 class DatasetModel(object):
     """
     Client-side model for caching results of querying
     MyTardis's dataset model.
     """
-    def __init__(self, datasetJson):
+    def __init__(self, datasetJson, newlyCreated=False):
         self.json = datasetJson
+        # True if MyData created this dataset record during the current
+        # session, in which case it can't contain any DataFiles yet, so
+        # there's no need to look up its files on the MyTardis server:
+        self.newlyCreated = newlyCreated
 
     @property
     def datasetId(self):
@@ -100,11 +108,10 @@ class DatasetModel(object):
                         % (SETTINGS.general.myTardisUrl, experiment.viewUri)
                 logger.testrun(message)
                 return None
-            response = requests.post(headers=SETTINGS.defaultHeaders,
-                                     url=url, data=data)
+            response = MYTARDIS_API.Post(url, SETTINGS, data=data)
             response.raise_for_status()
             newDatasetJson = response.json()
-            return DatasetModel(newDatasetJson)
+            return DatasetModel(newDatasetJson, newlyCreated=True)
 
     @staticmethod
     def GetDataset(folderModel):
@@ -126,14 +133,18 @@ class DatasetModel(object):
                "&description=%s" % (SETTINGS.general.myTardisUrl,
                                     folderModel.experimentModel.experimentId,
                                     description))
-        urlWithInstrument = "%s&instrument__id=%s"\
-            % (url, SETTINGS.general.instrument.instrumentId)
-        response = requests.get(
-            headers=SETTINGS.defaultHeaders, url=urlWithInstrument)
-        if response.status_code == 400:
-            logger.debug(
-                "MyTardis doesn't support filtering datasets by instrument")
-            response = requests.get(headers=SETTINGS.defaultHeaders, url=url)
+        if SETTINGS.general.myTardisUrl in INSTRUMENT_FILTER_UNSUPPORTED:
+            response = MYTARDIS_API.Get(url, SETTINGS)
+        else:
+            urlWithInstrument = "%s&instrument__id=%s"\
+                % (url, SETTINGS.general.instrument.instrumentId)
+            response = MYTARDIS_API.Get(urlWithInstrument, SETTINGS)
+            if response.status_code == 400:
+                logger.debug(
+                    "MyTardis doesn't support filtering datasets by "
+                    "instrument")
+                INSTRUMENT_FILTER_UNSUPPORTED.add(SETTINGS.general.myTardisUrl)
+                response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         datasetsJson = response.json()
         numDatasets = datasetsJson['meta']['total_count']
@@ -146,3 +157,30 @@ class DatasetModel(object):
         if numDatasets == 1:
             logger.debug("Found existing dataset for folder %s" % description)
         return DatasetModel(datasetsJson['objects'][0])
+
+    @staticmethod
+    def GetDatasetById(datasetId, folderModel):
+        """
+        Get the dataset record with ID datasetId, previously found (or
+        created) for this folder, checking that it still has the folder's
+        name as its description and still belongs to the folder's
+        experiment.
+        """
+        url = "%s/api/v1/dataset/%s/?format=json" \
+            % (SETTINGS.general.myTardisUrl, datasetId)
+        response = MYTARDIS_API.Get(url, SETTINGS)
+        if response.status_code == 404:
+            message = "Didn't find dataset with ID %s" % datasetId
+            raise DoesNotExist(message, modelClass=DatasetModel)
+        response.raise_for_status()
+        dataset = DatasetModel(response.json())
+        experimentUri = "/%s/" % folderModel.experimentModel.experimentId
+        if dataset.description != folderModel.folderName or \
+                not any(uri.endswith(experimentUri)
+                        for uri in dataset.json.get('experiments', [])):
+            message = "Dataset %s no longer matches folder %s" \
+                % (datasetId, folderModel.folderName)
+            raise DoesNotExist(message, modelClass=DatasetModel)
+        logger.debug("Found existing dataset %s for folder %s"
+                     % (datasetId, folderModel.folderName))
+        return dataset
@@ -4,9 +4,9 @@ See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 import json
 import urllib
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..threads.flags import FLAGS
 from ..logs import logger
 from ..utils.exceptions import DoesNotExist
@@ -67,7 +67,7 @@ class ExperimentModel(object):
                 % urllib.quote(folderModel.groupFolderName.encode('utf-8'))
 
         logger.debug(url)
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         experimentsJson = response.json()
         numExperimentsFound = experimentsJson['meta']['total_count']
@@ -143,8 +143,8 @@ class ExperimentModel(object):
                 {"name": "group_folder_name", "value": groupFolderName})
         url = "%s/api/v1/mydata_experiment/" % SETTINGS.general.myTardisUrl
         logger.debug(url)
-        response = requests.post(headers=SETTINGS.defaultHeaders,
-                                 url=url, data=json.dumps(experimentJson))
+        response = MYTARDIS_API.Post(
+            url, SETTINGS, data=json.dumps(experimentJson))
         response.raise_for_status()
         createdExperimentJson = response.json()
         createdExperiment = ExperimentModel(createdExperimentJson)
@@ -3,9 +3,9 @@ Model class for MyTardis API v1's FacilityResource.
 See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from .group import GroupModel
 
 
@@ -43,7 +43,7 @@ class FacilityModel(object):
         """
         facilities = []
         url = "%s/api/v1/facility/?format=json" % SETTINGS.general.myTardisUrl
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         facilitiesJson = response.json()
         for facilityJson in facilitiesJson['objects']:
@@ -2,15 +2,20 @@
 Model class representing a data folder which may or may not
 have a corresponding dataset record in MyTardis.
 """
+import array
 import os
+import posixpath
+import threading
 import time
 from datetime import datetime
 import hashlib
-import traceback
-from fnmatch import fnmatch
 
 from ..settings import SETTINGS
 from ..logs import logger
+from ..utils.filters import GetPatternsFile
+from ..utils.hashing import MD5_PROCESS_POOL
+from ..utils.scanning import walk
+from .checksums import ChecksumCache
 
 
 class FolderModel(object):
@@ -21,8 +26,13 @@ class FolderModel(object):
     # pylint: disable=too-many-public-methods
     def __init__(self, dataViewId, folderName, location, userFolderName,
                  groupFolderName, owner, group=None,
-                 isExperimentFilesFolder=False):
-
+                 isExperimentFilesFolder=False, scanFiles=True):
+        """
+        If scanFiles is False, the folder's files aren't listed until
+        something iterates over ScanDataFiles, so that their lookups can
+        begin while the folder is still being scanned.
+        """
+        # pylint: disable=too-many-arguments
         self.dataViewFields = dict(
             dataViewId=dataViewId,
             folderName=folderName,
@@ -38,11 +48,35 @@ class FolderModel(object):
         # collect these files:
         self.isExperimentFilesFolder = isExperimentFilesFolder
 
+        # The 'uploaded' states are stored in a bytearray (one byte per
+        # file) and the number of uploaded files is maintained
+        # incrementally, so updating the folder's status is O(1).
+        # Each file's size, modified time, created time and inode number
+        # are recorded once when the folder is scanned (see
+        # RefreshDataFileStat).  Inode numbers are kept in a list, because
+        # a double can't represent every 64-bit inode number exactly, and
+        # Python 2's array module has no 64-bit integer type code:
         self.dataFilePaths = dict(
             files=[],
             directories=[],
-            uploaded=[])
-        self.PopulateDataFilePaths()
+            uploaded=bytearray(),
+            sizes=array.array('d'),
+            mtimes=array.array('d'),
+            ctimes=array.array('d'),
+            inodes=[])
+        self.numFilesUploaded = 0
+        # The number of files found to be verified on MyTardis (or in
+        # MyData's local caches) during this scan:
+        self.numFilesVerified = 0
+        self.uploadedLock = threading.Lock()
+        # The set of the folder's data file paths, which is only built
+        # when a watched file is first added (see AddWatchedFile), and is
+        # then kept up to date by AddDataFile:
+        self.dataFilePathSet = None
+        # Set when all of the folder's files have been found:
+        self.scanComplete = threading.Event()
+        if scanFiles:
+            self.PopulateDataFilePaths()
 
         self.userFolderName = userFolderName
         self.groupFolderName = groupFolderName
@@ -54,56 +88,165 @@ class FolderModel(object):
         """
         Populate data file paths within folder object
         """
-        if self.isExperimentFilesFolder:
-            absoluteFolderPath = self.location
-        else:
-            absoluteFolderPath = os.path.join(self.location, self.folderName)
+        for _ in self.ScanDataFiles():
+            pass
 
-        for dirname, _, files in os.walk(absoluteFolderPath):
+    def ScanDataFiles(self):
+        """
+        Walk the folder, adding each file which isn't excluded by the
+        includes and excludes files to the folder's data file paths.
+
+        This is a generator which yields each new file's index as soon as
+        the file has been added, so the file can be looked up on MyTardis
+        while the rest of the folder is still being scanned.  When the walk
+        is complete, scanComplete is set.
+        """
+        absoluteFolderPath = self.GetAbsPath()
+        includes, excludes = FolderModel.GetFilterPatterns()
+
+        for dirname, subdirs, files in walk(absoluteFolderPath):
+            if excludes:
+                # Prune excluded subdirectories, so they are never scanned:
+                subdirs[:] = [
+                    subdir for subdir in subdirs
+                    if not FolderModel.DirectoryIsIgnored(
+                        subdir, includes, excludes)]
+            directory = self.GetMyTardisDirectory(dirname)
             for filename in sorted(files):
-                if SETTINGS.filters.useIncludesFile and \
-                        not SETTINGS.filters.useExcludesFile:
-                    if not FolderModel.MatchesIncludes(filename):
-                        logger.debug("Ignoring %s, not matching includes."
-                                     % filename)
-                        continue
-                elif not SETTINGS.filters.useIncludesFile and \
-                        SETTINGS.filters.useExcludesFile:
-                    if FolderModel.MatchesExcludes(filename):
-                        logger.debug("Ignoring %s, matching excludes."
-                                     % filename)
-                        continue
-                elif SETTINGS.filters.useIncludesFile and \
-                        SETTINGS.filters.useExcludesFile:
-                    if FolderModel.MatchesExcludes(filename) and \
-                            not FolderModel.MatchesIncludes(filename):
-                        logger.debug("Ignoring %s, matching excludes "
-                                     "and not matching includes."
-                                     % filename)
-                        continue
-                self.dataFilePaths['files'].append(
-                    os.path.join(dirname, filename))
-                self.dataFilePaths['directories']\
-                    .append(os.path.relpath(dirname, absoluteFolderPath))
-                self.dataFilePaths['uploaded'].append(False)
+                if FolderModel.FileIsIgnored(filename, includes, excludes):
+                    continue
+                dataFilePath = os.path.join(dirname, filename)
+                try:
+                    fileInfo = os.stat(dataFilePath)
+                except OSError:
+                    logger.warning("Ignoring %s, because it has been "
+                                   "moved, renamed or deleted."
+                                   % dataFilePath)
+                    continue
+                yield self.AddDataFile(dataFilePath, directory, fileInfo)
             if self.isExperimentFilesFolder:
                 break
-        self.ConvertSubdirectoriesToMyTardisFormat()
-        self.dataViewFields['status'] = \
-            "0 of %d files uploaded" % self.numFiles
+        self.scanComplete.set()
+
+    def AddWatchedFile(self, dataFilePath):
+        """
+        Add a file which was created in the folder after the folder was
+        scanned, e.g. one detected by MyData's watch mode, unless it is
+        excluded by the includes and excludes files.
 
-    def ConvertSubdirectoriesToMyTardisFormat(self):
+        Returns the new file's index, or None if the file was ignored or
+        was already found.
         """
-        When we write a subdirectory path into the directory field of a
-        MyTardis DataFile record, we use forward slashes, and use an
+        absoluteFolderPath = self.GetAbsPath()
+        dirname, filename = os.path.split(dataFilePath)
+        includes, excludes = FolderModel.GetFilterPatterns()
+        if FolderModel.FileIsIgnored(filename, includes, excludes):
+            return None
+        relDirectory = os.path.relpath(dirname, absoluteFolderPath)
+        if relDirectory.startswith(os.pardir) or \
+                (self.isExperimentFilesFolder and relDirectory != os.curdir):
+            return None
+        if excludes and relDirectory != os.curdir:
+            for subdir in relDirectory.split(os.sep):
+                if FolderModel.DirectoryIsIgnored(subdir, includes, excludes):
+                    return None
+        try:
+            fileInfo = os.stat(dataFilePath)
+        except OSError:
+            return None
+        return self.AddDataFile(
+            dataFilePath, self.GetMyTardisDirectory(dirname), fileInfo,
+            skipIfKnown=True)
+
+    @staticmethod
+    def GetFilterPatterns():
+        """
+        Return the compiled (includes, excludes) patterns, with None for
+        an includes or excludes file which isn't being used.
+        """
+        includes = None
+        excludes = None
+        if SETTINGS.filters.useIncludesFile:
+            includes = GetPatternsFile(SETTINGS.filters.includesFile)
+        if SETTINGS.filters.useExcludesFile:
+            excludes = GetPatternsFile(SETTINGS.filters.excludesFile)
+        return includes, excludes
+
+    @staticmethod
+    def FileIsIgnored(filename, includes, excludes):
+        """
+        Return True if a file should be ignored, according to the includes
+        and excludes patterns returned by GetFilterPatterns
+        """
+        if includes and not excludes:
+            if not includes.MatchesFile(filename):
+                logger.debug("Ignoring %s, not matching includes."
+                             % filename)
+                return True
+        elif not includes and excludes:
+            if excludes.MatchesFile(filename):
+                logger.debug("Ignoring %s, matching excludes."
+                             % filename)
+                return True
+        elif includes and excludes:
+            if excludes.MatchesFile(filename) and \
+                    not includes.MatchesFile(filename):
+                logger.debug("Ignoring %s, matching excludes "
+                             "and not matching includes."
+                             % filename)
+                return True
+        return False
+
+    @staticmethod
+    def DirectoryIsIgnored(dirname, includes, excludes):
+        """
+        Return True if a subdirectory should be ignored, because it
+        matches a directory pattern in the excludes file (and doesn't
+        match one in the includes file)
+        """
+        if not excludes or not excludes.MatchesDirectory(dirname):
+            return False
+        return not (includes and includes.MatchesDirectory(dirname))
+
+    def GetMyTardisDirectory(self, dirname):
+        """
+        When we write a subdirectory path into the directory field of
+        a MyTardis DataFile record, we use forward slashes, and use an
         empty string (rather than ".") to indicate that the file is in
-        the dataset's top-level directory
+        the dataset's top-level directory.
         """
-        for i in range(0, len(self.dataFilePaths['directories'])):
-            if self.dataFilePaths['directories'][i] == ".":
-                self.dataFilePaths['directories'][i] = ""
-            self.dataFilePaths['directories'][i] = \
-                self.dataFilePaths['directories'][i].replace("\\", "/")
+        directory = os.path.relpath(dirname, self.GetAbsPath())
+        if directory == ".":
+            directory = ""
+        return directory.replace("\\", "/")
+
+    def AddDataFile(self, dataFilePath, directory, fileInfo,
+                    skipIfKnown=False):
+        """
+        Add a file found while scanning the folder, returning its index.
+
+        If skipIfKnown is True, None is returned instead if the folder
+        already has a file with the same path.
+        """
+        with self.uploadedLock:
+            if skipIfKnown:
+                if self.dataFilePathSet is None:
+                    self.dataFilePathSet = set(self.dataFilePaths['files'])
+                if dataFilePath in self.dataFilePathSet:
+                    return None
+            # numFiles is the length of the 'files' list, so the path is
+            # appended last, when the file's other fields are available:
+            self.dataFilePaths['directories'].append(directory)
+            self.dataFilePaths['sizes'].append(fileInfo.st_size)
+            self.dataFilePaths['mtimes'].append(fileInfo.st_mtime)
+            self.dataFilePaths['ctimes'].append(fileInfo.st_ctime)
+            self.dataFilePaths['inodes'].append(fileInfo.st_ino)
+            self.dataFilePaths['uploaded'].append(0)
+            self.dataFilePaths['files'].append(dataFilePath)
+            if self.dataFilePathSet is not None:
+                self.dataFilePathSet.add(dataFilePath)
+            self.UpdateStatus()
+            return self.numFiles - 1
 
     def __hash__(self):
         """
@@ -126,10 +269,70 @@ class FolderModel(object):
         Used to update the number of files uploaded per folder
         displayed in the Status column of the Folders view.
         """
-        self.dataFilePaths['uploaded'][dataFileIndex] = uploaded
-        numFilesUploaded = sum(self.dataFilePaths['uploaded'])
+        uploaded = int(bool(uploaded))
+        with self.uploadedLock:
+            self.numFilesUploaded += \
+                uploaded - self.dataFilePaths['uploaded'][dataFileIndex]
+            self.dataFilePaths['uploaded'][dataFileIndex] = uploaded
+            self.UpdateStatus()
+
+    def SetDataFilesUploaded(self, dataFileIndices):
+        """
+        Mark multiple DataFiles as uploaded, e.g. files found in the
+        verified DataFiles cache, updating the folder's status once.
+        """
+        with self.uploadedLock:
+            for dataFileIndex in dataFileIndices:
+                if not self.dataFilePaths['uploaded'][dataFileIndex]:
+                    self.dataFilePaths['uploaded'][dataFileIndex] = 1
+                    self.numFilesUploaded += 1
+            self.UpdateStatus()
+
+    def CountVerifiedDataFiles(self, count=1):
+        """
+        Count files found to be verified on MyTardis (or in MyData's local
+        caches).
+
+        Once all of the folder's files have been found to be verified,
+        the folder's fingerprint is recorded in the scan manifest (if
+        incremental scans are enabled), so later scans can skip the whole
+        folder if it hasn't changed.
+        """
+        with self.uploadedLock:
+            self.numFilesVerified += count
+            allVerified = self.scanComplete.isSet() and \
+                self.numFilesVerified == self.numFiles
+        if allVerified and self.datasetModel and \
+                SETTINGS.miscellaneous.incrementalScans:
+            SETTINGS.scanManifest.RecordFingerprint(
+                self.GetAbsPath(), self.GetFingerprint(),
+                self.datasetModel.datasetId)
+
+    def GetFingerprint(self):
+        """
+        Return a cheap aggregate fingerprint of the folder's files, i.e.
+        the number of files, their total size, their latest modified time
+        and an MD5 hash of their sorted relative paths.
+        """
+        pathsHash = hashlib.md5()
+        for relPath in sorted(
+                posixpath.join(directory, os.path.basename(path))
+                for directory, path in zip(self.dataFilePaths['directories'],
+                                           self.dataFilePaths['files'])):
+            if isinstance(relPath, unicode):
+                relPath = relPath.encode('utf8')
+            pathsHash.update(relPath + "\n")
+        return "%d:%d:%r:%s" % (
+            self.numFiles, sum(self.dataFilePaths['sizes']),
+            max(self.dataFilePaths['mtimes'] or [0]),
+            pathsHash.hexdigest())
+
+    def UpdateStatus(self):
+        """
+        Update the "X of Y files uploaded" status from the uploaded counter
+        """
         self.dataViewFields['status'] = \
-            "%d of %d files uploaded" % (numFilesUploaded,
+            "%d of %d files uploaded" % (self.numFilesUploaded,
                                          self.numFiles)
 
     def GetDataFilePath(self, dataFileIndex):
@@ -163,35 +366,73 @@ class FolderModel(object):
 
     def GetDataFileSize(self, dataFileIndex):
         """
-        Return a file's size on disk
+        Return a file's size on disk, recorded when the folder was scanned
+        (or by the last call to RefreshDataFileStat)
+        """
+        return int(self.dataFilePaths['sizes'][dataFileIndex])
+
+    def GetDataFileMtime(self, dataFileIndex):
+        """
+        Return a file's modified time on disk as a timestamp, recorded when
+        the folder was scanned (or by the last call to RefreshDataFileStat)
+        """
+        return self.dataFilePaths['mtimes'][dataFileIndex]
+
+    def GetDataFileInode(self, dataFileIndex):
+        """
+        Return a file's inode number, recorded when the folder was scanned
         """
-        return os.stat(self.GetDataFilePath(dataFileIndex)).st_size
+        return self.dataFilePaths['inodes'][dataFileIndex]
 
     def GetDataFileCreatedTime(self, dataFileIndex):
         """
         Return a file's created time on disk
         """
-        absoluteFilePath = self.GetDataFilePath(dataFileIndex)
-        try:
-            createdTimeIsoString = datetime.fromtimestamp(
-                os.stat(absoluteFilePath).st_ctime).isoformat()
-            return createdTimeIsoString
-        except:
-            logger.error(traceback.format_exc())
-            return None
+        return datetime.fromtimestamp(
+            self.dataFilePaths['ctimes'][dataFileIndex]).isoformat()
 
     def GetDataFileModifiedTime(self, dataFileIndex):
         """
         Return a file's modified time on disk
         """
-        absoluteFilePath = self.GetDataFilePath(dataFileIndex)
-        try:
-            modifiedTimeIsoString = datetime.fromtimestamp(
-                os.stat(absoluteFilePath).st_mtime).isoformat()
-            return modifiedTimeIsoString
-        except:
-            logger.error(traceback.format_exc())
-            return None
+        return datetime.fromtimestamp(
+            self.dataFilePaths['mtimes'][dataFileIndex]).isoformat()
+
+    def RefreshDataFileStat(self, dataFileIndex):
+        """
+        Update a file's recorded size, modified time and created time,
+        e.g. just before uploading it.
+
+        Returns True if the file has changed since it was scanned.
+
+        :raises OSError: if the file has been moved, renamed or deleted.
+        """
+        fileInfo = os.stat(self.GetDataFilePath(dataFileIndex))
+        changed = \
+            fileInfo.st_size != self.GetDataFileSize(dataFileIndex) or \
+            fileInfo.st_mtime != self.GetDataFileMtime(dataFileIndex)
+        self.dataFilePaths['sizes'][dataFileIndex] = fileInfo.st_size
+        self.dataFilePaths['mtimes'][dataFileIndex] = fileInfo.st_mtime
+        self.dataFilePaths['ctimes'][dataFileIndex] = fileInfo.st_ctime
+        self.dataFilePaths['inodes'][dataFileIndex] = fileInfo.st_ino
+        return changed
+
+    def GetManifestEntries(self, dataFileIndices):
+        """
+        Return (path, size, mtime, inode) tuples for the specified files,
+        as recorded in the scan manifest used for incremental scans
+        """
+        return [(self.GetDataFilePath(dfi), self.GetDataFileSize(dfi),
+                 self.GetDataFileMtime(dfi), self.GetDataFileInode(dfi))
+                for dfi in dataFileIndices]
+
+    def GetAbsPath(self):
+        """
+        Return the absolute path of the folder
+        """
+        if self.isExperimentFilesFolder:
+            return self.location
+        return os.path.join(self.location, self.folderName)
 
     def GetRelPath(self):
         """
@@ -230,10 +471,7 @@ class FolderModel(object):
         """
         Set created date
         """
-        if self.isExperimentFilesFolder:
-            absoluteFolderPath = self.location
-        else:
-            absoluteFolderPath = os.path.join(self.location, self.folderName)
+        absoluteFolderPath = self.GetAbsPath()
         self.dataViewFields['created'] = datetime.fromtimestamp(
             os.stat(absoluteFolderPath).st_ctime)\
             .strftime('%Y-%m-%d')
@@ -258,18 +496,7 @@ class FolderModel(object):
         Return True if file matches at least one pattern in the includes
         or excludes file.
         """
-        match = False
-        with open(includesOrExcludesFile, 'r') as patternsFile:
-            for glob in patternsFile.readlines():
-                glob = glob.decode('utf-8').strip()
-                if glob == "":
-                    continue
-                if glob.startswith(";"):
-                    continue
-                if glob.startswith("#"):
-                    continue
-                match = match or fnmatch(filename, glob)
-        return match
+        return GetPatternsFile(includesOrExcludesFile).MatchesFile(filename)
 
     @staticmethod
     def MatchesIncludes(filename):
@@ -296,8 +523,7 @@ class FolderModel(object):
         before its upload.
         """
         if SETTINGS.filters.ignoreNewFiles:
-            absoluteFilePath = self.GetDataFilePath(dataFileIndex)
-            tooNew = (time.time() - os.path.getmtime(absoluteFilePath)) <= \
+            tooNew = (time.time() - self.GetDataFileMtime(dataFileIndex)) <= \
                 (SETTINGS.filters.ignoreNewFilesMinutes * 60)
         else:
             tooNew = False
@@ -306,9 +532,69 @@ class FolderModel(object):
     def CalculateMd5Sum(self, dataFileIndex, progressCallback=None,
                         canceledCallback=None):
         """
-        Calculate MD5 checksum.
+        Calculate MD5 checksum, or reuse the checksum recorded in the
+        local checksum cache if the file hasn't changed since it was
+        last calculated.
+        """
+        checksumKey = self.GetChecksumKey(dataFileIndex)
+        md5sum = self.GetCachedMd5Sum(dataFileIndex, checksumKey)
+        if md5sum:
+            if progressCallback:
+                progressCallback(checksumKey[2])
+            return md5sum
+        md5sum = self.HashDataFile(
+            dataFileIndex, progressCallback, canceledCallback)
+        if md5sum:
+            self.CacheMd5Sum(dataFileIndex, checksumKey, md5sum)
+        return md5sum
+
+    def GetChecksumKey(self, dataFileIndex):
+        """
+        Return the key which identifies the current version of a data
+        file in the checksum cache (see ChecksumCache), or None
+        """
+        return ChecksumCache.GetChecksumKey(
+            self.GetDataFilePath(dataFileIndex))
+
+    def GetCachedMd5Sum(self, dataFileIndex, checksumKey=None):
+        """
+        Return the MD5 checksum recorded in the checksum cache for the
+        current version of a data file, or None
+        """
+        if not checksumKey:
+            checksumKey = self.GetChecksumKey(dataFileIndex)
+        if not checksumKey:
+            return None
+        md5sum = SETTINGS.checksumCache.GetMd5Sum(checksumKey)
+        if md5sum:
+            logger.debug("Using cached MD5 sum for %s"
+                         % self.GetDataFilePath(dataFileIndex))
+        return md5sum
+
+    def CacheMd5Sum(self, dataFileIndex, checksumKey, md5sum):
+        """
+        Record a data file's MD5 checksum in the checksum cache, where
+        checksumKey was the file's key (see GetChecksumKey) before it was
+        read.  The checksum is only cached if the file wasn't modified
+        while it was being read.
+        """
+        if checksumKey and checksumKey == self.GetChecksumKey(dataFileIndex):
+            SETTINGS.checksumCache.SetMd5Sum(checksumKey, md5sum)
+
+    def HashDataFile(self, dataFileIndex, progressCallback=None,
+                     canceledCallback=None):
+        """
+        Calculate MD5 checksum, in a worker process if the
+        hashing_processes setting is greater than 0.
         """
         absoluteFilePath = self.GetDataFilePath(dataFileIndex)
+        if SETTINGS.miscellaneous.hashingProcesses > 0:
+            md5sum = MD5_PROCESS_POOL.Md5Sum(
+                absoluteFilePath, progressCallback, canceledCallback)
+            if md5sum is None:
+                logger.debug("Aborting MD5 calculation for "
+                             "%s" % absoluteFilePath)
+            return md5sum
         fileSize = self.GetDataFileSize(dataFileIndex)
         md5 = hashlib.md5()
 
@@ -338,9 +624,10 @@ class FolderModel(object):
         """
         Reset counts of uploaded files etc.
         """
-        self.dataFilePaths['uploaded'] = []
-        for _ in range(0, self.numFiles):
-            self.dataFilePaths['uploaded'].append(False)
+        with self.uploadedLock:
+            self.dataFilePaths['uploaded'] = bytearray(self.numFiles)
+            self.numFilesUploaded = 0
+            self.numFilesVerified = 0
 
     @property
     def dataViewId(self):
@@ -349,6 +636,13 @@ class FolderModel(object):
         """
         return self.dataViewFields['dataViewId']
 
+    @dataViewId.setter
+    def dataViewId(self, dataViewId):
+        """
+        Set the row index in MyData's Folders view
+        """
+        self.dataViewFields['dataViewId'] = dataViewId
+
     @property
     def folderName(self):
         """
@@ -3,9 +3,9 @@ Model class for MyTardis API v1's GroupResource.
 See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 import urllib
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..logs import logger
 from ..utils.exceptions import DoesNotExist
 
@@ -46,7 +46,7 @@ class GroupModel(object):
         url = "%s/api/v1/group/?format=json&name=%s" \
             % (SETTINGS.general.myTardisUrl,
                urllib.quote(name.encode('utf-8')))
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         groupsJson = response.json()
         numGroupsFound = groupsJson['meta']['total_count']
@@ -58,3 +58,35 @@ class GroupModel(object):
         else:
             logger.debug("Found group record for name '" + name + "'.")
             return GroupModel(name=name, groupJson=groupsJson['objects'][0])
+
+    @staticmethod
+    def GetGroupForFolder(groupFolderName):
+        """
+        Return the group record for a user group folder, whose name is
+        the group name without the group prefix
+
+        If the lookup_cache_minutes setting is non-zero, the result of
+        looking up the folder (including not finding it) is reused until
+        it is that many minutes old.
+
+        :raises requests.exceptions.HTTPError:
+        """
+        name = SETTINGS.advanced.groupPrefix + groupFolderName
+        maxAge = SETTINGS.miscellaneous.lookupCacheMinutes * 60
+        cache = SETTINGS.lookupCache
+        found, groupJson = cache.GetFolderLookup("group", name, maxAge)
+        if found:
+            if groupJson is None:
+                raise DoesNotExist(
+                    message="Group \"%s\" was recently not found in "
+                    "MyTardis" % name)
+            return GroupModel(name=name, groupJson=groupJson)
+        try:
+            groupRecord = GroupModel.GetGroupByName(name)
+        except DoesNotExist:
+            if maxAge > 0:
+                cache.SetFolderLookup("group", name, None)
+            raise
+        if maxAge > 0:
+            cache.SetFolderLookup("group", name, groupRecord.groupJson)
+        return groupRecord
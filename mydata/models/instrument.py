@@ -5,9 +5,9 @@ See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 
 import json
 import urllib
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..logs import logger
 from ..utils.exceptions import DoesNotExist
 from ..utils.exceptions import DuplicateKey
@@ -43,8 +43,7 @@ class InstrumentModel(object):
             "facility": facility.resourceUri,
             "name": name}
         data = json.dumps(instrumentJson)
-        headers = SETTINGS.defaultHeaders
-        response = requests.post(headers=headers, url=url, data=data)
+        response = MYTARDIS_API.Post(url, SETTINGS, data=data)
         response.raise_for_status()
         instrumentJson = response.json()
         return InstrumentModel(name=name, instrumentJson=instrumentJson)
@@ -59,7 +58,7 @@ class InstrumentModel(object):
         url = "%s/api/v1/instrument/?format=json&facility__id=%s&name=%s" \
             % (SETTINGS.general.myTardisUrl, facility.facilityId,
                urllib.quote(name.encode('utf-8')))
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         instrumentsJson = response.json()
         numInstrumentsFound = \
@@ -114,7 +113,6 @@ class InstrumentModel(object):
             % (SETTINGS.general.myTardisUrl, self.instrumentId)
         uploaderJson = {"name": name}
         data = json.dumps(uploaderJson)
-        headers = SETTINGS.defaultHeaders
-        response = requests.put(headers=headers, url=url, data=data)
+        response = MYTARDIS_API.Put(url, SETTINGS, data=data)
         response.raise_for_status()
         logger.info("Renaming instrument succeeded.")
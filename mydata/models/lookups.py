@@ -0,0 +1,109 @@
+"""
+Model class for the local cache of MyTardis record lookups.
+
+The cache records the ID of the dataset found (or created) for each
+dataset folder name within each experiment, so later runs can fetch the
+dataset directly by its ID (see ResolutionCache), and the results of
+looking up user and group folders' MyTardis records, so they can be
+reused until they expire (see the lookup_cache_minutes setting).
+
+Like the verified DataFiles cache, the lookup cache is stored in an
+SQLite database, with a separate database for each MyTardis server.
+"""
+import json
+import time
+
+from ..threads.locks import LOCKS
+from .cache import SqliteCache
+
+
+class LookupCache(SqliteCache):
+    """
+    Model class for the local cache of MyTardis record lookups.
+    """
+    tables = (
+        "CREATE TABLE IF NOT EXISTS dataset_ids ("
+        "experiment_id INTEGER NOT NULL, "
+        "folder_name TEXT NOT NULL, "
+        "instrument_id INTEGER NOT NULL, "
+        "dataset_id INTEGER NOT NULL, "
+        "PRIMARY KEY (experiment_id, folder_name, instrument_id))",
+        "CREATE TABLE IF NOT EXISTS folder_lookups ("
+        "kind TEXT NOT NULL, "
+        "name TEXT NOT NULL, "
+        "record TEXT, "
+        "lookup_time REAL NOT NULL, "
+        "PRIMARY KEY (kind, name))")
+
+    def __init__(self):
+        super(LookupCache, self).__init__(LOCKS.updateLookupCache)
+
+    def GetDatasetId(self, experimentId, folderName, instrumentId):
+        """
+        Return the ID of the dataset previously found (or created) for
+        the dataset folder named folderName within the experiment with ID
+        experimentId, or None if there isn't one.
+        """
+        folderName = LookupCache.Decode(folderName)
+        with self.lock:
+            if not self.connection:
+                return None
+            row = self.connection.execute(
+                "SELECT dataset_id FROM dataset_ids "
+                "WHERE experiment_id = ? AND folder_name = ? "
+                "AND instrument_id = ?",
+                (experimentId, folderName, instrumentId)).fetchone()
+            return row[0] if row else None
+
+    def SetDatasetId(self, experimentId, folderName, instrumentId, datasetId):
+        """
+        Record the ID of the dataset found (or created) for the dataset
+        folder named folderName within the experiment with ID experimentId
+        """
+        folderName = LookupCache.Decode(folderName)
+        with self.lock:
+            if not self.connection:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO dataset_ids "
+                "(experiment_id, folder_name, instrument_id, dataset_id) "
+                "VALUES (?, ?, ?, ?)",
+                (experimentId, folderName, instrumentId, datasetId))
+            self.connection.commit()
+
+    def GetFolderLookup(self, kind, name, maxAge):
+        """
+        Return a (found, record) tuple for the lookup of a user or group
+        folder's MyTardis record, e.g. kind="username", where found is True
+        if the lookup was recorded less than maxAge seconds ago, and record
+        is the record's JSON, or None if no MyTardis record was found.
+        """
+        name = LookupCache.Decode(name)
+        with self.lock:
+            if not self.connection or maxAge <= 0:
+                return False, None
+            row = self.connection.execute(
+                "SELECT record FROM folder_lookups "
+                "WHERE kind = ? AND name = ? AND lookup_time > ?",
+                (kind, name, time.time() - maxAge)).fetchone()
+        if not row:
+            return False, None
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def SetFolderLookup(self, kind, name, record):
+        """
+        Record the result of looking up a user or group folder's MyTardis
+        record, where record is the record's JSON, or None if no MyTardis
+        record was found.
+        """
+        name = LookupCache.Decode(name)
+        if record is not None:
+            record = json.dumps(record)
+        with self.lock:
+            if not self.connection:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO folder_lookups "
+                "(kind, name, record, lookup_time) VALUES (?, ?, ?, ?)",
+                (kind, name, record, time.time()))
+            self.connection.commit()
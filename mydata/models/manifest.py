@@ -0,0 +1,176 @@
+"""
+Model class for the persistent manifest of scanned files, used for
+incremental scans.
+
+For each dataset folder, the manifest records each file's path, size,
+modified time and inode, along with the ID of the dataset the file was
+looked up in and the outcome of the file's last lookup on MyTardis.  When
+incremental scans are enabled, files which haven't changed since they
+were last found to be verified in the folder's current dataset aren't
+looked up again.  A file is looked up again if the folder is now mapped to
+a different dataset, e.g. if its experiment mapping has changed, or its
+dataset was deleted and recreated on MyTardis.
+
+Once all of a folder's files have been found to be verified, the folder's
+fingerprint (see FolderModel.GetFingerprint) is recorded too, so a later
+scan can mark the whole folder as uploaded in one step if its fingerprint
+hasn't changed and it is still mapped to the same dataset.
+
+Like the verified DataFiles cache, the manifest is stored in an SQLite
+database, with a separate database for each MyTardis server.
+"""
+import sqlite3
+
+from ..threads.locks import LOCKS
+from .cache import SqliteCache
+from .verification import VerificationStatus
+
+# Manifests written with an earlier schema are discarded when they are
+# opened, which just means that their folders' files are looked up again:
+SCHEMA_VERSION = 2
+
+# The maximum number of paths in each FindUnchanged query, which must be
+# less than SQLite's limit on the number of host parameters in a statement:
+FIND_UNCHANGED_BATCH_SIZE = 500
+
+
+class ScanManifest(SqliteCache):
+    """
+    Model class for the persistent manifest of scanned files.
+    """
+    tables = (
+        "CREATE TABLE IF NOT EXISTS scanned_files ("
+        "folder TEXT NOT NULL, "
+        "dataset_id INTEGER NOT NULL, "
+        "path TEXT NOT NULL, "
+        "size INTEGER NOT NULL, "
+        "mtime REAL NOT NULL, "
+        "inode INTEGER NOT NULL, "
+        "status INTEGER NOT NULL, "
+        "PRIMARY KEY (folder, dataset_id, path))",
+        "CREATE TABLE IF NOT EXISTS folder_fingerprints ("
+        "folder TEXT PRIMARY KEY, "
+        "fingerprint TEXT NOT NULL, "
+        "dataset_id INTEGER)")
+
+    def __init__(self):
+        super(ScanManifest, self).__init__(LOCKS.updateManifest)
+
+    def Open(self, path):
+        """
+        Open (or create) the manifest database at path, closing any
+        manifest database which is already open.
+
+        The tables of a manifest written with an earlier schema are
+        dropped, before they are recreated by SqliteCache.Open.
+        """
+        self.Close()
+        with self.lock:
+            connection = sqlite3.connect(path)
+            try:
+                schemaVersion = connection.execute(
+                    "PRAGMA user_version").fetchone()[0]
+                if schemaVersion < SCHEMA_VERSION:
+                    connection.execute("DROP TABLE IF EXISTS scanned_files")
+                    connection.execute(
+                        "DROP TABLE IF EXISTS folder_fingerprints")
+                    connection.execute(
+                        "PRAGMA user_version = %d" % SCHEMA_VERSION)
+                    connection.commit()
+            finally:
+                connection.close()
+        super(ScanManifest, self).Open(path)
+
+    def FindUnchanged(self, folder, datasetId, files):
+        """
+        Return the indices of the files which haven't changed since they
+        were last found to be verified in the dataset with ID datasetId.
+
+        The files argument is a list of (path, size, mtime, inode) tuples
+        for files within the folder whose absolute path is folder.  Only
+        these files' paths are queried, using one query per
+        FIND_UNCHANGED_BATCH_SIZE files, so checking a large folder's files
+        in batches doesn't fetch all of the folder's entries for each batch.
+        """
+        folder = ScanManifest.Decode(folder)
+        paths = [ScanManifest.Decode(path) for path, _, _, _ in files]
+        entries = dict()
+        with self.lock:
+            if not self.connection:
+                return []
+            for start in range(0, len(paths), FIND_UNCHANGED_BATCH_SIZE):
+                batch = paths[start:start + FIND_UNCHANGED_BATCH_SIZE]
+                query = (
+                    "SELECT path, size, mtime, inode FROM scanned_files "
+                    "WHERE folder = ? AND dataset_id = ? AND status = ? "
+                    "AND path IN (%s)" % ", ".join("?" * len(batch)))
+                for path, size, mtime, inode in self.connection.execute(
+                        query, [folder, datasetId,
+                                VerificationStatus.FOUND_VERIFIED] + batch):
+                    entries[path] = (size, mtime, inode)
+        if not entries:
+            return []
+        return [index for index, (path, (_, size, mtime, inode))
+                in enumerate(zip(paths, files))
+                if entries.get(path) == (size, mtime, inode)]
+
+    def Record(self, folder, datasetId, files, status):
+        """
+        Record the outcome of looking up files in the dataset with ID
+        datasetId on MyTardis.
+
+        The files argument is a list of (path, size, mtime, inode) tuples
+        for files within the folder whose absolute path is folder, and
+        status is a VerificationStatus value.
+        """
+        folder = ScanManifest.Decode(folder)
+        rows = [(folder, datasetId, ScanManifest.Decode(path), size, mtime,
+                 inode, status) for path, size, mtime, inode in files]
+        with self.lock:
+            if not self.connection or not rows:
+                return
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO scanned_files "
+                "(folder, dataset_id, path, size, mtime, inode, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+
+    def GetFingerprint(self, folder, datasetId):
+        """
+        Return the fingerprint recorded for the folder whose absolute path
+        is folder when all of its files were last found to be verified in
+        the dataset with ID datasetId, or None if no fingerprint has been
+        recorded for that dataset.
+        """
+        folder = ScanManifest.Decode(folder)
+        with self.lock:
+            if not self.connection:
+                return None
+            row = self.connection.execute(
+                "SELECT fingerprint FROM folder_fingerprints "
+                "WHERE folder = ? AND dataset_id = ?",
+                (folder, datasetId)).fetchone()
+            return row[0] if row else None
+
+    def RecordFingerprint(self, folder, fingerprint, datasetId):
+        """
+        Record the fingerprint of the folder whose absolute path is folder,
+        whose files have all been found to be verified in the dataset with
+        ID datasetId.
+        """
+        folder = ScanManifest.Decode(folder)
+        with self.lock:
+            if not self.connection:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO folder_fingerprints "
+                "(folder, fingerprint, dataset_id) VALUES (?, ?, ?)",
+                (folder, fingerprint, datasetId))
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            if not self.connection:
+                return 0
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM scanned_files").fetchone()[0]
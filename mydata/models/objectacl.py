@@ -4,9 +4,9 @@ See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 
 import json
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..logs import logger
 
 
@@ -39,8 +39,8 @@ class ObjectAclModel(object):
             "expiryDate": None}
 
         url = myTardisUrl + "/api/v1/objectacl/"
-        response = requests.post(headers=SETTINGS.defaultHeaders, url=url,
-                                 data=json.dumps(objectAclJson))
+        response = MYTARDIS_API.Post(
+            url, SETTINGS, data=json.dumps(objectAclJson))
         response.raise_for_status()
         logger.debug("Shared experiment with user " + user.username + ".")
 
@@ -69,7 +69,7 @@ class ObjectAclModel(object):
             "expiryDate": None}
 
         url = myTardisUrl + "/api/v1/objectacl/"
-        response = requests.post(headers=SETTINGS.defaultHeaders, url=url,
-                                 data=json.dumps(objectAclJson))
+        response = MYTARDIS_API.Post(
+            url, SETTINGS, data=json.dumps(objectAclJson))
         response.raise_for_status()
         logger.debug("Shared experiment with group " + group.name + ".")
@@ -3,9 +3,9 @@ Model class for MyTardis API v1's ReplicaResource.
 See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..utils import UnderscoreToCamelcase
 
 
@@ -42,7 +42,7 @@ class ReplicaModel(object):
         """
         url = "%s/api/v1/mydata_replica/%s/?format=json" \
             % (SETTINGS.general.myTardisUrl, dfoId)
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         dfoJson = response.json()
         return dfoJson['size']
@@ -0,0 +1,109 @@
+"""
+Caches the experiment and dataset records which MyData finds (or creates)
+on MyTardis for each dataset folder, so that folders which share an
+experiment only look it up once per scan.
+
+Each lookup is protected by a lock for its own key, rather than by one
+global lock, so verification threads looking up different experiments or
+datasets don't block each other, while threads looking up the same
+experiment still can't create duplicate experiment records.
+
+Dataset IDs are also recorded in the lookup cache (see LookupCache),
+so a later run can fetch a folder's dataset directly by its ID, instead of
+searching for it.
+"""
+from requests.exceptions import HTTPError
+
+from ..settings import SETTINGS
+from ..threads.flags import FLAGS
+from ..threads.locks import KeyedLocks
+from ..logs import logger
+from ..utils.exceptions import DoesNotExist
+from .experiment import ExperimentModel
+from .dataset import DatasetModel
+
+
+class ResolutionCache(object):
+    """
+    Caches experiment and dataset lookups for the current scan.
+    """
+    def __init__(self):
+        self.experimentLocks = KeyedLocks()
+        self.datasetLocks = KeyedLocks()
+        self.experiments = dict()
+        self.datasets = dict()
+
+    def Reset(self):
+        """
+        Forget the experiments and datasets found by the previous scan,
+        which may have been modified on the server since then.
+        """
+        self.experimentLocks.Clear()
+        self.datasetLocks.Clear()
+        self.experiments.clear()
+        self.datasets.clear()
+
+    @staticmethod
+    def GetExperimentKey(folderModel):
+        """
+        Folders with the same experiment key are assigned to the same
+        experiment by ExperimentModel.GetOrCreateExperimentForFolder
+        """
+        return (folderModel.experimentTitle,
+                SETTINGS.advanced.folderStructure,
+                folderModel.userFolderName, folderModel.groupFolderName)
+
+    def GetOrCreateExperiment(self, folderModel):
+        """
+        Return the experiment for folderModel, looking it up on MyTardis
+        (or creating it) if no folder with the same experiment key has
+        been looked up during this scan.
+        """
+        if FLAGS.testRunRunning:
+            # Test runs log each folder's experiment lookup:
+            return ExperimentModel.GetOrCreateExperimentForFolder(folderModel)
+        key = ResolutionCache.GetExperimentKey(folderModel)
+        with self.experimentLocks.Get(key):
+            experimentModel = self.experiments.get(key)
+            if experimentModel is None:
+                experimentModel = \
+                    ExperimentModel.GetOrCreateExperimentForFolder(
+                        folderModel)
+                if experimentModel is not None:
+                    self.experiments[key] = experimentModel
+            return experimentModel
+
+    def GetOrCreateDataset(self, folderModel):
+        """
+        Return the dataset for folderModel, whose experimentModel must
+        already be set.  The dataset ID recorded by a previous run is
+        tried before searching for the dataset (or creating it).
+        """
+        if FLAGS.testRunRunning:
+            return DatasetModel.CreateDatasetIfNecessary(folderModel)
+        experimentId = folderModel.experimentModel.experimentId
+        instrumentId = SETTINGS.general.instrument.instrumentId
+        key = (experimentId, folderModel.folderName, instrumentId)
+        with self.datasetLocks.Get(key):
+            datasetModel = self.datasets.get(key)
+            if datasetModel is not None:
+                return DatasetModel(datasetModel.json)
+            cache = SETTINGS.lookupCache
+            datasetId = cache.GetDatasetId(*key)
+            if datasetId is not None:
+                try:
+                    datasetModel = \
+                        DatasetModel.GetDatasetById(datasetId, folderModel)
+                except (DoesNotExist, HTTPError) as err:
+                    logger.debug(str(err))
+            if datasetModel is None:
+                datasetModel = DatasetModel.CreateDatasetIfNecessary(
+                    folderModel)
+                cache.SetDatasetId(
+                    experimentId, folderModel.folderName, instrumentId,
+                    datasetModel.datasetId)
+            self.datasets[key] = datasetModel
+            return datasetModel
+
+
+RESOLUTION_CACHE = ResolutionCache()
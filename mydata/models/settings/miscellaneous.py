@@ -54,7 +54,20 @@ class MiscellaneousSettingsModel(BaseSettingsModel):
             'progress_poll_interval',
             'immutable_datasets',
             'cache_datafile_lookups',
-            'connection_timeout'
+            'connection_timeout',
+            'bulk_datafile_lookups',
+            'max_scan_threads',
+            'stream_folder_scans',
+            'incremental_scans',
+            'watch_data_directory',
+            'lookup_cache_minutes',
+            'ssh_connection_sharing',
+            'batch_small_file_uploads',
+            'sftp_uploads',
+            'max_hashing_threads',
+            'hashing_processes',
+            'hash_while_uploading',
+            'fadvise_local_copies'
         ]
 
         self.default = dict(
@@ -68,7 +81,20 @@ class MiscellaneousSettingsModel(BaseSettingsModel):
             progress_poll_interval=1.0,
             immutable_datasets=False,
             cache_datafile_lookups=True,
-            connection_timeout=10.0)
+            connection_timeout=10.0,
+            bulk_datafile_lookups=False,
+            max_scan_threads=4,
+            stream_folder_scans=False,
+            incremental_scans=False,
+            watch_data_directory=False,
+            lookup_cache_minutes=0,
+            ssh_connection_sharing=False,
+            batch_small_file_uploads=False,
+            sftp_uploads=False,
+            max_hashing_threads=0,
+            hashing_processes=0,
+            hash_while_uploading=False,
+            fadvise_local_copies=False)
 
         # Settings determined from command-line arguments of the
         # MyData binary or the run.py entry point which are
@@ -243,6 +269,229 @@ class MiscellaneousSettingsModel(BaseSettingsModel):
         """
         self.mydataConfig['connection_timeout'] = connectionTimeout
 
+    @property
+    def bulkDataFileLookups(self):
+        """
+        Returns True if MyData will look up all of a dataset's DataFiles
+        in one paginated query, instead of querying once for each file.
+        """
+        return self.mydataConfig['bulk_datafile_lookups']
+
+    @bulkDataFileLookups.setter
+    def bulkDataFileLookups(self, bulkDataFileLookups):
+        """
+        Set this to True if MyData should look up all of a dataset's
+        DataFiles in one paginated query, instead of querying once for
+        each file.
+        """
+        self.mydataConfig['bulk_datafile_lookups'] = bulkDataFileLookups
+
+    @property
+    def maxScanThreads(self):
+        """
+        Return the maximum number of folders scanned concurrently
+        """
+        return int(self.mydataConfig['max_scan_threads'])
+
+    @maxScanThreads.setter
+    def maxScanThreads(self, maxScanThreads):
+        """
+        Set the maximum number of folders scanned concurrently
+        """
+        self.mydataConfig['max_scan_threads'] = maxScanThreads
+
+    @property
+    def streamFolderScans(self):
+        """
+        Returns True if MyData will start looking up each dataset folder's
+        files on MyTardis while the folder is still being scanned, rather
+        than waiting until all of its files have been found.
+        """
+        return self.mydataConfig['stream_folder_scans']
+
+    @streamFolderScans.setter
+    def streamFolderScans(self, streamFolderScans):
+        """
+        Set this to True if MyData should start looking up each dataset
+        folder's files on MyTardis while the folder is still being scanned.
+        """
+        self.mydataConfig['stream_folder_scans'] = streamFolderScans
+
+    @property
+    def incrementalScans(self):
+        """
+        Returns True if MyData will skip looking up files which haven't changed
+        since they were last found to be verified on MyTardis, according to its
+        scan manifest.
+        """
+        return self.mydataConfig['incremental_scans']
+
+    @incrementalScans.setter
+    def incrementalScans(self, incrementalScans):
+        """
+        Set this to True if MyData should skip looking up files which haven't
+        changed since they were last found to be verified on MyTardis.
+        """
+        self.mydataConfig['incremental_scans'] = incrementalScans
+
+    @property
+    def watchDataDirectory(self):
+        """
+        Returns True if MyData will watch its data directory for new files (on
+        Linux), uploading them as they are written, in between its scheduled
+        scans.
+        """
+        return self.mydataConfig['watch_data_directory']
+
+    @watchDataDirectory.setter
+    def watchDataDirectory(self, watchDataDirectory):
+        """
+        Set this to True if MyData should watch its data directory for new
+        files (on Linux), uploading them as they are written.
+        """
+        self.mydataConfig['watch_data_directory'] = watchDataDirectory
+
+    @property
+    def lookupCacheMinutes(self):
+        """
+        How many minutes MyData can reuse the results of looking up user
+        and group folders' MyTardis records (including folders which weren't
+        found), before looking them up again.  The default (0) looks them up
+        on every scan.
+        """
+        return int(self.mydataConfig['lookup_cache_minutes'])
+
+    @lookupCacheMinutes.setter
+    def lookupCacheMinutes(self, lookupCacheMinutes):
+        """
+        Set how many minutes MyData can reuse the results of looking up user
+        and group folders' MyTardis records
+        """
+        self.mydataConfig['lookup_cache_minutes'] = lookupCacheMinutes
+
+    @property
+    def sshConnectionSharing(self):
+        """
+        Whether each upload thread should keep one SSH connection open to
+        the staging server for its remote mkdir, scp and chmod commands
+        (OpenSSH's ControlMaster), rather than authenticating each command
+        separately.  Not supported on Windows.
+        """
+        return self.mydataConfig['ssh_connection_sharing']
+
+    @sshConnectionSharing.setter
+    def sshConnectionSharing(self, sshConnectionSharing):
+        """
+        Set whether each upload thread should share one SSH connection for
+        its staging upload commands
+        """
+        self.mydataConfig['ssh_connection_sharing'] = sshConnectionSharing
+
+    @property
+    def batchSmallFileUploads(self):
+        """
+        Whether small files uploaded via staging should be uploaded in
+        batches, by streaming each batch through a tar archive over a single
+        SSH connection, rather than uploading each file with its own scp
+        command.
+        """
+        return self.mydataConfig['batch_small_file_uploads']
+
+    @batchSmallFileUploads.setter
+    def batchSmallFileUploads(self, batchSmallFileUploads):
+        """
+        Set whether small files uploaded via staging should be uploaded in
+        batches
+        """
+        self.mydataConfig['batch_small_file_uploads'] = batchSmallFileUploads
+
+    @property
+    def sftpUploads(self):
+        """
+        Whether files uploaded via staging should be uploaded with MyData's
+        built-in SFTP client (using a pool of SSH connections), rather than
+        by running scp and ssh commands.
+        """
+        return self.mydataConfig['sftp_uploads']
+
+    @sftpUploads.setter
+    def sftpUploads(self, sftpUploads):
+        """
+        Set whether files uploaded via staging should be uploaded with
+        MyData's built-in SFTP client
+        """
+        self.mydataConfig['sftp_uploads'] = sftpUploads
+
+    @property
+    def maxHashingThreads(self):
+        """
+        Return the maximum number of files whose MD5 checksums are
+        calculated concurrently, ahead of their uploads.  If 0, each upload
+        thread calculates its own file's checksum before uploading it.
+        """
+        return int(self.mydataConfig['max_hashing_threads'])
+
+    @maxHashingThreads.setter
+    def maxHashingThreads(self, maxHashingThreads):
+        """
+        Set the maximum number of files whose MD5 checksums are
+        calculated concurrently, ahead of their uploads
+        """
+        self.mydataConfig['max_hashing_threads'] = maxHashingThreads
+
+    @property
+    def hashingProcesses(self):
+        """
+        Return the number of worker processes used to calculate MD5
+        checksums, so that many files can be hashed in parallel across CPU
+        cores.  If 0, checksums are calculated in MyData's own process.
+        """
+        return int(self.mydataConfig['hashing_processes'])
+
+    @hashingProcesses.setter
+    def hashingProcesses(self, hashingProcesses):
+        """
+        Set the number of worker processes used to calculate MD5 checksums
+        """
+        self.mydataConfig['hashing_processes'] = hashingProcesses
+
+    @property
+    def hashWhileUploading(self):
+        """
+        Returns True if MyData calculates each file's MD5 checksum while
+        uploading it to staging with its built-in SFTP client, rather than
+        reading the file once to calculate its checksum and again to
+        upload it.  The checksum is added to the DataFile record before
+        its verification is requested.
+        """
+        return self.mydataConfig['hash_while_uploading']
+
+    @hashWhileUploading.setter
+    def hashWhileUploading(self, hashWhileUploading):
+        """
+        Set whether MyData calculates each file's MD5 checksum while
+        uploading it to staging with its built-in SFTP client
+        """
+        self.mydataConfig['hash_while_uploading'] = hashWhileUploading
+
+    @property
+    def fadviseLocalCopies(self):
+        """
+        Returns True if MyData advises the kernel (with posix_fadvise) that
+        it reads each file sequentially when copying it to a locally
+        mounted storage box, and won't read it again, so copying large
+        files doesn't evict other data from the page cache
+        """
+        return self.mydataConfig['fadvise_local_copies']
+
+    @fadviseLocalCopies.setter
+    def fadviseLocalCopies(self, fadviseLocalCopies):
+        """
+        Set whether MyData uses posix_fadvise when copying files to a
+        locally mounted storage box
+        """
+        self.mydataConfig['fadvise_local_copies'] = fadviseLocalCopies
+
     def SetDefaultForField(self, field):
         """
         Set default value for one field.
@@ -3,7 +3,6 @@ Model class for the settings displayed in the settings dialog
 and saved to disk in MyData.cfg
 """
 import os
-import pickle
 import traceback
 import urlparse
 
@@ -11,6 +10,10 @@ from ...constants import APPNAME
 from ...logs import logger
 from ...threads.locks import LOCKS
 from ...utils import CreateConfigPathIfNecessary
+from ..cache import VerifiedDatafilesCache
+from ..checksums import ChecksumCache
+from ..lookups import LookupCache
+from ..manifest import ScanManifest
 from .general import GeneralSettingsModel
 from .schedule import ScheduleSettingsModel
 from .filters import FiltersSettingsModel
@@ -42,7 +45,10 @@ class SettingsModel(object):
         # "/Users/jsmith/Library/Application Support/MyData/MyData.cfg":
         self._configPath = configPath
 
-        self.verifiedDatafilesCache = dict()
+        self.verifiedDatafilesCache = VerifiedDatafilesCache()
+        self.lookupCache = LookupCache()
+        self.checksumCache = ChecksumCache()
+        self.scanManifest = ScanManifest()
 
         self._uploaderModel = None
 
@@ -258,43 +264,142 @@ class SettingsModel(object):
     @property
     def verifiedDatafilesCachePath(self):
         """
-        We use a serialized dictionary to cache DataFile lookup results.
+        We use an SQLite database to cache DataFile lookup results.
         We'll use a separate cache file for each MyTardis server we connect to.
         """
         parsed = urlparse.urlparse(self.general.myTardisUrl)
         return os.path.join(
             os.path.dirname(self.configPath),
-            "verified-files-%s-%s.pkl" %
+            "verified-files-%s-%s.db" %
+            (parsed.scheme, parsed.netloc))
+
+    @property
+    def legacyVerifiedDatafilesCachePath(self):
+        """
+        Older versions of MyData used a serialized dictionary to cache
+        DataFile lookup results.
+        """
+        return os.path.splitext(self.verifiedDatafilesCachePath)[0] + ".pkl"
+
+    @property
+    def lookupCachePath(self):
+        """
+        We use an SQLite database to cache MyTardis record lookups.
+        We'll use a separate cache file for each MyTardis server we connect to.
+        """
+        parsed = urlparse.urlparse(self.general.myTardisUrl)
+        return os.path.join(
+            os.path.dirname(self.configPath),
+            "lookups-%s-%s.db" %
+            (parsed.scheme, parsed.netloc))
+
+    @property
+    def checksumCachePath(self):
+        """
+        We use an SQLite database to cache local files' MD5 checksums,
+        which is shared by all of the MyTardis servers we connect to.
+        """
+        return os.path.join(
+            os.path.dirname(self.configPath), "checksums.db")
+
+    @property
+    def scanManifestPath(self):
+        """
+        The manifest of scanned files used for incremental scans.
+        We'll use a separate manifest for each MyTardis server we connect to.
+        """
+        parsed = urlparse.urlparse(self.general.myTardisUrl)
+        return os.path.join(
+            os.path.dirname(self.configPath),
+            "scan-manifest-%s-%s.db" %
             (parsed.scheme, parsed.netloc))
 
     def InitializeVerifiedDatafilesCache(self):
         """
-        We use a serialized dictionary to cache DataFile lookup results.
+        We use an SQLite database to cache DataFile lookup results.
         We'll use a separate cache file for each MyTardis server we connect to.
         """
         try:
-            if os.path.exists(self.verifiedDatafilesCachePath):
-                with open(self.verifiedDatafilesCachePath, 'rb') as cacheFile:
-                    self.verifiedDatafilesCache = pickle.load(cacheFile)
-            else:
-                self.verifiedDatafilesCache = dict()
+            self.verifiedDatafilesCache.Open(
+                self.verifiedDatafilesCachePath,
+                legacyPicklePath=self.legacyVerifiedDatafilesCachePath)
         except:
-            self.verifiedDatafilesCache = dict()
+            self.verifiedDatafilesCache.Close()
             logger.warning(traceback.format_exc())
 
-    def SaveVerifiedDatafilesCache(self):
+    def CloseVerifiedDatafilesCache(self):
         """
-        We use a serialized dictionary to cache DataFile lookup results.
-        We'll use a separate cache file for each MyTardis server we connect to.
+        Cache entries are committed as they are added, so closing the
+        cache doesn't need to write out the whole cache.
+        """
+        try:
+            self.verifiedDatafilesCache.Close()
+        except:
+            logger.warning("Couldn't close verified datafiles cache.")
+            logger.warning(traceback.format_exc())
+
+    def InitializeLookupCache(self):
+        """
+        Open the cache of MyTardis record lookups
         """
-        with LOCKS.closeCache:
-            try:
-                with open(self.verifiedDatafilesCachePath,
-                          'wb') as cacheFile:
-                    pickle.dump(self.verifiedDatafilesCache, cacheFile)
-            except:
-                logger.warning("Couldn't save verified datafiles cache.")
-                logger.warning(traceback.format_exc())
+        try:
+            self.lookupCache.Open(self.lookupCachePath)
+        except:
+            self.lookupCache.Close()
+            logger.warning(traceback.format_exc())
+
+    def CloseLookupCache(self):
+        """
+        Cache entries are committed as they are added, so closing the
+        cache doesn't need to write anything out.
+        """
+        try:
+            self.lookupCache.Close()
+        except:
+            logger.warning("Couldn't close lookup cache.")
+            logger.warning(traceback.format_exc())
+
+    def InitializeChecksumCache(self):
+        """
+        Open the cache of local files' MD5 checksums
+        """
+        try:
+            self.checksumCache.Open(self.checksumCachePath)
+        except:
+            self.checksumCache.Close()
+            logger.warning(traceback.format_exc())
+
+    def CloseChecksumCache(self):
+        """
+        Cache entries are committed as they are added, so closing the
+        cache doesn't need to write anything out.
+        """
+        try:
+            self.checksumCache.Close()
+        except:
+            logger.warning("Couldn't close checksum cache.")
+            logger.warning(traceback.format_exc())
+
+    def InitializeScanManifest(self):
+        """
+        Open the manifest of scanned files used for incremental scans
+        """
+        try:
+            self.scanManifest.Open(self.scanManifestPath)
+        except:
+            self.scanManifest.Close()
+            logger.warning(traceback.format_exc())
+
+    def CloseScanManifest(self):
+        """
+        Manifest entries are committed as they are recorded, so closing
+        the manifest doesn't need to write anything out.
+        """
+        try:
+            self.scanManifest.Close()
+        except:
+            logger.warning("Couldn't close scan manifest.")
+            logger.warning(traceback.format_exc())
 
     @property
     def configPath(self):
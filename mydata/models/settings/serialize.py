@@ -222,17 +222,30 @@ def LoadMiscellaneousSettings(settings, configParser):
     fields = ["locked", "uuid", "cipher", "use_none_cipher",
               "max_verification_threads", "verification_delay",
               "fake_md5_sum", "progress_poll_interval", "immutable_datasets",
-              "cache_datafile_lookups", "connection_timeout"]
+              "cache_datafile_lookups", "connection_timeout",
+              "bulk_datafile_lookups", "max_scan_threads",
+              "stream_folder_scans", "incremental_scans",
+              "watch_data_directory", "lookup_cache_minutes",
+              "ssh_connection_sharing", "batch_small_file_uploads",
+              "sftp_uploads", "max_hashing_threads",
+              "hashing_processes", "hash_while_uploading",
+              "fadvise_local_copies"]
     for field in fields:
         if configParser.has_option(configFileSection, field):
             settings[field] = configParser.get(configFileSection, field)
     booleanFields = [
         "fake_md5_sum", "use_none_cipher", "locked", "immutable_datasets",
-        "cache_datafile_lookups"]
+        "cache_datafile_lookups", "bulk_datafile_lookups",
+        "stream_folder_scans", "incremental_scans",
+        "watch_data_directory", "ssh_connection_sharing",
+        "batch_small_file_uploads", "sftp_uploads",
+        "hash_while_uploading", "fadvise_local_copies"]
     for field in booleanFields:
         if configParser.has_option(configFileSection, field):
             settings[field] = configParser.getboolean(configFileSection, field)
-    intFields = ["max_verification_threads"]
+    intFields = ["max_verification_threads", "max_scan_threads",
+                 "lookup_cache_minutes", "max_hashing_threads",
+                 "hashing_processes"]
     for field in intFields:
         if configParser.has_option(configFileSection, field):
             settings[field] = configParser.getint(configFileSection, field)
@@ -282,14 +295,20 @@ def CheckForUpdatedSettingsOnServer(settings):
                         "friday_checked", "saturday_checked",
                         "sunday_checked", "use_includes_file",
                         "use_excludes_file", "immutable_datasets",
-                        "cache_datafile_lookups"):
+                        "cache_datafile_lookups", "bulk_datafile_lookups",
+                        "stream_folder_scans", "incremental_scans",
+                        "watch_data_directory", "ssh_connection_sharing",
+                        "batch_small_file_uploads", "sftp_uploads",
+                        "hash_while_uploading", "fadvise_local_copies"):
                     settings[setting['key']] = (setting['value'] == "True")
                 if setting['key'] in (
                         "timer_minutes", "ignore_interval_number",
                         "ignore_new_interval_number",
                         "ignore_new_files_minutes",
                         "max_verification_threads",
-                        "max_upload_threads", "max_upload_retries"):
+                        "max_upload_threads", "max_upload_retries",
+                        "max_scan_threads", "lookup_cache_minutes",
+                        "max_hashing_threads", "hashing_processes"):
                     settings[setting['key']] = int(setting['value'])
                 elif setting['key'] in (
                         "progress_poll_interval", "verification_delay",
@@ -356,7 +375,13 @@ def SaveSettingsToDisk(configPath=None):
                   "progress_poll_interval", "verification_delay",
                   "start_automatically_on_login", "immutable_datasets",
                   "cache_datafile_lookups", "upload_invalid_user_folders",
-                  "connection_timeout"]
+                  "connection_timeout", "bulk_datafile_lookups",
+                  "max_scan_threads", "stream_folder_scans",
+                  "incremental_scans", "watch_data_directory",
+                  "lookup_cache_minutes", "ssh_connection_sharing",
+                  "batch_small_file_uploads", "sftp_uploads",
+                  "max_hashing_threads", "hashing_processes",
+                  "hash_while_uploading", "fadvise_local_copies"]
         settingsList = []
         for field in fields:
             value = SETTINGS[field]
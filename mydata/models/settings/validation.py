@@ -17,6 +17,7 @@ from validate_email import validate_email
 from ...events.stop import RaiseExceptionIfUserAborted
 from ...logs import logger
 from ...threads.flags import FLAGS
+from ...utils.api import MYTARDIS_API
 from ...utils.autostart import UpdateAutostartFile
 from ...utils.exceptions import InvalidSettings
 from ...utils.exceptions import UserAborted
@@ -356,7 +357,7 @@ def CheckMyTardisCredentials(setStatusMessage):
         setStatusMessage(message)
     url = SETTINGS.general.myTardisUrl + \
         "/api/v1/user/?format=json&username=" + SETTINGS.general.username
-    response = requests.get(headers=SETTINGS.defaultHeaders, url=url)
+    response = MYTARDIS_API.Get(url, SETTINGS)
     statusCode = response.status_code
     if statusCode < 200 or statusCode >= 300:
         message = "Your MyTardis credentials are invalid.\n\n" \
@@ -81,11 +81,11 @@ import uuid
 
 import dateutil.parser
 import psutil
-import requests
 import netifaces
 
 from .. import __version__ as VERSION
 from ..logs import logger
+from ..utils.api import MYTARDIS_API
 from ..utils.connectivity import GetDefaultInterfaceType
 from ..utils.exceptions import DoesNotExist
 from ..utils.exceptions import PrivateKeyDoesNotExist
@@ -192,9 +192,8 @@ class UploaderModel(object):
         myTardisUrl = self.settings.general.myTardisUrl
         url = myTardisUrl + "/api/v1/mydata_uploader/?format=json" + \
             "&uuid=" + urllib.quote(self.settings.miscellaneous.uuid)
-        headers = self.settings.defaultHeaders
-        response = requests.get(
-            headers=headers, url=url,
+        response = MYTARDIS_API.Get(
+            url, self.settings,
             timeout=self.settings.miscellaneous.connectionTimeout)
         response.raise_for_status()
         existingUploaderRecords = response.json()
@@ -258,14 +257,13 @@ class UploaderModel(object):
 
         data = json.dumps(uploaderJson, indent=4)
         logger.debug(data)
-        headers = self.settings.defaultHeaders
         if numExistingUploaderRecords > 0:
-            response = requests.put(
-                headers=headers, url=url, data=data,
+            response = MYTARDIS_API.Put(
+                url, self.settings, data=data,
                 timeout=self.settings.miscellaneous.connectionTimeout)
         else:
-            response = requests.post(
-                headers=headers, url=url, data=data,
+            response = MYTARDIS_API.Post(
+                url, self.settings, data=data,
                 timeout=self.settings.miscellaneous.connectionTimeout)
         response.raise_for_status()
         logger.debug("Upload succeeded for uploader info.")
@@ -321,8 +319,7 @@ class UploaderModel(object):
             "&requester_key_fingerprint=" + urllib.quote(
                 self.sshKeyPair.fingerprint)
         logger.debug(url)
-        headers = self.settings.defaultHeaders
-        response = requests.get(headers=headers, url=url)
+        response = MYTARDIS_API.Get(url, self.settings)
         response.raise_for_status()
         logger.debug(response.text)
         existingUploaderRegReqRecords = response.json()
@@ -361,8 +358,7 @@ class UploaderModel(object):
              "requester_public_key": self.sshKeyPair.publicKey,
              "requester_key_fingerprint": self.sshKeyPair.fingerprint}
         data = json.dumps(uploaderRegistrationRequestJson)
-        response = requests.post(headers=self.settings.defaultHeaders, url=url,
-                                 data=data)
+        response = MYTARDIS_API.Post(url, self.settings, data=data)
         response.raise_for_status()
         return UploaderRegistrationRequest(
             uploaderRegRequestJson=response.json())
@@ -411,12 +407,11 @@ class UploaderModel(object):
         :raises requests.exceptions.HTTPError:
         """
         myTardisUrl = self.settings.general.myTardisUrl
-        headers = self.settings.defaultHeaders
 
         if not self.uploaderId:
             url = "%s/api/v1/mydata_uploader/?format=json&uuid=%s" \
                 % (myTardisUrl, urllib.quote(self.settings.miscellaneous.uuid))
-            response = requests.get(headers=headers, url=url)
+            response = MYTARDIS_API.Get(url, self.settings)
             response.raise_for_status()
             existingUploaderRecords = response.json()
             numExistingUploaderRecords = \
@@ -434,8 +429,8 @@ class UploaderModel(object):
             'settings': settingsList,
             'uuid': self.settings.miscellaneous.uuid
         }
-        response = requests.patch(headers=headers, url=url,
-                                  data=json.dumps(patchData))
+        response = MYTARDIS_API.Patch(
+            url, self.settings, data=json.dumps(patchData))
         response.raise_for_status()
 
     def GetSettings(self):
@@ -446,12 +441,11 @@ class UploaderModel(object):
         :raises requests.exceptions.HTTPError:
         """
         myTardisUrl = self.settings.general.myTardisUrl
-        headers = self.settings.defaultHeaders
         url = "%s/api/v1/mydata_uploader/?format=json&uuid=%s" \
             % (myTardisUrl, urllib.quote(self.settings.miscellaneous.uuid))
         try:
-            response = requests.get(
-                headers=headers, url=url,
+            response = MYTARDIS_API.Get(
+                url, self.settings,
                 timeout=self.settings.miscellaneous.connectionTimeout)
         except Exception as err:
             logger.error(str(err))
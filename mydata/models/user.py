@@ -3,9 +3,9 @@ Model class for MyTardis API v1's UserResource.
 See: https://github.com/mytardis/mytardis/blob/3.7/tardis/tardis_portal/api.py
 """
 import urllib
-import requests
 
 from ..settings import SETTINGS
+from ..utils.api import MYTARDIS_API
 from ..utils.exceptions import DoesNotExist
 from ..logs import logger
 from .group import GroupModel
@@ -27,6 +27,7 @@ class UserModel(object):
         self._email = email
         self.groups = []
         self.userNotFoundInMyTardis = userNotFoundInMyTardis
+        self.userRecordJson = userRecordJson
 
         if userRecordJson is not None:
             self.userId = userRecordJson['id']
@@ -120,7 +121,7 @@ class UserModel(object):
         """
         url = "%s/api/v1/user/?format=json&username=%s" \
             % (SETTINGS.general.myTardisUrl, username)
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         userRecordsJson = response.json()
         numUserRecordsFound = userRecordsJson['meta']['total_count']
@@ -144,7 +145,7 @@ class UserModel(object):
         url = "%s/api/v1/user/?format=json&email__iexact=%s" \
             % (SETTINGS.general.myTardisUrl,
                urllib.quote(email.encode('utf-8')))
-        response = requests.get(url=url, headers=SETTINGS.defaultHeaders)
+        response = MYTARDIS_API.Get(url, SETTINGS)
         response.raise_for_status()
         userRecordsJson = response.json()
         numUserRecordsFound = userRecordsJson['meta']['total_count']
@@ -166,20 +167,48 @@ class UserModel(object):
         Set userNotFoundInMyTardis to True if you already know there is
         no corresponding user record in MyTardis, but you want to create
         a "USER NOT FOUND" dummy record to render in MyData's users table.
+
+        If the lookup_cache_minutes setting is non-zero, the result of
+        looking up the folder (including not finding it) is reused until
+        it is that many minutes old.
         """
         folderStructure = SETTINGS.advanced.folderStructure
         if folderStructure.startswith("Username"):
             if userNotFoundInMyTardis:
                 return UserModel(
                     username=userFolderName, userNotFoundInMyTardis=True)
-            return UserModel.GetUserByUsername(userFolderName)
+            kind = "username"
+            lookup = UserModel.GetUserByUsername
         elif folderStructure.startswith("Email"):
             if userNotFoundInMyTardis:
                 return UserModel(
                     email=userFolderName, userNotFoundInMyTardis=True)
-            return UserModel.GetUserByEmail(userFolderName)
+            kind = "email"
+            lookup = UserModel.GetUserByEmail
         else:
             return None
+        maxAge = SETTINGS.miscellaneous.lookupCacheMinutes * 60
+        cache = SETTINGS.lookupCache
+        found, userRecordJson = \
+            cache.GetFolderLookup(kind, userFolderName, maxAge)
+        if found:
+            if userRecordJson is None:
+                raise DoesNotExist(
+                    message="User folder \"%s\" was recently not found "
+                    "in MyTardis" % userFolderName)
+            username = userFolderName if kind == "username" else None
+            return UserModel(
+                username=username, userRecordJson=userRecordJson)
+        try:
+            userRecord = lookup(userFolderName)
+        except DoesNotExist:
+            if maxAge > 0:
+                cache.SetFolderLookup(kind, userFolderName, None)
+            raise
+        if maxAge > 0:
+            cache.SetFolderLookup(
+                kind, userFolderName, userRecord.userRecordJson)
+        return userRecord
 
 class UserProfileModel(object):
     """
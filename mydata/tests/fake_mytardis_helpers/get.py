@@ -15,6 +15,16 @@ from . import RespondToRequestForStatusCode, RespondWithStatusCode
 # This storage box attribute can be overwritten by an ephemeral port:
 SCP_PORT = 2200
 
+# Filenames for which the fake MyTardis server has DataFile records:
+EXISTING_DATAFILE_NAMES = [
+    "existing_unverified_incomplete_file.txt",
+    "existing_unverified_full_size_file.txt",
+    "existing_verified_file.txt",
+    "missing_mydata_replica_api_endpoint.txt"]
+
+# Listing the DataFiles in this dataset returns a truncated JSON response:
+MALFORMED_DATAFILES_LIST_DATASET_ID = "1099"
+
 
 def FakeMyTardisGet(mytardis):
     """
@@ -77,6 +87,10 @@ def FakeMyTardisGet(mytardis):
     if re.match(r"^.*&dataset__id=(\S+)&filename=(\S+)&directory=(\S*)$",
                 mytardis.path):
         RespondToDataFilesRequest(mytardis)
+    elif re.match(r"^/api/v1/mydata_dataset_file/\?format=json"
+                  r"&dataset__id=(\S+)&limit=(\d+)&offset=(\d+)$",
+                  mytardis.path):
+        RespondToDataFilesListRequest(mytardis)
     elif re.match(r"^/api/v1/mydata_dataset_file/(\d+)/\?format=json$",
                   mytardis.path):
         RespondToDataFileRequest(mytardis)
@@ -595,6 +609,45 @@ def RespondToDataFilesRequest(mytardis):
     mytardis.send_response(200)
     mytardis.send_header("Content-type", "application/json")
     mytardis.end_headers()
+    datafilesJson = GetDataFilesJson(datasetId, filename, directory)
+    mytardis.wfile.write(json.dumps(datafilesJson))
+
+
+def RespondToDataFilesListRequest(mytardis):
+    """
+    Respond to a paginated request for all of the DataFiles in a dataset,
+    as used by DataFileModel.GetDataFiles.
+
+    :param mytardis: The FakeMyTardisHandler instance
+    """
+    match = re.match(
+        r"^.*&dataset__id=(\S+)&limit=(\d+)&offset=(\d+)$", mytardis.path)
+    datasetId = match.groups()[0]
+    limit = int(match.groups()[1])
+    offset = int(match.groups()[2])
+    mytardis.send_response(200)
+    mytardis.send_header("Content-type", "application/json")
+    mytardis.end_headers()
+    objects = []
+    for filename in EXISTING_DATAFILE_NAMES:
+        objects += GetDataFilesJson(datasetId, filename, "")['objects']
+    datafilesJson = copy.deepcopy(EMPTY_API_LIST)
+    datafilesJson['meta']['limit'] = limit
+    datafilesJson['meta']['offset'] = offset
+    datafilesJson['meta']['total_count'] = len(objects)
+    datafilesJson['objects'] = objects[offset:offset + limit]
+    if datasetId == MALFORMED_DATAFILES_LIST_DATASET_ID:
+        mytardis.wfile.write(json.dumps(datafilesJson)[:-10])
+        return
+    mytardis.wfile.write(json.dumps(datafilesJson))
+
+
+def GetDataFilesJson(datasetId, filename, directory):
+    """
+    Return the JSON for a list of DataFiles matching the dataset ID,
+    filename and directory.  Only the filenames in EXISTING_DATAFILE_NAMES
+    will be found.
+    """
     datafilesJson = copy.deepcopy(EMPTY_API_LIST)
     if filename == "existing_unverified_incomplete_file.txt":
         datafilesJson['meta']['total_count'] = 1
@@ -732,7 +785,7 @@ def RespondToDataFilesRequest(mytardis):
                 "version": 1
             }
         ]
-    mytardis.wfile.write(json.dumps(datafilesJson))
+    return datafilesJson
 
 
 def RespondToDataFileRequest(mytardis):
@@ -22,6 +22,9 @@ SSH client processes can then connect to it as follows:
     ssh -oNoHostAuthenticationForLocalhost=yes -i ~/.ssh/MyDataTest \
         -p 2200 mydata@localhost wc -c setup.py
 
+It also provides an SFTP subsystem, which serves the local file system,
+for testing MyData's built-in SFTP client (see mydata.utils.sftp).
+
 It can also be used to test SCP, for example, copying the file "hello"
 using a Cygwin build of scp from a Windows command prompt:
 
@@ -35,7 +38,9 @@ using a Cygwin build of scp from a Windows command prompt:
 # pylint: disable=unused-argument
 
 import SocketServer
+import os
 import sys
+import threading
 import traceback
 import subprocess
 import time
@@ -79,6 +84,7 @@ class SshServerInterface(paramiko.ServerInterface):
     """
     def __init__(self):
         self.command = None
+        self.subsystem = None
         keyPair = OpenSSH.FindKeyPair("MyDataTest")
         # Remove "ssh-rsa " and "MyDataTest key":
         data = bytes(keyPair.publicKey.split(" ")[1])
@@ -96,9 +102,21 @@ class SshServerInterface(paramiko.ServerInterface):
         """
         See http://docs.paramiko.org/en/1.15/api/server.html
         """
+        if self.subsystem:
+            # Commands can't be run on SFTP connections, like
+            # an SFTP-only account:
+            return False
         self.command = command
         return True
 
+    def check_channel_subsystem_request(self, channel, name):
+        """
+        See http://docs.paramiko.org/en/1.15/api/server.html
+        """
+        self.subsystem = name
+        return super(SshServerInterface, self) \
+            .check_channel_subsystem_request(channel, name)
+
     def check_auth_password(self, username, password):
         """
         See http://docs.paramiko.org/en/1.15/api/server.html
@@ -136,6 +154,157 @@ class SshServerInterface(paramiko.ServerInterface):
         return True
 
 
+class SftpHandle(paramiko.SFTPHandle):
+    """
+    Handle for a local file opened by SftpServerInterface.
+    """
+    def stat(self):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            return paramiko.SFTPAttributes.from_stat(
+                os.fstat(self.readfile.fileno()))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def chattr(self, attr):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        # pylint: disable=protected-access
+        try:
+            # SFTPServer.set_file_attr would truncate the file to zero
+            # bytes before setting its size:
+            if attr._flags & attr.FLAG_SIZE:
+                self.writefile.truncate(attr.st_size)
+                attr._flags &= ~attr.FLAG_SIZE
+            paramiko.SFTPServer.set_file_attr(self.filename, attr)
+        except (IOError, OSError) as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+
+class SftpServerInterface(paramiko.SFTPServerInterface):
+    """
+    Fake SFTP server interface, which serves the local file system.
+    """
+    def list_folder(self, path):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            attrs = []
+            for filename in os.listdir(path):
+                attr = paramiko.SFTPAttributes.from_stat(
+                    os.stat(os.path.join(path, filename)))
+                attr.filename = filename
+                attrs.append(attr)
+            return attrs
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def stat(self, path):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(path))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def lstat(self, path):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def open(self, path, flags, attr):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        # pylint: disable=protected-access
+        flags |= getattr(os, 'O_BINARY', 0)
+        try:
+            fd = os.open(path, flags, 0o666)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        if flags & os.O_CREAT and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+            paramiko.SFTPServer.set_file_attr(path, attr)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+        try:
+            localFile = os.fdopen(fd, mode)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        handle = SftpHandle(flags)
+        handle.filename = path
+        handle.readfile = localFile
+        handle.writefile = localFile
+        return handle
+
+    def remove(self, path):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            os.remove(path)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            os.rename(oldpath, newpath)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+    def mkdir(self, path, attr):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+
+        Like OpenSSH's SFTP server, the requested permissions are masked
+        by the umask.
+        """
+        try:
+            os.mkdir(path)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+    def rmdir(self, path):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            os.rmdir(path)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+    def chattr(self, path, attr):
+        """
+        See http://docs.paramiko.org/en/1.15/api/sftp.html
+        """
+        try:
+            paramiko.SFTPServer.set_file_attr(path, attr)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+
 # Default host key used by ThreadedSshServer
 #
 DEFAULT_HOST_KEY = paramiko.RSAKey.from_private_key(StringIO(
@@ -216,6 +385,8 @@ class SshRequestHandler(SocketServer.BaseRequestHandler):
         """
         self.transport = paramiko.Transport(self.request)
         self.transport.add_server_key(self.server.host_key)
+        self.transport.set_subsystem_handler(
+            'sftp', paramiko.SFTPServer, SftpServerInterface)
 
     def handle(self):
         """
@@ -257,6 +428,11 @@ class SshRequestHandler(SocketServer.BaseRequestHandler):
             while not self.server_instance.command:
                 if SshRequestHandler.NEED_TO_ABORT:
                     return
+                if self.server_instance.subsystem:
+                    # The subsystem (e.g. SFTP) runs in its own thread:
+                    logger.info("Started %s subsystem.",
+                                self.server_instance.subsystem)
+                    return
                 time.sleep(0.01)
                 count += 1
                 if count > 100:
@@ -296,10 +472,40 @@ class SshRequestHandler(SocketServer.BaseRequestHandler):
                 # Execute a "remote" command other than scp.
                 logger.info("Executing: %s", self.server_instance.command)
                 proc = subprocess.Popen(self.server_instance.command,
+                                        stdin=subprocess.PIPE,
                                         stdout=subprocess.PIPE,
                                         stderr=subprocess.STDOUT,
                                         shell=True)
-                stdout, _ = proc.communicate()
+
+                def forward_stdin():
+                    """
+                    Write the data sent by the client into the command's
+                    stdin, e.g. for "cat >> file" when resuming an upload,
+                    closing the command's stdin when the client sends EOF.
+                    """
+                    try:
+                        while True:
+                            chunk = self.chan.recv(32768)
+                            if not chunk:
+                                break
+                            proc.stdin.write(chunk)
+                    except (IOError, socket.error, EOFError):
+                        pass
+                    finally:
+                        try:
+                            proc.stdin.close()
+                        except IOError:
+                            pass
+
+                # Commands which don't read their stdin can finish before
+                # the client sends EOF, so stdin is forwarded by a separate
+                # thread, which ends when the channel is closed:
+                stdin_thread = threading.Thread(
+                    target=forward_stdin, name="FakeSshStdinThread")
+                stdin_thread.daemon = True
+                stdin_thread.start()
+                stdout = proc.stdout.read()
+                proc.wait()
                 self.chan.send(stdout)
                 logger.info("Closing channel.")
                 self.chan.send_exit_status(proc.returncode)
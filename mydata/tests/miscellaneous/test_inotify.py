@@ -0,0 +1,70 @@
+"""
+Test the inotify wrapper used by MyData's watch mode.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from ...utils import inotify
+
+
+@unittest.skipUnless(inotify.IsAvailable(), "inotify is not available")
+class InotifyTester(unittest.TestCase):
+    """
+    Test the inotify wrapper used by MyData's watch mode.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.inotify = inotify.Inotify()
+
+    def tearDown(self):
+        self.inotify.Close()
+        shutil.rmtree(self.tempDir)
+
+    def test_inotify(self):
+        """
+        Test the inotify wrapper used by MyData's watch mode.
+        """
+        wd = self.inotify.AddWatch(
+            self.tempDir, inotify.IN_CLOSE_WRITE | inotify.IN_CREATE)
+        self.assertEqual(self.inotify.ReadEvents(timeout=0), [])
+        with open(os.path.join(self.tempDir, "file.txt"), 'w') as dataFile:
+            dataFile.write("data")
+        os.mkdir(os.path.join(self.tempDir, "subdir"))
+        events = [(eventWd, mask & ~inotify.IN_ISDIR, name,
+                   bool(mask & inotify.IN_ISDIR))
+                  for eventWd, mask, _, name in
+                  self.inotify.ReadEvents(timeout=1)]
+        self.assertEqual(
+            events,
+            [(wd, inotify.IN_CREATE, "file.txt", False),
+             (wd, inotify.IN_CLOSE_WRITE, "file.txt", False),
+             (wd, inotify.IN_CREATE, "subdir", True)])
+        with self.assertRaises(OSError):
+            self.inotify.AddWatch(
+                os.path.join(self.tempDir, "missing"), inotify.IN_CREATE)
+
+    def test_non_ascii_filename(self):
+        """
+        Test reading an event for a file whose name isn't ASCII.
+        """
+        filename = u"\xe9t\xe9.txt"
+        try:
+            encodedFilename = \
+                filename.encode(sys.getfilesystemencoding() or 'utf8')
+        except UnicodeEncodeError:
+            self.skipTest("The file system encoding can't encode %r"
+                          % filename)
+        wd = self.inotify.AddWatch(self.tempDir, inotify.IN_CLOSE_WRITE)
+        with open(os.path.join(self.tempDir, encodedFilename), 'w') \
+                as dataFile:
+            dataFile.write("data")
+        events = [(eventWd, mask, name) for eventWd, mask, _, name in
+                  self.inotify.ReadEvents(timeout=1)]
+        self.assertEqual(events, [(wd, inotify.IN_CLOSE_WRITE, filename)])
+        # The name can be joined to a unicode directory path:
+        self.assertEqual(
+            os.path.join(u"/data/\xe9t\xe9", events[0][2]),
+            u"/data/\xe9t\xe9/\xe9t\xe9.txt")
@@ -0,0 +1,167 @@
+"""
+Test copying files to locally mounted storage boxes in chunks.
+"""
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import wx
+
+from ...models.upload import UploadStatus
+from ...utils import localcopy
+
+
+class FakeFoldersController(object):
+    """
+    Folders controller, whose uploads haven't been canceled
+    """
+    def __init__(self):
+        self.canceled = False
+
+
+class FakeUploadModel(object):
+    """
+    Upload model for calling CopyFile directly
+    """
+    def __init__(self):
+        self.canceled = False
+        self.status = UploadStatus.NOT_STARTED
+        self.startTime = None
+
+    def SetLatestTime(self, latestTime):
+        """
+        Set the latest time at which the upload was progressing
+        """
+        pass
+
+
+class LocalCopyTester(unittest.TestCase):
+    """
+    Test copying files to locally mounted storage boxes in chunks.
+    """
+    def setUp(self):
+        self.app = wx.App()
+        self.app.foldersController = FakeFoldersController()
+        self.tempDir = tempfile.mkdtemp()
+        self.content = os.urandom(10 * 1000 + 123)
+        self.filePath = os.path.join(self.tempDir, "file.bin")
+        with open(self.filePath, 'wb') as dataFile:
+            dataFile.write(self.content)
+        os.chmod(self.filePath, 0o640)
+        self.targetFilePath = os.path.join(
+            self.tempDir, "staging", "dataset", "file.bin")
+        self.chunkSize = localcopy.CHUNK_SIZE
+        localcopy.CHUNK_SIZE = 1000
+        self.copySyscalls = dict(localcopy.COPY_SYSCALLS)
+
+    def tearDown(self):
+        localcopy.CHUNK_SIZE = self.chunkSize
+        localcopy.COPY_SYSCALLS.clear()
+        localcopy.COPY_SYSCALLS.update(self.copySyscalls)
+        shutil.rmtree(self.tempDir)
+
+    def CopyFile(self, progressCallback=None, uploadModel=None):
+        """
+        Copy the test file to the target path, returning the number of
+        bytes copied reported to each progress callback
+        """
+        bytesUploaded = []
+        if not uploadModel:
+            uploadModel = FakeUploadModel()
+
+        def ProgressCallback(current, total, message=None):
+            """
+            Record the copy's progress
+            """
+            self.assertEqual(total, len(self.content))
+            bytesUploaded.append(current)
+            if progressCallback:
+                progressCallback(current)
+
+        localcopy.CopyFile(
+            self.filePath, len(self.content), self.targetFilePath,
+            ProgressCallback, uploadModel)
+        return bytesUploaded
+
+    def AssertCopied(self, bytesUploaded):
+        """
+        Check the copied file and the progress reported while copying it
+        """
+        with open(self.targetFilePath, 'rb') as targetFile:
+            self.assertEqual(targetFile.read(), self.content)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(self.targetFilePath).st_mode), 0o640)
+        self.assertEqual(bytesUploaded[0], 0)
+        self.assertEqual(bytesUploaded[-1], len(self.content))
+        self.assertEqual(sorted(bytesUploaded), bytesUploaded)
+        # Progress is reported after each chunk:
+        self.assertIn(1000, bytesUploaded)
+        self.assertIn(10 * 1000, bytesUploaded)
+
+    def test_copy_file(self):
+        """
+        Test copying a file with the system calls available here.
+        """
+        self.AssertCopied(self.CopyFile())
+
+    def test_copy_file_with_readinto(self):
+        """
+        Test copying a file through a buffer, without system calls.
+        """
+        for name in ("copy_file_range", "sendfile"):
+            localcopy.COPY_SYSCALLS[name] = False
+        self.AssertCopied(self.CopyFile())
+
+    def test_syscalls_disabled_while_copying(self):
+        """
+        Test copying a file while another upload thread disables the
+        copy system calls.
+        """
+        def DisableSyscalls(current):
+            """
+            Simulate another upload thread finding that the system calls
+            can't be used
+            """
+            if current:
+                for name in ("copy_file_range", "sendfile"):
+                    localcopy.COPY_SYSCALLS[name] = False
+
+        self.AssertCopied(self.CopyFile(progressCallback=DisableSyscalls))
+
+    @unittest.skipUnless(localcopy.LIBC, "libc is not available")
+    def test_unsupported_file_pair(self):
+        """
+        Test that a file pair which a system call can't copy between
+        doesn't stop the system call being used for other files.
+        """
+        for name in ("copy_file_range", "sendfile"):
+            if not localcopy.COPY_SYSCALLS.get(name):
+                continue
+            # A file opened for writing can't be copied from (EBADF):
+            with open(os.path.join(self.tempDir, "src"), 'wb') as srcFile:
+                with open(os.path.join(self.tempDir, "dst"), 'wb') as dstFile:
+                    self.assertIsNone(
+                        localcopy.CopyChunkWithSyscall(
+                            name, srcFile.fileno(), dstFile.fileno(), 0,
+                            1000))
+            self.assertTrue(localcopy.COPY_SYSCALLS[name])
+
+    def test_cancel_copy(self):
+        """
+        Test canceling a copy part of the way through.
+        """
+        uploadModel = FakeUploadModel()
+
+        def Cancel(current):
+            """
+            Cancel the upload after its first chunk has been copied
+            """
+            if current:
+                uploadModel.canceled = True
+
+        bytesUploaded = self.CopyFile(
+            progressCallback=Cancel, uploadModel=uploadModel)
+        self.assertEqual(bytesUploaded, [0, 1000])
+        self.assertEqual(os.path.getsize(self.targetFilePath), 1000)
@@ -0,0 +1,51 @@
+"""
+Test calculating MD5 checksums in worker processes.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from ...settings import SETTINGS
+from ...utils.hashing import MD5_PROCESS_POOL
+
+
+class Md5ProcessPoolTester(unittest.TestCase):
+    """
+    Test calculating MD5 checksums in worker processes.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.tempDir, "file.bin")
+        with open(self.filePath, 'wb') as dataFile:
+            dataFile.write(os.urandom(1024 * 1024))
+        SETTINGS.miscellaneous.hashingProcesses = 2
+
+    def tearDown(self):
+        MD5_PROCESS_POOL.Terminate()
+        SETTINGS.miscellaneous.hashingProcesses = 0
+        shutil.rmtree(self.tempDir)
+
+    def test_md5_process_pool(self):
+        """
+        Test calculating MD5 checksums in worker processes.
+        """
+        with open(self.filePath, 'rb') as dataFile:
+            expectedMd5Sum = hashlib.md5(dataFile.read()).hexdigest()
+        bytesHashed = []
+        self.assertEqual(
+            MD5_PROCESS_POOL.Md5Sum(
+                self.filePath, progressCallback=bytesHashed.append,
+                canceledCallback=lambda: False),
+            expectedMd5Sum)
+        self.assertEqual(bytesHashed[-1], 1024 * 1024)
+
+        # The calculation can be canceled:
+        self.assertIsNone(
+            MD5_PROCESS_POOL.Md5Sum(
+                self.filePath, canceledCallback=lambda: True))
+
+        # Errors raised in the worker process are raised in the caller:
+        with self.assertRaises(IOError):
+            MD5_PROCESS_POOL.Md5Sum(os.path.join(self.tempDir, "missing"))
@@ -0,0 +1,52 @@
+"""
+Test the per-thread sessions used for MyTardis API requests.
+"""
+import threading
+
+from .. import MyDataTester
+from ...settings import SETTINGS
+from ...utils.api import MYTARDIS_API
+
+
+class MyTardisApiClientTester(MyDataTester):
+    """
+    Test the per-thread sessions used for MyTardis API requests.
+    """
+    def test_mytardis_api_client(self):
+        """
+        Test the per-thread sessions used for MyTardis API requests.
+        """
+        SETTINGS.general.myTardisUrl = self.fakeMyTardisUrl
+        SETTINGS.general.username = "testuser1"
+        SETTINGS.general.apiKey = "valid"
+
+        headers = MYTARDIS_API.GetHeaders(SETTINGS)
+        self.assertEqual(headers, SETTINGS.defaultHeaders)
+        # The headers are only rebuilt when the credentials change:
+        self.assertIs(MYTARDIS_API.GetHeaders(SETTINGS), headers)
+
+        session = MYTARDIS_API.session
+        url = "%s/api/v1/user/?format=json&username=testuser1" \
+            % self.fakeMyTardisUrl
+        response = MYTARDIS_API.Get(url, SETTINGS)
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(MYTARDIS_API.session, session)
+
+        # Each thread has its own session:
+        threadSessions = []
+        thread = threading.Thread(
+            target=lambda: threadSessions.append(MYTARDIS_API.session))
+        thread.start()
+        thread.join()
+        self.assertIsNot(threadSessions[0], session)
+
+        # The sessions are rebuilt when the credentials change:
+        SETTINGS.general.apiKey = "invalid"
+        self.assertNotEqual(MYTARDIS_API.GetHeaders(SETTINGS), headers)
+        self.assertIsNot(MYTARDIS_API.session, session)
+        session = MYTARDIS_API.session
+        response = MYTARDIS_API.Get(url, SETTINGS)
+        self.assertEqual(response.status_code, 401)
+
+        MYTARDIS_API.Close()
+        self.assertIsNot(MYTARDIS_API.session, session)
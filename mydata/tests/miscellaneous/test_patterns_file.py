@@ -0,0 +1,49 @@
+"""
+Test compiling glob patterns from includes and excludes files.
+"""
+import os
+import tempfile
+import unittest
+
+from ...utils.filters import GetPatternsFile
+
+
+class PatternsFileTester(unittest.TestCase):
+    """
+    Test compiling glob patterns from includes and excludes files.
+    """
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=False) as tempFile:
+            self.patternsFilePath = tempFile.name
+
+    def tearDown(self):
+        if os.path.exists(self.patternsFilePath):
+            os.remove(self.patternsFilePath)
+
+    def test_patterns_file(self):
+        """
+        Test compiling glob patterns from includes and excludes files.
+        """
+        with open(self.patternsFilePath, 'w') as patternsFile:
+            patternsFile.write("# Comment\n")
+            patternsFile.write("; Comment\n")
+            patternsFile.write("\n")
+            patternsFile.write("*.bak\n")
+            patternsFile.write("tmp*/\n")
+        patterns = GetPatternsFile(self.patternsFilePath)
+        self.assertTrue(patterns.MatchesFile("file.bak"))
+        self.assertFalse(patterns.MatchesFile("file.txt"))
+        self.assertFalse(patterns.MatchesFile("tmp1"))
+        self.assertFalse(patterns.MatchesFile("# Comment"))
+        self.assertTrue(patterns.MatchesDirectory("tmp1"))
+        self.assertFalse(patterns.MatchesDirectory("data"))
+
+        # The patterns should only be recompiled when the file changes:
+        self.assertIs(GetPatternsFile(self.patternsFilePath).fileRegex,
+                      patterns.fileRegex)
+        with open(self.patternsFilePath, 'w') as patternsFile:
+            patternsFile.write("*.txt\n")
+        patterns = GetPatternsFile(self.patternsFilePath)
+        self.assertTrue(patterns.MatchesFile("file.txt"))
+        self.assertFalse(patterns.MatchesFile("file.bak"))
+        self.assertFalse(patterns.MatchesDirectory("tmp1"))
@@ -0,0 +1,66 @@
+"""
+Test collecting small files' uploads into tar batches.
+"""
+import unittest
+# For Python3, this will change to "from queue import Queue":
+from Queue import Queue
+
+from ...controllers.uploads import BATCH_MAX_FILE_SIZE
+from ...controllers.uploads import UploadBatchRunnable
+from ...controllers.uploads import UploadDatafileRunnable
+
+
+class FakeFolderModel(object):
+    """
+    Folder model whose files' sizes are given in a list
+    """
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def GetDataFileSize(self, dataFileIndex):
+        """
+        Return the size of the file with index dataFileIndex
+        """
+        return self.sizes[dataFileIndex]
+
+
+class UploadBatchesTester(unittest.TestCase):
+    """
+    Test collecting small files' uploads into tar batches.
+    """
+    def test_collect_batch(self):
+        """
+        Test collecting small files' uploads into tar batches.
+        """
+        folder1 = FakeFolderModel([1, 2, BATCH_MAX_FILE_SIZE + 1, 3])
+        folder2 = FakeFolderModel([4])
+        tasks = [UploadDatafileRunnable(folder1, 0, None, None),
+                 UploadDatafileRunnable(folder1, 1, None, None),
+                 UploadDatafileRunnable(folder1, 2, None, None),
+                 UploadDatafileRunnable(folder1, 3, None, None),
+                 UploadDatafileRunnable(folder2, 0, None, None)]
+        uploadsQueue = Queue()
+        for task in tasks[1:]:
+            uploadsQueue.put(task)
+
+        # The batch ends at the first task which can't be added to it,
+        # which is returned rather than being put back in the queue:
+        batch, nextTasks = \
+            UploadBatchRunnable.CollectBatch(tasks[0], uploadsQueue)
+        self.assertEqual(batch.runnables, tasks[:2])
+        self.assertEqual(nextTasks, [tasks[2]])
+        self.assertEqual(uploadsQueue.get_nowait(), tasks[3])
+
+        # A task from another folder ends the batch too:
+        batch, nextTasks = \
+            UploadBatchRunnable.CollectBatch(tasks[3], uploadsQueue)
+        self.assertIs(batch, tasks[3])
+        self.assertEqual(nextTasks, [tasks[4]])
+        self.assertTrue(uploadsQueue.empty())
+
+        # The shut down signal for the upload workers isn't lost:
+        uploadsQueue.put(None)
+        batch, nextTasks = \
+            UploadBatchRunnable.CollectBatch(tasks[0], uploadsQueue)
+        self.assertIs(batch, tasks[0])
+        self.assertEqual(nextTasks, [None])
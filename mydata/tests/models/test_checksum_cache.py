@@ -0,0 +1,61 @@
+"""
+Test the local cache of MD5 checksums.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ...models.checksums import ChecksumCache
+
+
+class ChecksumCacheTester(unittest.TestCase):
+    """
+    Test the local cache of MD5 checksums.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.cachePath = os.path.join(self.tempDir, "checksums.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def test_checksums(self):
+        """
+        Test recording the MD5 checksums of local files.
+        """
+        cache = ChecksumCache()
+        filePath = os.path.join(self.tempDir, "file.txt")
+        with open(filePath, 'w') as dataFile:
+            dataFile.write("data")
+        checksumKey = ChecksumCache.GetChecksumKey(filePath)
+        if not checksumKey:
+            self.skipTest("Files can't be identified by inode numbers.")
+        self.assertIsNone(
+            ChecksumCache.GetChecksumKey(filePath + ".missing"))
+        # An unopened cache doesn't record checksums:
+        cache.SetMd5Sum(checksumKey, "8d777f385d3dfec8815d20f7496026dc")
+        self.assertIsNone(cache.GetMd5Sum(checksumKey))
+
+        cache.Open(self.cachePath)
+        self.assertIsNone(cache.GetMd5Sum(checksumKey))
+        cache.SetMd5Sum(checksumKey, "8d777f385d3dfec8815d20f7496026dc")
+        self.assertEqual(
+            cache.GetMd5Sum(checksumKey), "8d777f385d3dfec8815d20f7496026dc")
+
+        # A modified file's checksum needs to be calculated again:
+        with open(filePath, 'a') as dataFile:
+            dataFile.write("more data")
+        newChecksumKey = ChecksumCache.GetChecksumKey(filePath)
+        self.assertNotEqual(newChecksumKey, checksumKey)
+        self.assertIsNone(cache.GetMd5Sum(newChecksumKey))
+        cache.SetMd5Sum(newChecksumKey, "c9f3c1f0e3f3c4e8ad4a7bd8b2d3a2a1")
+        self.assertIsNone(cache.GetMd5Sum(checksumKey))
+
+        # Checksums persist after the cache is closed and reopened:
+        cache.Close()
+        cache.Open(self.cachePath)
+        self.assertEqual(
+            cache.GetMd5Sum(newChecksumKey),
+            "c9f3c1f0e3f3c4e8ad4a7bd8b2d3a2a1")
+        cache.Close()
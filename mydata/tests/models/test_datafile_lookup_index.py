@@ -0,0 +1,62 @@
+"""
+Test looking up DataFiles in a DataFileLookupIndex built from
+one paginated listing of a dataset's DataFiles.
+"""
+from .. import MyDataTester
+from ..fake_mytardis_helpers.get import MALFORMED_DATAFILES_LIST_DATASET_ID
+from ...settings import SETTINGS
+from ...models.dataset import DatasetModel
+from ...models.datafile import DataFileModel
+from ...models.datafile import DataFileLookupIndex
+from ...utils.exceptions import DoesNotExist
+
+
+class DataFileLookupIndexTester(MyDataTester):
+    """
+    Test looking up DataFiles in a DataFileLookupIndex built from
+    one paginated listing of a dataset's DataFiles.
+    """
+    def test_datafile_lookup_index(self):
+        """
+        Test looking up DataFiles in a DataFileLookupIndex.
+        """
+        SETTINGS.general.myTardisUrl = self.fakeMyTardisUrl
+        SETTINGS.general.username = "testuser1"
+        SETTINGS.general.apiKey = "valid"
+
+        dataset = DatasetModel(dict(id=1001, description="Flowers"))
+
+        # The Fake MyTardis server has four DataFile records for any
+        # dataset, so a page size of 3 requires two requests:
+        dataFiles = DataFileModel.GetDataFiles(dataset, pageSize=3)
+        self.assertEqual(len(dataFiles), 4)
+
+        lookupIndex = DataFileLookupIndex.CreateForDataset(dataset)
+        self.assertEqual(lookupIndex.numDataFiles, 4)
+
+        dataFile = lookupIndex.GetDataFile(
+            filename="existing_verified_file.txt", directory="")
+        self.assertEqual(dataFile.datafileId, 290386)
+        self.assertTrue(dataFile.replicas[0].verified)
+        self.assertEqual(dataFile.dataset, dataset)
+
+        # The index should give the same result as the per-file lookup:
+        self.assertEqual(
+            dataFile.json,
+            DataFileModel.GetDataFile(
+                dataset, "existing_verified_file.txt", "").json)
+
+        with self.assertRaises(DoesNotExist):
+            lookupIndex.GetDataFile(
+                filename="existing_verified_file.txt", directory="subdir")
+        with self.assertRaises(DoesNotExist):
+            lookupIndex.GetDataFile(
+                filename="zero_sized_file.txt", directory="")
+
+        # A malformed listing raises ValueError, so FoldersController can
+        # fall back to looking up the dataset's DataFiles individually:
+        malformedDataset = DatasetModel(
+            dict(id=int(MALFORMED_DATAFILES_LIST_DATASET_ID),
+                 description="Malformed"))
+        with self.assertRaises(ValueError):
+            DataFileLookupIndex.CreateForDataset(malformedDataset)
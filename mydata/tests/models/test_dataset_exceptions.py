@@ -45,6 +45,7 @@ class DatasetExceptionsTester(MyDataTester):
         FLAGS.testRunRunning = False
         datasetModel = DatasetModel.CreateDatasetIfNecessary(folderModel)
         self.assertEqual(datasetModel.description, datasetFolderName)
+        self.assertTrue(datasetModel.newlyCreated)
 
         # Simulate creating dataset record during test run
         # and ensure that no exception is raised:
@@ -60,6 +61,7 @@ class DatasetExceptionsTester(MyDataTester):
         datasetModel = DatasetModel.CreateDatasetIfNecessary(folderModel)
         FLAGS.testRunRunning = False
         self.assertEqual(datasetModel.description, "Existing Dataset")
+        self.assertFalse(datasetModel.newlyCreated)
 
         # Try to look up dataset record with
         # an invalid API key, which should give 401 (Unauthorized)
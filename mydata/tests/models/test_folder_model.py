@@ -81,6 +81,67 @@ class FolderModelTester(MyDataTester):
         folderModel = FolderModel(dataViewId, folder, location, userFolderName,
                                   groupFolderName, testuser1)
         self.assertEqual(folderModel.numFiles, 8)
+        for dfi in range(folderModel.numFiles):
+            self.assertEqual(
+                folderModel.GetDataFileSize(dfi),
+                os.path.getsize(folderModel.GetDataFilePath(dfi)))
+        self.assertFalse(folderModel.RefreshDataFileStat(0))
+
+        folderModel.SetDataFileUploaded(0, True)
+        folderModel.SetDataFileUploaded(0, True)
+        folderModel.SetDataFilesUploaded([0, 1, 2])
+        self.assertEqual(folderModel.numFilesUploaded, 3)
+        folderModel.SetDataFileUploaded(1, False)
+        self.assertEqual(folderModel.status, "2 of 8 files uploaded")
+        folderModel.ResetCounts()
+        self.assertEqual(folderModel.numFilesUploaded, 0)
+
+        # A folder model can be created without listing its files, so
+        # that they can be verified while the folder is being scanned:
+        folderModel = FolderModel(dataViewId, folder, location, userFolderName,
+                                  groupFolderName, testuser1, scanFiles=False)
+        self.assertEqual(folderModel.numFiles, 0)
+        self.assertFalse(folderModel.scanComplete.isSet())
+        self.assertEqual(list(folderModel.ScanDataFiles()), range(8))
+        self.assertTrue(folderModel.scanComplete.isSet())
+        self.assertEqual(folderModel.status, "0 of 8 files uploaded")
+
+        # 64-bit inode numbers are recorded exactly, so that files with
+        # nearby inode numbers aren't confused with each other:
+        class FakeFileInfo(object):
+            """
+            Stat result for a file on a file system with 64-bit inodes
+            """
+            def __init__(self, inode):
+                self.st_size = 0
+                self.st_mtime = 0.0
+                self.st_ctime = 0.0
+                self.st_ino = inode
+        inodesFolderModel = FolderModel(
+            dataViewId, folder, location, userFolderName, groupFolderName,
+            testuser1, scanFiles=False)
+        for inode in (2 ** 63 + 1, 2 ** 63 + 2):
+            dfi = inodesFolderModel.AddDataFile(
+                "file%s" % inode, "", FakeFileInfo(inode))
+            self.assertEqual(inodesFolderModel.GetDataFileInode(dfi), inode)
+
+        # Files which have already been found aren't added again, e.g. when
+        # detected by watch mode:
+        self.assertIsNone(inodesFolderModel.AddDataFile(
+            "file%s" % (2 ** 63 + 1), "", FakeFileInfo(1), skipIfKnown=True))
+        self.assertEqual(inodesFolderModel.AddDataFile(
+            "file3", "", FakeFileInfo(3), skipIfKnown=True), 2)
+        self.assertIsNone(inodesFolderModel.AddDataFile(
+            "file3", "", FakeFileInfo(3), skipIfKnown=True))
+        self.assertEqual(inodesFolderModel.numFiles, 3)
+
+        # The folder's fingerprint only changes if its files change:
+        fingerprint = folderModel.GetFingerprint()
+        self.assertTrue(fingerprint.startswith("8:"))
+        self.assertEqual(
+            FolderModel(dataViewId, folder, location, userFolderName,
+                        groupFolderName, testuser1).GetFingerprint(),
+            fingerprint)
 
         SETTINGS.filters.useIncludesFile = True
         SETTINGS.filters.useExcludesFile = True
@@ -0,0 +1,63 @@
+"""
+Test the local cache of MyTardis record lookups.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ...models.lookups import LookupCache
+
+
+class LookupCacheTester(unittest.TestCase):
+    """
+    Test the local cache of MyTardis record lookups.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.cachePath = os.path.join(self.tempDir, "lookups.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def test_dataset_ids(self):
+        """
+        Test recording the dataset ID found for each dataset folder.
+        """
+        cache = LookupCache()
+        # An unopened cache doesn't record dataset IDs:
+        cache.SetDatasetId(1, u"ds1", 2, 3)
+        self.assertIsNone(cache.GetDatasetId(1, u"ds1", 2))
+
+        cache.Open(self.cachePath)
+        cache.SetDatasetId(1, u"\xe9t\xe9", 2, 3)
+        self.assertEqual(cache.GetDatasetId(1, "\xc3\xa9t\xc3\xa9", 2), 3)
+        # Dataset IDs are specific to an experiment and an instrument:
+        self.assertIsNone(cache.GetDatasetId(4, u"\xe9t\xe9", 2))
+        self.assertIsNone(cache.GetDatasetId(1, u"\xe9t\xe9", 4))
+        cache.SetDatasetId(1, u"\xe9t\xe9", 2, 5)
+        self.assertEqual(cache.GetDatasetId(1, u"\xe9t\xe9", 2), 5)
+        cache.Close()
+
+    def test_folder_lookups(self):
+        """
+        Test recording the results of user and group folder lookups.
+        """
+        cache = LookupCache()
+        cache.Open(self.cachePath)
+        userJson = {'id': 1, 'username': u"\xe9t\xe9"}
+        cache.SetFolderLookup("username", u"\xe9t\xe9", userJson)
+        cache.SetFolderLookup("username", u"nobody", None)
+        self.assertEqual(
+            cache.GetFolderLookup("username", "\xc3\xa9t\xc3\xa9", 60),
+            (True, userJson))
+        # Folders which weren't found in MyTardis are cached too:
+        self.assertEqual(
+            cache.GetFolderLookup("username", u"nobody", 60), (True, None))
+        # Lookups are specific to a kind of folder:
+        self.assertEqual(
+            cache.GetFolderLookup("group", u"nobody", 60), (False, None))
+        # Expired lookups need to be repeated:
+        self.assertEqual(
+            cache.GetFolderLookup("username", u"nobody", 0), (False, None))
+        cache.Close()
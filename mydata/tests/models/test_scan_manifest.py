@@ -0,0 +1,123 @@
+"""
+Test the manifest of scanned files used for incremental scans.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from ...models.manifest import ScanManifest
+from ...models.manifest import FIND_UNCHANGED_BATCH_SIZE
+from ...models.verification import VerificationStatus
+
+
+class ScanManifestTester(unittest.TestCase):
+    """
+    Test the manifest of scanned files used for incremental scans.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.manifestPath = os.path.join(self.tempDir, "scan-manifest.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def test_scan_manifest(self):
+        """
+        Test the manifest of scanned files used for incremental scans.
+        """
+        files = [(u"/data/ds1/a.txt", 10, 1.5, 100),
+                 (u"/data/ds1/\xe9t\xe9.txt", 20, 2.5, 101)]
+        manifest = ScanManifest()
+        # An unopened manifest behaves like an empty manifest:
+        manifest.Record(
+            u"/data/ds1", 1, files, VerificationStatus.FOUND_VERIFIED)
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds1", 1, files), [])
+        self.assertEqual(len(manifest), 0)
+
+        manifest.Open(self.manifestPath)
+        manifest.Record(
+            u"/data/ds1", 1, files, VerificationStatus.FOUND_VERIFIED)
+        self.assertEqual(
+            manifest.FindUnchanged(u"/data/ds1", 1, files), [0, 1])
+        # UTF-8 encoded paths are equivalent to unicode paths:
+        utf8Files = [("/data/ds1/\xc3\xa9t\xc3\xa9.txt", 20, 2.5, 101)]
+        self.assertEqual(
+            manifest.FindUnchanged("/data/ds1", 1, utf8Files), [0])
+        # Entries are specific to a folder:
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds2", 1, files), [])
+        # Entries are specific to a dataset, so files are looked up again
+        # if the folder is mapped to a different dataset:
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds1", 2, files), [])
+
+        # New and modified files need to be looked up again:
+        changedFiles = [(u"/data/ds1/a.txt", 11, 1.5, 100),
+                        (u"/data/ds1/a.txt", 10, 3.5, 100),
+                        (u"/data/ds1/a.txt", 10, 1.5, 200),
+                        (u"/data/ds1/b.txt", 10, 1.5, 102)]
+        self.assertEqual(
+            manifest.FindUnchanged(u"/data/ds1", 1, changedFiles), [])
+
+        # Only files whose last lookup found them to be verified are
+        # considered to be unchanged:
+        manifest.Record(u"/data/ds1", 1, files[:1],
+                        VerificationStatus.FOUND_UNVERIFIED_UNSTAGED)
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds1", 1, files), [1])
+        self.assertEqual(len(manifest), 2)
+
+        # Batches larger than the number of paths per query:
+        manyFiles = [(u"/data/ds3/%s.txt" % index, 10, 1.5, index)
+                     for index in range(FIND_UNCHANGED_BATCH_SIZE * 2 + 1)]
+        manifest.Record(u"/data/ds3", 1, manyFiles[-1:],
+                        VerificationStatus.FOUND_VERIFIED)
+        self.assertEqual(
+            manifest.FindUnchanged(u"/data/ds3", 1, manyFiles),
+            [len(manyFiles) - 1])
+
+        # Folder fingerprints:
+        self.assertIsNone(manifest.GetFingerprint(u"/data/ds1", 1))
+        manifest.RecordFingerprint(u"/data/ds1", "2:30:2.5:abc", 1)
+        self.assertEqual(
+            manifest.GetFingerprint(u"/data/ds1", 1), "2:30:2.5:abc")
+        manifest.RecordFingerprint(u"/data/ds1", "3:40:3.5:def", 1)
+        self.assertEqual(
+            manifest.GetFingerprint(u"/data/ds1", 1), "3:40:3.5:def")
+        # Fingerprints are specific to a dataset, so a folder which is now
+        # mapped to a different dataset isn't skipped:
+        self.assertIsNone(manifest.GetFingerprint(u"/data/ds1", 2))
+
+        # Entries persist after the manifest is closed and reopened:
+        manifest.Close()
+        manifest.Open(self.manifestPath)
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds1", 1, files), [1])
+        self.assertEqual(
+            manifest.GetFingerprint(u"/data/ds1", 1), "3:40:3.5:def")
+        manifest.Close()
+        self.assertIsNone(manifest.GetFingerprint(u"/data/ds1", 1))
+
+    def test_old_manifest_schema(self):
+        """
+        Test opening a manifest written with an earlier schema.
+        """
+        connection = sqlite3.connect(self.manifestPath)
+        connection.execute(
+            "CREATE TABLE scanned_files (folder TEXT NOT NULL, "
+            "path TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime REAL NOT NULL, inode INTEGER NOT NULL, "
+            "status INTEGER NOT NULL, PRIMARY KEY (folder, path))")
+        connection.execute(
+            "INSERT INTO scanned_files VALUES (?, ?, ?, ?, ?, ?)",
+            (u"/data/ds1", u"/data/ds1/a.txt", 10, 1.5, 100,
+             VerificationStatus.FOUND_VERIFIED))
+        connection.commit()
+        connection.close()
+        files = [(u"/data/ds1/a.txt", 10, 1.5, 100)]
+        manifest = ScanManifest()
+        manifest.Open(self.manifestPath)
+        # Entries which didn't record a dataset ID are discarded:
+        self.assertEqual(len(manifest), 0)
+        manifest.Record(
+            u"/data/ds1", 1, files, VerificationStatus.FOUND_VERIFIED)
+        self.assertEqual(manifest.FindUnchanged(u"/data/ds1", 1, files), [0])
+        manifest.Close()
@@ -0,0 +1,103 @@
+"""
+Test the local cache of verified DataFile lookups.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from ...models.cache import VerifiedDatafilesCache
+from ...models.cache import FIND_CACHED_BATCH_SIZE
+
+
+class VerifiedDatafilesCacheTester(unittest.TestCase):
+    """
+    Test the local cache of verified DataFile lookups.
+    """
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.cachePath = os.path.join(self.tempDir, "verified-files.db")
+        self.legacyPicklePath = \
+            os.path.join(self.tempDir, "verified-files.pkl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def test_verified_datafiles_cache(self):
+        """
+        Test the local cache of verified DataFile lookups.
+        """
+        cache = VerifiedDatafilesCache()
+        # An unopened cache behaves like an empty cache:
+        self.assertFalse(cache.Contains(1, u"/data/a.txt", 10, 1.5))
+        cache.Add(1, u"/data/a.txt", 10, 1.5)
+        self.assertEqual(len(cache), 0)
+
+        cache.Open(self.cachePath)
+        cache.Add(1, u"/data/a.txt", 10, 1.5)
+        cache.Add(1, u"/data/\xe9t\xe9.txt", 20, 2.5)
+        self.assertTrue(cache.Contains(1, u"/data/a.txt", 10, 1.5))
+        # UTF-8 encoded paths are equivalent to unicode paths:
+        self.assertTrue(
+            cache.Contains(1, "/data/\xc3\xa9t\xc3\xa9.txt", 20, 2.5))
+        self.assertFalse(cache.Contains(2, u"/data/a.txt", 10, 1.5))
+
+        # A locally modified file should be looked up again:
+        self.assertFalse(cache.Contains(1, u"/data/a.txt", 11, 1.5))
+        self.assertFalse(cache.Contains(1, u"/data/a.txt", 10, 3.5))
+        cache.Add(1, u"/data/a.txt", 11, 3.5)
+        self.assertTrue(cache.Contains(1, u"/data/a.txt", 11, 3.5))
+        self.assertEqual(len(cache), 2)
+
+        # Entries are committed as they are added:
+        reopenedCache = VerifiedDatafilesCache()
+        reopenedCache.Open(self.cachePath)
+        self.assertTrue(reopenedCache.Contains(1, u"/data/a.txt", 11, 3.5))
+        reopenedCache.Close()
+        cache.Close()
+
+    def test_import_legacy_pickle(self):
+        """
+        Test importing the pickled dictionary used by older versions of MyData.
+        """
+        with open(self.legacyPicklePath, 'wb') as cacheFile:
+            pickle.dump({"1,/data/a.txt": True}, cacheFile)
+        cache = VerifiedDatafilesCache()
+        cache.Open(self.cachePath, legacyPicklePath=self.legacyPicklePath)
+        self.assertFalse(os.path.exists(self.legacyPicklePath))
+        self.assertEqual(len(cache), 1)
+        # The first lookup of a legacy entry records the size and mtime:
+        self.assertTrue(cache.Contains(1, u"/data/a.txt", 10, 1.5))
+        self.assertFalse(cache.Contains(1, u"/data/a.txt", 11, 1.5))
+        cache.Close()
+
+    def test_find_cached(self):
+        """
+        Test checking a folder's files against the cache with one query.
+        """
+        cache = VerifiedDatafilesCache()
+        cache.Open(self.cachePath)
+        cache.Add(1, u"/data/a.txt", 10, 1.5)
+        cache.Add(1, u"/data/b.txt", 20, 2.5)
+        cache.Add(2, u"/data/c.txt", 30, 3.5)
+        files = [(u"/data/a.txt", 10, 1.5),
+                 (u"/data/b.txt", 21, 2.5),
+                 (u"/data/c.txt", 30, 3.5),
+                 (u"/data/d.txt", 40, 4.5)]
+        self.assertEqual(cache.FindCached(1, files), [0])
+        self.assertEqual(cache.FindCached(2, files), [2])
+        self.assertEqual(cache.FindCached(3, files), [])
+        # UTF-8 encoded paths are equivalent to unicode paths:
+        cache.Add(1, u"/data/\xe9t\xe9.txt", 20, 2.5)
+        self.assertEqual(
+            cache.FindCached(1, [("/data/\xc3\xa9t\xc3\xa9.txt", 20, 2.5)]),
+            [0])
+        # Batches larger than the number of paths per query:
+        manyFiles = [(u"/data/%s.txt" % index, 10, 1.5)
+                     for index in range(FIND_CACHED_BATCH_SIZE * 2 + 1)]
+        cache.Add(1, manyFiles[-1][0], 10, 1.5)
+        self.assertEqual(
+            cache.FindCached(1, manyFiles + files),
+            [len(manyFiles) - 1, len(manyFiles)])
+        cache.Close()
@@ -123,7 +123,7 @@ class ScanUsernameDatasetPostTester(MyDataScanFoldersTester):
         # know which one it will be.
         # Errno 10053 is a Winsock error: "Software caused connection abort"
         self.assertTrue(
-            "urlopen error [Errno 32] Broken pipe" in newLogs or
+            "[Errno 32] Broken pipe" in newLogs or
             "[Errno 54] Connection reset by peer" in newLogs or
             "BadStatusLine" in newLogs or
-            "urlopen error [Errno 10053]" in newLogs)
+            "[Errno 10053]" in newLogs)
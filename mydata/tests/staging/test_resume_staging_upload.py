@@ -0,0 +1,289 @@
+"""
+Test resuming partial uploads to staging.
+"""
+import glob
+import hashlib
+import logging
+import os
+import select
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import mydata.utils.openssh as OpenSSH
+import mydata.tests.fake_mytardis_helpers.get as fake_mytardis_get
+from ...logs import logger
+from ...settings import SETTINGS
+from ...models.settings.miscellaneous import MiscellaneousSettingsModel
+from ...models.settings.validation import ValidateSettings
+from ...dataviewmodels.dataview import DATAVIEW_MODELS
+from ...dataviewmodels.uploads import UploadsModel
+from ...dataviewmodels.verifications import VerificationsModel
+from ...controllers.folders import FoldersController
+from ...controllers.uploads import UploadDatafileRunnable
+from ...models.upload import UploadStatus
+from ...utils.exceptions import PrivateKeyDoesNotExist
+from ..fake_mytardis_helpers import STAGING_PATH
+from .. import MyDataScanFoldersTester
+from .. import InitializeModels
+from ..fake_ssh_server import ThreadedSshServer
+from ..utils import Subtract
+from ..utils import GetEphemeralPort
+
+
+class FakeDataFile(object):
+    """
+    Existing unverified DataFile record, with the size and MD5 checksum
+    used to check a resumed upload
+    """
+    def __init__(self, size, md5sum):
+        self.size = size
+        self.md5sum = md5sum
+
+
+class FakeUploadModel(object):
+    """
+    Upload model for calling ResumeUploadFile directly
+    """
+    def __init__(self):
+        self.canceled = False
+        self.status = UploadStatus.NOT_STARTED
+        self.scpUploadProcessPid = None
+
+    def SetLatestTime(self, latestTime):
+        """
+        Set the latest time at which the upload was progressing
+        """
+        pass
+
+
+@unittest.skipIf(sys.platform.startswith("win"),
+                 "The staging server's truncate command requires Cygwin")
+class ResumeStagingUploadTester(MyDataScanFoldersTester):
+    """
+    Test resuming partial uploads to staging.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ResumeStagingUploadTester, self).__init__(*args, **kwargs)
+        self.fakeSshServerThread = None
+        self.scpPort = None
+        self.tempDir = None
+
+    def setUp(self):
+        super(ResumeStagingUploadTester, self).setUp()
+        logger.SetLevel(logging.DEBUG)
+        # The fake SSH server needs to know the public key so it can
+        # authenticate the test client, so the key pair is generated
+        # before starting the fake SSH server:
+        try:
+            self.keyPair = OpenSSH.FindKeyPair("MyDataTest")
+        except PrivateKeyDoesNotExist:
+            self.keyPair = OpenSSH.NewKeyPair("MyDataTest")
+        self.scpPort = GetEphemeralPort()
+        fake_mytardis_get.SCP_PORT = self.scpPort
+        self.StartFakeSshServer()
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(ResumeStagingUploadTester, self).tearDown()
+        self.keyPair.Delete()
+        self.sshd.shutdown()
+        self.fakeSshServerThread.join()
+        shutil.rmtree(self.tempDir)
+
+    def test_resume_upload(self):
+        """
+        Test resuming a partial upload from the staged byte count.
+        """
+        self.app.foldersController = FoldersController(self.app.frame)
+        self.WaitForFakeSshServer()
+        content = "".join(chr(ord('a') + i % 26) for i in range(100))
+        md5sum = hashlib.md5(content).hexdigest()
+        filePath = os.path.join(self.tempDir, "file.txt")
+        with open(filePath, 'wb') as localFile:
+            localFile.write(content)
+        remoteFilePath = os.path.join(self.tempDir, "staged file.txt")
+
+        # MyTardis reports 60 staged bytes, but the staged file is longer
+        # (e.g. if the last chunk was written after the count was taken),
+        # so it is truncated before the rest of the file is appended:
+        with open(remoteFilePath, 'wb') as remoteFile:
+            remoteFile.write(content[:60] + "-" * 20)
+        bytesUploaded = []
+
+        def ProgressCallback(current, total, message=None):
+            """
+            Record the upload's progress
+            """
+            self.assertEqual(total, len(content))
+            bytesUploaded.append(current)
+
+        uploadModel = FakeUploadModel()
+        self.assertTrue(
+            OpenSSH.ResumeUploadFile(
+                filePath, len(content), 60, md5sum, "mydata",
+                self.keyPair.privateKeyFilePath, "127.0.0.1",
+                str(self.scpPort), remoteFilePath, ProgressCallback,
+                uploadModel))
+        with open(remoteFilePath, 'rb') as remoteFile:
+            self.assertEqual(remoteFile.read(), content)
+        self.assertEqual(bytesUploaded[0], 60)
+        self.assertEqual(bytesUploaded[-1], len(content))
+        self.assertEqual(uploadModel.status, UploadStatus.IN_PROGRESS)
+
+        # If the staged bytes don't match the local file, the resumed
+        # upload's MD5 checksum doesn't match, so it is rejected:
+        with open(remoteFilePath, 'wb') as remoteFile:
+            remoteFile.write("-" * 60)
+        loggerOutput = logger.GetValue()
+        self.assertFalse(
+            OpenSSH.ResumeUploadFile(
+                filePath, len(content), 60, md5sum, "mydata",
+                self.keyPair.privateKeyFilePath, "127.0.0.1",
+                str(self.scpPort), remoteFilePath, ProgressCallback,
+                FakeUploadModel()))
+        newLogs = Subtract(logger.GetValue(), loggerOutput)
+        self.assertIn("Resumed upload of %s has size %s and MD5 sum"
+                      % (filePath, len(content)), newLogs)
+
+    def test_resumable_byte_count(self):
+        """
+        Test deciding whether a partial upload can be resumed.
+        """
+        md5sum = "c033080e8b2ec59e37fb1a9dc341c813"
+
+        def GetResumableByteCount(existingDatafile, bytesUploadedPreviously,
+                                  dataFileSize=36):
+            """
+            Return the number of staged bytes which would be kept
+            """
+            runnable = UploadDatafileRunnable(
+                None, 0, existingDatafile, None,
+                bytesUploadedPreviously=bytesUploadedPreviously)
+            return runnable.GetResumableByteCount(dataFileSize)
+
+        self.assertEqual(
+            GetResumableByteCount(FakeDataFile("36", md5sum), "30"), 30)
+        # Nothing has been staged:
+        self.assertEqual(
+            GetResumableByteCount(FakeDataFile("36", md5sum), None), 0)
+        self.assertEqual(GetResumableByteCount(None, None), 0)
+        # The staged file is already full size:
+        self.assertEqual(
+            GetResumableByteCount(FakeDataFile("36", md5sum), "36"), 0)
+        # The local file's size has changed since the record was created:
+        self.assertEqual(
+            GetResumableByteCount(
+                FakeDataFile("36", md5sum), "30", dataFileSize=40), 0)
+        # The record's MD5 checksum is the fake placeholder, so it can't
+        # be used to check the resumed upload:
+        fakeMd5Sum = MiscellaneousSettingsModel.GetFakeMd5Sum()
+        self.assertEqual(
+            GetResumableByteCount(FakeDataFile("36", fakeMd5Sum), "30"), 0)
+        self.assertEqual(
+            GetResumableByteCount(FakeDataFile("36", None), "30"), 0)
+
+    def test_resume_falls_back_to_full_upload(self):
+        """
+        Test uploading the whole file when a partial upload can't be resumed.
+        """
+        self.UpdateSettingsFromCfg("testdataUsernameDataset")
+        ValidateSettings()
+        SETTINGS.uploaderModel = None
+        SETTINGS.uploaderModel.UploadUploaderInfo()
+        SETTINGS.uploaderModel.sshKeyPair = self.keyPair
+        InitializeModels()
+        foldersModel = DATAVIEW_MODELS['folders']
+        foldersModel.ScanFolders(MyDataScanFoldersTester.ProgressCallback)
+        numFiles = 0
+        for row in range(foldersModel.GetRowCount()):
+            numFiles += foldersModel.GetFolderRecord(row).numFiles
+        DATAVIEW_MODELS['verifications'] = VerificationsModel()
+        verificationsModel = DATAVIEW_MODELS['verifications']
+        DATAVIEW_MODELS['uploads'] = UploadsModel()
+        uploadsModel = DATAVIEW_MODELS['uploads']
+        foldersController = FoldersController(self.app.frame)
+        self.app.foldersController = foldersController
+        self.WaitForFakeSshServer()
+
+        # The fake MyTardis server reports that 30 of the 36 bytes of
+        # existing_unverified_incomplete_file.txt have been staged, but
+        # they haven't been, so the resumed upload is rejected (or fails,
+        # if the dataset's staging directory hasn't been created yet) and
+        # the whole file is uploaded instead:
+        loggerOutput = logger.GetValue()
+        foldersController.InitForUploads()
+        for row in range(foldersModel.GetRowCount()):
+            folderModel = foldersModel.GetFolderRecord(row)
+            foldersController.StartUploadsForFolder(folderModel)
+        foldersController.FinishedScanningForDatasetFolders()
+        while True:
+            numVerificationsCompleted = verificationsModel.GetCompletedCount()
+            uploadsProcessed = \
+                uploadsModel.GetCompletedCount() + \
+                uploadsModel.GetFailedCount()
+            finishedVerificationCounting = True
+            for folder in foldersController.finishedCountingVerifications:
+                if not foldersController.finishedCountingVerifications[folder]:
+                    finishedVerificationCounting = False
+            if numVerificationsCompleted == numFiles \
+                    and finishedVerificationCounting \
+                    and uploadsProcessed == uploadsModel.GetRowCount():
+                break
+            time.sleep(0.1)
+        foldersController.ShutDownUploadThreads()
+        newLogs = Subtract(logger.GetValue(), loggerOutput)
+        self.assertRegexpMatches(
+            newLogs,
+            ".*Resuming upload of .*existing_unverified_incomplete_file.txt "
+            "from byte 30.*")
+        self.assertEqual(uploadsModel.GetFailedCount(), 0)
+
+        localFilePath = os.path.join(
+            SETTINGS.general.dataDirectory, "testuser1", "Flowers",
+            "existing_unverified_incomplete_file.txt")
+        with open(localFilePath, 'rb') as localFile:
+            content = localFile.read()
+        stagedFilePaths = glob.glob(os.path.join(
+            STAGING_PATH, "DatasetDescription-*",
+            "existing_unverified_incomplete_file.txt"))
+        self.assertTrue(stagedFilePaths)
+        for stagedFilePath in stagedFilePaths:
+            with open(stagedFilePath, 'rb') as stagedFile:
+                self.assertEqual(stagedFile.read(), content)
+
+    def WaitForFakeSshServer(self):
+        """
+        Wait for the fake SSH server to accept connections.
+        """
+        attempts = 0
+        while not OpenSSH.SshServerIsReady(
+                "mydata", self.keyPair.privateKeyFilePath, "127.0.0.1",
+                self.scpPort):
+            attempts += 1
+            if attempts > 10:
+                raise Exception(
+                    "Couldn't connect to SSH server at 127.0.0.1:%s"
+                    % self.scpPort)
+            time.sleep(0.25)
+
+    def StartFakeSshServer(self):
+        """
+        Start fake SSH server.
+        """
+        self.sshd = ThreadedSshServer(("127.0.0.1", self.scpPort))
+
+        def FakeSshServer():
+            """ Run fake SSH server """
+            try:
+                self.sshd.serve_forever()
+            except (IOError, OSError, socket.error, select.error):
+                pass
+        self.fakeSshServerThread = \
+            threading.Thread(target=FakeSshServer, name="FakeSshServerThread")
+        self.fakeSshServerThread.daemon = True
+        self.fakeSshServerThread.start()
@@ -0,0 +1,336 @@
+"""
+Test uploading to staging with MyData's built-in SFTP client.
+"""
+import hashlib
+import os
+import select
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+import mydata.utils.openssh as OpenSSH
+from ...controllers.folders import FoldersController
+from ...models.upload import UploadStatus
+from ...utils.exceptions import PrivateKeyDoesNotExist
+from ...utils.openssh import REMOTE_DIRS_CREATED
+from ...utils.sftp import CreateRemoteDirWithSftp
+from ...utils.sftp import ResumeUploadFileWithSftp
+from ...utils.sftp import SftpConnectionPool
+from ...utils.sftp import SFTP_POOL
+from ...utils.sftp import UploadFileWithSftp
+from .. import MyDataTester
+from ..fake_ssh_server import ThreadedSshServer
+from ..utils import GetEphemeralPort
+
+
+class StubSftpClient(object):
+    """
+    SFTP client which records the remote directories created, and acts as
+    its own channel and transport
+    """
+    def __init__(self, existingDirs=(), racingDirs=()):
+        self.dirs = set(existingDirs)
+        # Directories created by someone else between stat and mkdir:
+        self.racingDirs = set(racingDirs)
+        self.mkdirs = []
+        self.chmods = []
+        self.active = True
+        self.closed = False
+
+    def stat(self, path):
+        """
+        Raise IOError if path doesn't exist
+        """
+        if path not in self.dirs:
+            raise IOError(2, "No such file")
+
+    def mkdir(self, path):
+        """
+        Create a directory, unless someone else has just created it
+        """
+        if path in self.racingDirs:
+            self.dirs.add(path)
+            raise IOError("Failure")
+        self.mkdirs.append(path)
+        self.dirs.add(path)
+
+    def chmod(self, path, mode):
+        """
+        Record a change of permissions
+        """
+        self.chmods.append((path, mode))
+
+    def get_channel(self):
+        """
+        Return the SFTP session's channel
+        """
+        return self
+
+    def get_transport(self):
+        """
+        Return the channel's transport
+        """
+        return self
+
+    def is_active(self):
+        """
+        Return True if the transport hasn't been closed
+        """
+        return self.active
+
+    def close(self):
+        """
+        Close the transport
+        """
+        self.active = False
+        self.closed = True
+
+
+class StubSftpConnectionPool(SftpConnectionPool):
+    """
+    SFTP connection pool whose connections are stub SFTP clients
+    """
+    def __init__(self):
+        super(StubSftpConnectionPool, self).__init__()
+        self.connections = []
+
+    def Connect(self, username, privateKeyFilePath, host, port):
+        """
+        Return a new stub SFTP client
+        """
+        sftp = StubSftpClient()
+        self.connections.append((username, host, port, sftp))
+        return sftp
+
+
+class SftpConnectionPoolTester(unittest.TestCase):
+    """
+    Test the SFTP connection pool and remote directory creation.
+    """
+    def setUp(self):
+        for remoteDir in list(REMOTE_DIRS_CREATED):
+            if remoteDir.startswith("/staging/"):
+                del REMOTE_DIRS_CREATED[remoteDir]
+
+    def test_create_remote_dir(self):
+        """
+        Test creating remote directories with mode 2770.
+        """
+        sftp = StubSftpClient(existingDirs=["/staging"])
+        CreateRemoteDirWithSftp(sftp, "/staging/a/b")
+        self.assertEqual(sftp.mkdirs, ["/staging/a", "/staging/a/b"])
+        self.assertEqual(
+            sftp.chmods, [("/staging/a", 0o2770), ("/staging/a/b", 0o2770)])
+
+        # Directories which have been created aren't checked again:
+        sftp = StubSftpClient()
+        CreateRemoteDirWithSftp(sftp, "/staging/a/b")
+        self.assertEqual(sftp.mkdirs, [])
+
+        # If another upload thread creates a directory first, it is
+        # left alone:
+        sftp = StubSftpClient(
+            existingDirs=["/staging"], racingDirs=["/staging/c"])
+        CreateRemoteDirWithSftp(sftp, "/staging/c/d")
+        self.assertEqual(sftp.mkdirs, ["/staging/c/d"])
+        self.assertEqual(sftp.chmods, [("/staging/c/d", 0o2770)])
+
+        # If a directory can't be created, the error is raised:
+        sftp = StubSftpClient(existingDirs=["/staging"])
+        sftp.mkdir = lambda path: sftp.stat("/missing")
+        with self.assertRaises(IOError):
+            CreateRemoteDirWithSftp(sftp, "/staging/e")
+        self.assertNotIn("/staging/e", REMOTE_DIRS_CREATED)
+
+    def test_acquire_and_release(self):
+        """
+        Test reusing pooled SFTP sessions.
+        """
+        pool = StubSftpConnectionPool()
+        sftp1 = pool.Acquire("mydata", "key", "staging", "22")
+        self.assertEqual(len(pool.connections), 1)
+        pool.Release(sftp1, "mydata", "staging", "22")
+
+        # An idle session is reused, whether the port is a string or not:
+        self.assertIs(pool.Acquire("mydata", "key", "staging", 22), sftp1)
+        self.assertEqual(len(pool.connections), 1)
+
+        # A session is only used by one thread at a time:
+        sftp2 = pool.Acquire("mydata", "key", "staging", "22")
+        self.assertIsNot(sftp2, sftp1)
+        self.assertEqual(len(pool.connections), 2)
+
+        # Sessions aren't shared between servers:
+        sftp3 = pool.Acquire("mydata", "key", "staging2", "22")
+        self.assertEqual(pool.connections[-1][:3], ("mydata", "staging2", 22))
+        pool.Release(sftp3, "mydata", "staging2", "22")
+
+        # Sessions whose connections have been closed are discarded:
+        pool.Release(sftp1, "mydata", "staging", "22")
+        pool.Release(sftp2, "mydata", "staging", "22")
+        sftp2.active = False
+        self.assertIs(pool.Acquire("mydata", "key", "staging", "22"), sftp1)
+        self.assertTrue(sftp2.closed)
+        sftp4 = pool.Acquire("mydata", "key", "staging", "22")
+        self.assertNotIn(sftp4, (sftp1, sftp2))
+        self.assertEqual(len(pool.connections), 4)
+        pool.Release(sftp4, "mydata", "staging", "22")
+
+        pool.CloseAll()
+        self.assertTrue(sftp3.closed)
+        self.assertTrue(sftp4.closed)
+        self.assertEqual(pool.idleSessions, dict())
+
+
+class FakeUploadModel(object):
+    """
+    Upload model for calling the SFTP upload functions directly
+    """
+    def __init__(self):
+        self.canceled = False
+        self.status = UploadStatus.NOT_STARTED
+        self.startTime = None
+
+    def SetLatestTime(self, latestTime):
+        """
+        Set the latest time at which the upload was progressing
+        """
+        pass
+
+
+class SftpUploadsTester(MyDataTester):
+    """
+    Test uploading to staging with MyData's built-in SFTP client.
+    """
+    def __init__(self, *args, **kwargs):
+        super(SftpUploadsTester, self).__init__(*args, **kwargs)
+        self.fakeSshServerThread = None
+        self.scpPort = None
+        self.tempDir = None
+
+    def setUp(self):
+        super(SftpUploadsTester, self).setUp()
+        # The fake SSH server needs to know the public key so it can
+        # authenticate the test client, so the key pair is generated
+        # before starting the fake SSH server:
+        try:
+            self.keyPair = OpenSSH.FindKeyPair("MyDataTest")
+        except PrivateKeyDoesNotExist:
+            self.keyPair = OpenSSH.NewKeyPair("MyDataTest")
+        self.scpPort = GetEphemeralPort()
+        self.StartFakeSshServer()
+        self.tempDir = tempfile.mkdtemp()
+        self.app.foldersController = FoldersController(self.app.frame)
+
+    def tearDown(self):
+        SFTP_POOL.CloseAll()
+        super(SftpUploadsTester, self).tearDown()
+        self.keyPair.Delete()
+        self.sshd.shutdown()
+        self.fakeSshServerThread.join()
+        shutil.rmtree(self.tempDir)
+
+    def test_sftp_uploads(self):
+        """
+        Test uploading and resuming uploads with SFTP.
+        """
+        attempts = 0
+        while not OpenSSH.SshServerIsReady(
+                "mydata", self.keyPair.privateKeyFilePath, "127.0.0.1",
+                self.scpPort):
+            attempts += 1
+            if attempts > 10:
+                raise Exception(
+                    "Couldn't connect to SSH server at 127.0.0.1:%s"
+                    % self.scpPort)
+            time.sleep(0.25)
+        content = os.urandom(3 * 1024 * 1024 + 100)
+        filePath = os.path.join(self.tempDir, "file.bin")
+        with open(filePath, 'wb') as localFile:
+            localFile.write(content)
+        remoteDir = os.path.join(self.tempDir, "staging", "dataset")
+        remoteFilePath = os.path.join(remoteDir, "file.bin")
+        bytesUploaded = []
+
+        def ProgressCallback(current, total, message=None):
+            """
+            Record the upload's progress
+            """
+            self.assertEqual(total, len(content))
+            bytesUploaded.append(current)
+
+        def UploadFile(remoteFilePath):
+            """
+            Upload the file, returning its MD5 checksum, calculated
+            while uploading it
+            """
+            md5 = hashlib.md5()
+            UploadFileWithSftp(
+                filePath, len(content), "mydata",
+                self.keyPair.privateKeyFilePath, "127.0.0.1", self.scpPort,
+                remoteFilePath, ProgressCallback, FakeUploadModel(), md5=md5)
+            return md5.hexdigest()
+
+        md5sum = UploadFile(remoteFilePath)
+        self.assertEqual(md5sum, hashlib.md5(content).hexdigest())
+        with open(remoteFilePath, 'rb') as remoteFile:
+            self.assertEqual(remoteFile.read(), content)
+        self.assertEqual(bytesUploaded[0], 0)
+        self.assertEqual(bytesUploaded[-1], len(content))
+        self.assertEqual(
+            stat.S_IMODE(os.stat(remoteDir).st_mode), 0o2770)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(remoteFilePath).st_mode), 0o660)
+
+        # The SFTP session is returned to the pool and reused:
+        key = ("mydata", "127.0.0.1", self.scpPort)
+        self.assertEqual(len(SFTP_POOL.idleSessions[key]), 1)
+        sftp = SFTP_POOL.idleSessions[key][0]
+        UploadFile(os.path.join(remoteDir, "file2.bin"))
+        self.assertEqual(SFTP_POOL.idleSessions[key], [sftp])
+
+        # A session whose connection has been closed is replaced:
+        sftp.get_channel().get_transport().close()
+        UploadFile(os.path.join(remoteDir, "file3.bin"))
+        self.assertEqual(len(SFTP_POOL.idleSessions[key]), 1)
+        self.assertIsNot(SFTP_POOL.idleSessions[key][0], sftp)
+
+        # Resuming an upload truncates the staged file to the number of
+        # bytes reported by MyTardis and appends the rest of the file.
+        # The fake SSH server doesn't allow md5sum to be run on SFTP
+        # connections, so only the resumed file's size is checked:
+        with open(remoteFilePath, 'wb') as remoteFile:
+            remoteFile.write(content[:1024 * 1024] + "-" * 100)
+        del bytesUploaded[:]
+        uploadModel = FakeUploadModel()
+        self.assertTrue(
+            ResumeUploadFileWithSftp(
+                filePath, len(content), 1024 * 1024, md5sum, "mydata",
+                self.keyPair.privateKeyFilePath, "127.0.0.1", self.scpPort,
+                remoteFilePath, ProgressCallback, uploadModel))
+        with open(remoteFilePath, 'rb') as remoteFile:
+            self.assertEqual(remoteFile.read(), content)
+        self.assertEqual(bytesUploaded[0], 1024 * 1024)
+        self.assertEqual(bytesUploaded[-1], len(content))
+        self.assertEqual(uploadModel.status, UploadStatus.IN_PROGRESS)
+
+    def StartFakeSshServer(self):
+        """
+        Start fake SSH server.
+        """
+        self.sshd = ThreadedSshServer(("127.0.0.1", self.scpPort))
+
+        def FakeSshServer():
+            """ Run fake SSH server """
+            try:
+                self.sshd.serve_forever()
+            except (IOError, OSError, socket.error, select.error):
+                pass
+        self.fakeSshServerThread = \
+            threading.Thread(target=FakeSshServer, name="FakeSshServerThread")
+        self.fakeSshServerThread.daemon = True
+        self.fakeSshServerThread.start()
@@ -5,9 +5,10 @@ import threading
 
 LOCK_NAMES = [
     'scanningFolders', 'createUploader', 'requestStagingAccess',
-    'updateCache', 'closeCache', 'displayModalDialog',
+    'updateCache', 'updateLookupCache', 'updateChecksumCache',
+    'updateManifest', 'displayModalDialog',
     'updateLastErrorMessage', 'updateLastConfirmationQuestion',
-    'addVerification', 'addUpload', 'finishedCounting', 'getOrCreateExp',
+    'addVerification', 'addUpload', 'finishedCounting',
     'numVerificationsToBePerformed', 'createDir', 'foldersToUpdate',
     'createRemoteDir']
 
@@ -38,3 +39,35 @@ class ThreadingLocks(object):
 
 
 LOCKS = ThreadingLocks()
+
+
+class KeyedLocks(object):
+    """
+    A lock for each key, e.g. each experiment which MyData needs to look up,
+    so threads working on different keys don't block each other.
+
+    Usage:
+
+        experimentLocks = KeyedLocks()
+        with experimentLocks.Get(key):
+            GetOrCreateExperiment(key)
+    """
+    def __init__(self):
+        self._locks = dict()
+        self._lock = threading.Lock()
+
+    def Get(self, key):
+        """
+        Return the lock for key, creating it if necessary
+        """
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def Clear(self):
+        """
+        Forget all of the locks (which must not be held)
+        """
+        with self._lock:
+            self._locks.clear()
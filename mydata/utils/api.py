@@ -0,0 +1,156 @@
+"""
+Per-thread HTTP sessions for querying the MyTardis API.
+
+Calling the module-level requests.get / requests.post functions creates
+a new connection (including a TLS handshake for HTTPS) for every request.
+Routing all authenticated MyTardis API requests through a requests.Session
+for each thread allows connections to be kept alive and reused by the
+verification and upload worker threads.
+
+Usage:
+
+    from ..utils.api import MYTARDIS_API
+    response = MYTARDIS_API.Get(url, SETTINGS)
+"""
+# For Python3, this will change to "from http.cookiejar import CookiePolicy":
+from cookielib import CookiePolicy
+import threading
+
+import requests
+
+
+class BlockAllCookies(CookiePolicy):
+    """
+    Cookie policy which rejects all cookies.
+
+    MyTardis API requests are authorized by the headers sent with each
+    request, so cookies set by the server (e.g. a Django sessionid) don't
+    need to be kept, and mustn't outlive a change of username or API key.
+    """
+    netscape = True
+    rfc2965 = hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class MyTardisApiClient(object):
+    """
+    Sends MyTardis API requests using a requests.Session for each thread.
+
+    requests doesn't guarantee that a Session can be used by several
+    threads at once, so each thread is given its own session, whose
+    connections are kept alive between that thread's requests.  The
+    sessions don't store cookies, and they are all discarded when the
+    credentials change or when Close is called.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Each thread's session, so they can all be closed:
+        self._sessions = dict()
+        # Incremented to discard the sessions created before Close:
+        self._generation = 0
+        self._credentials = None
+        self._headers = None
+
+    @property
+    def session(self):
+        """
+        Return the current thread's requests.Session, creating it if
+        necessary
+        """
+        with self._lock:
+            if getattr(self._local, 'generation', None) == self._generation:
+                return self._local.session
+            session = requests.Session()
+            session.cookies.set_policy(BlockAllCookies())
+            currentThread = threading.current_thread()
+            for thread in list(self._sessions):
+                if not thread.is_alive() and thread is not currentThread:
+                    self._sessions.pop(thread).close()
+            self._sessions[currentThread] = session
+            self._local.session = session
+            self._local.generation = self._generation
+            return session
+
+    def GetHeaders(self, settings):
+        """
+        Return the default headers, including authorization for the
+        MyTardis API.  The headers are only rebuilt when the
+        credentials change, and then the sessions are rebuilt too.
+
+        The returned dictionary is shared, so it shouldn't be modified.
+        """
+        credentials = (settings.general.username, settings.general.apiKey)
+        with self._lock:
+            if credentials != self._credentials:
+                if self._credentials is not None:
+                    self._CloseSessions()
+                self._headers = settings.defaultHeaders
+                self._credentials = credentials
+            return self._headers
+
+    def Request(self, method, url, settings, **kwargs):
+        """
+        Send an authenticated request to the MyTardis API
+
+        :raises requests.exceptions.RequestException:
+        """
+        kwargs.setdefault('headers', self.GetHeaders(settings))
+        return self.session.request(method, url, **kwargs)
+
+    def Get(self, url, settings, **kwargs):
+        """
+        Send an authenticated GET request to the MyTardis API
+        """
+        return self.Request("GET", url, settings, **kwargs)
+
+    def Post(self, url, settings, **kwargs):
+        """
+        Send an authenticated POST request to the MyTardis API
+        """
+        return self.Request("POST", url, settings, **kwargs)
+
+    def Put(self, url, settings, **kwargs):
+        """
+        Send an authenticated PUT request to the MyTardis API
+        """
+        return self.Request("PUT", url, settings, **kwargs)
+
+    def Patch(self, url, settings, **kwargs):
+        """
+        Send an authenticated PATCH request to the MyTardis API
+        """
+        return self.Request("PATCH", url, settings, **kwargs)
+
+    def _CloseSessions(self):
+        """
+        Close all of the threads' sessions, so each thread creates a new
+        session for its next request.
+
+        Must be called while holding self._lock.
+        """
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+        self._generation += 1
+
+    def Close(self):
+        """
+        Close all of the threads' sessions and their connections
+        """
+        with self._lock:
+            self._CloseSessions()
+
+
+MYTARDIS_API = MyTardisApiClient()
@@ -0,0 +1,107 @@
+"""
+Compiled glob patterns from the includes and excludes files specified in
+the Filters tab of MyData's settings dialog.
+
+Each file's globs are compiled into a single regular expression, which is
+only recompiled when the file's modified time or size changes, so scanning
+a large data directory doesn't require re-reading the patterns file for
+every filename.
+
+Lines ending with '/' (e.g. 'tmp/') are directory patterns.  They never
+match filenames, but they can be used to prune whole subdirectories from
+a folder scan.
+"""
+import fnmatch
+import os
+import re
+import threading
+
+
+class PatternsFile(object):
+    """
+    Compiled glob patterns from an includes or excludes file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.fileRegex = None
+        self.directoryRegex = None
+        # The (mtime, size) of the patterns file when it was compiled:
+        self.signature = None
+
+    def ReloadIfModified(self):
+        """
+        Recompile the patterns if the file has been modified since they
+        were last compiled.
+
+        :raises OSError: if the file can't be accessed.
+        """
+        fileInfo = os.stat(self.path)
+        signature = (fileInfo.st_mtime, fileInfo.st_size)
+        if signature == self.signature:
+            return
+        fileGlobs = []
+        directoryGlobs = []
+        with open(self.path, 'r') as patternsFile:
+            for glob in patternsFile.readlines():
+                glob = glob.decode('utf-8').strip()
+                if glob == "":
+                    continue
+                if glob.startswith(";"):
+                    continue
+                if glob.startswith("#"):
+                    continue
+                if glob.endswith("/"):
+                    directoryGlobs.append(glob.rstrip("/"))
+                else:
+                    fileGlobs.append(glob)
+        self.fileRegex = PatternsFile.Compile(fileGlobs)
+        self.directoryRegex = PatternsFile.Compile(directoryGlobs)
+        self.signature = signature
+
+    @staticmethod
+    def Compile(globs):
+        """
+        Compile globs into a single regular expression, matching names
+        in the same way as fnmatch.fnmatch, i.e. case-insensitively on
+        Windows.  Returns None if there are no globs.
+        """
+        if not globs:
+            return None
+        return re.compile("|".join(
+            "(?:%s)" % fnmatch.translate(os.path.normcase(glob))
+            for glob in globs))
+
+    def MatchesFile(self, filename):
+        """
+        Return True if filename matches at least one file pattern
+        """
+        if not self.fileRegex:
+            return False
+        return self.fileRegex.match(os.path.normcase(filename)) is not None
+
+    def MatchesDirectory(self, dirname):
+        """
+        Return True if dirname matches at least one directory pattern
+        """
+        if not self.directoryRegex:
+            return False
+        return self.directoryRegex.match(os.path.normcase(dirname)) is not None
+
+
+PATTERNS_FILES = dict()
+PATTERNS_FILES_LOCK = threading.Lock()
+
+
+def GetPatternsFile(path):
+    """
+    Return the compiled patterns for the includes or excludes file at path,
+    recompiling them if the file has been modified.
+
+    :raises OSError: if the file can't be accessed.
+    """
+    with PATTERNS_FILES_LOCK:
+        if path not in PATTERNS_FILES:
+            PATTERNS_FILES[path] = PatternsFile(path)
+        patternsFile = PATTERNS_FILES[path]
+        patternsFile.ReloadIfModified()
+        return patternsFile
@@ -0,0 +1,149 @@
+"""
+Calculates MD5 checksums in a pool of worker processes, so that many
+files can be hashed in parallel across CPU cores, rather than sharing
+the Global Interpreter Lock with MyData's GUI and worker threads.
+
+Each worker process reads files into one large buffer, which is reused
+for every file it hashes.  A worker reports its progress by updating a
+slot in an array shared with MyData's process, which the calling thread
+polls at a throttled rate, so progress updates don't need to be sent
+between processes for each chunk.  The calling thread can also set a
+cancellation flag in a shared array, which the worker checks between
+chunks.
+"""
+import hashlib
+import multiprocessing
+import signal
+import threading
+# For Python3, this will change to "from queue import Queue":
+from Queue import Queue
+
+from ..settings import SETTINGS
+
+# The size of each worker process's reusable read buffer:
+BUFFER_SIZE = 8 * 1024 * 1024
+
+# The maximum number of files which can be hashed (or waiting to be
+# hashed) at once, i.e. the number of progress and cancellation slots
+# in the shared arrays:
+MAX_CONCURRENT_FILES = 256
+
+# How often (in seconds) the calling thread reports a file's progress:
+PROGRESS_INTERVAL = 0.5
+
+# Set in each worker process by InitWorker:
+WORKER_STATE = dict()
+
+
+def InitWorker(bytesHashed, canceled):
+    """
+    Initialize a worker process
+    """
+    # The parent process handles keyboard interrupts:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    WORKER_STATE['bytesHashed'] = bytesHashed
+    WORKER_STATE['canceled'] = canceled
+    WORKER_STATE['buffer'] = bytearray(BUFFER_SIZE)
+
+
+def HashFile(filePath, slot):
+    """
+    Calculate a file's MD5 checksum in a worker process, returning None
+    if the calculation is canceled.
+    """
+    bytesHashed = WORKER_STATE['bytesHashed']
+    canceled = WORKER_STATE['canceled']
+    buf = WORKER_STATE['buffer']
+    view = memoryview(buf)
+    md5 = hashlib.md5()
+    with open(filePath, 'rb', 0) as fileHandle:
+        while True:
+            if canceled[slot]:
+                return None
+            numBytes = fileHandle.readinto(buf)
+            if not numBytes:
+                break
+            md5.update(view[:numBytes])
+            bytesHashed[slot] += numBytes
+    return md5.hexdigest()
+
+
+class Md5ProcessPool(object):
+    """
+    A pool of worker processes for calculating MD5 checksums, which is
+    created when it is first used and resized if the hashing_processes
+    setting changes.
+
+    A singleton instance of this class (called MD5_PROCESS_POOL) is
+    created in this module.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.numProcesses = 0
+        self.bytesHashed = multiprocessing.RawArray('d', MAX_CONCURRENT_FILES)
+        self.canceled = multiprocessing.RawArray('b', MAX_CONCURRENT_FILES)
+        self.freeSlots = Queue()
+        for slot in range(MAX_CONCURRENT_FILES):
+            self.freeSlots.put(slot)
+
+    def GetPool(self):
+        """
+        Return the pool of worker processes, starting it if necessary
+        """
+        numProcesses = max(1, SETTINGS.miscellaneous.hashingProcesses)
+        with self.lock:
+            if self.pool and self.numProcesses != numProcesses:
+                # Any files still being hashed by the old pool's
+                # processes will be finished before they exit:
+                self.pool.close()
+                self.pool = None
+            if not self.pool:
+                self.pool = multiprocessing.Pool(
+                    processes=numProcesses, initializer=InitWorker,
+                    initargs=(self.bytesHashed, self.canceled))
+                self.numProcesses = numProcesses
+            return self.pool
+
+    def Md5Sum(self, filePath, progressCallback=None,
+               canceledCallback=None):
+        """
+        Calculate a file's MD5 checksum in a worker process, blocking the
+        calling thread until it is done.  Returns None if canceledCallback
+        returns True before the calculation is complete.
+        """
+        if canceledCallback and canceledCallback():
+            return None
+        pool = self.GetPool()
+        slot = self.freeSlots.get()
+        try:
+            self.bytesHashed[slot] = 0
+            self.canceled[slot] = 0
+            asyncResult = pool.apply_async(HashFile, (filePath, slot))
+            while True:
+                asyncResult.wait(PROGRESS_INTERVAL)
+                if asyncResult.ready():
+                    break
+                if canceledCallback and canceledCallback():
+                    self.canceled[slot] = 1
+                elif progressCallback:
+                    progressCallback(int(self.bytesHashed[slot]))
+            md5sum = asyncResult.get()
+            if md5sum and progressCallback:
+                progressCallback(int(self.bytesHashed[slot]))
+            return md5sum
+        finally:
+            self.freeSlots.put(slot)
+
+    def Terminate(self):
+        """
+        Stop the worker processes
+        """
+        with self.lock:
+            if self.pool:
+                self.pool.terminate()
+                self.pool = None
+
+
+# Singleton instance of Md5ProcessPool class:
+MD5_PROCESS_POOL = Md5ProcessPool()
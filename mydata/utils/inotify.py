@@ -0,0 +1,119 @@
+"""
+A minimal wrapper around the Linux inotify API, using ctypes, so that
+MyData can watch its data directory for new files without requiring an
+extra package.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Each event read from an inotify file descriptor begins with a struct
+# inotify_event header (wd, mask, cookie, len), followed by len bytes of
+# NUL-padded filename:
+EVENT_HEADER = struct.Struct("iIII")
+
+LIBC = None
+if sys.platform.startswith("linux"):
+    try:
+        LIBC = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        LIBC.inotify_init1  # pylint: disable=pointless-statement
+    except (OSError, AttributeError):
+        LIBC = None
+
+
+def IsAvailable():
+    """
+    Return True if the inotify API is available
+    """
+    return LIBC is not None
+
+
+class Inotify(object):
+    """
+    An inotify instance, which can watch multiple directories.
+    """
+    def __init__(self):
+        if not IsAvailable():
+            raise OSError(errno.ENOSYS, "inotify is not available.")
+        self.fd = LIBC.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def AddWatch(self, path, mask):
+        """
+        Watch the directory at path for the events in mask, returning
+        the watch descriptor.
+
+        :raises OSError: if the watch can't be added, e.g. ENOSPC if the
+            fs.inotify.max_user_watches limit has been reached.
+        """
+        if isinstance(path, unicode):
+            path = path.encode(sys.getfilesystemencoding() or 'utf8')
+        wd = LIBC.inotify_add_watch(self.fd, path, mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def RemoveWatch(self, wd):
+        """
+        Stop watching the directory with watch descriptor wd
+        """
+        LIBC.inotify_rm_watch(self.fd, wd)
+
+    def ReadEvents(self, timeout):
+        """
+        Wait up to timeout seconds for events, returning a list of
+        (wd, mask, cookie, name) tuples.
+
+        Names are decoded using the file system encoding, so they can be
+        joined to unicode directory paths.  A name which can't be decoded
+        is returned as a byte string.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as err:
+            if err.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = \
+                EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip("\0")
+            offset += length
+            try:
+                name = name.decode(sys.getfilesystemencoding() or 'utf8')
+            except UnicodeDecodeError:
+                pass
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def Close(self):
+        """
+        Close the inotify file descriptor, removing all of its watches
+        """
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -1,33 +1,123 @@
 """
 Methods for copying files into a locally accessible file store
 (e.g. an NFS Mount).
+
+On Linux, files are copied with the copy_file_range or sendfile system
+calls (called via ctypes, because Python 2 doesn't provide them), so the
+data doesn't need to be copied into (and back out of) MyData's process.
+Otherwise, files are copied through one large buffer, using readinto.
+Either way, files are copied in chunks, so progress can be reported (and
+copies can be canceled) after each chunk, without polling MyTardis for
+the number of bytes in staging.  System calls made via ctypes release
+the Global Interpreter Lock, so each upload thread can copy a file in
+parallel.
 """
-from datetime import datetime
+import ctypes
+import ctypes.util
+import errno
 import os
-import threading
-from shutil import copy
-
-import wx
+import shutil
+import sys
+from datetime import datetime
 
+from ..events.stop import ShouldCancelUpload
 from ..settings import SETTINGS
 from ..threads.locks import LOCKS
 from ..logs import logger
+from ..models.upload import UploadStatus
+
+# The number of bytes copied between progress updates:
+CHUNK_SIZE = 16 * 1024 * 1024
+
+POSIX_FADV_SEQUENTIAL = 2
+POSIX_FADV_DONTNEED = 4
+
+LIBC = None
+if sys.platform.startswith("linux"):
+    try:
+        LIBC = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except OSError:
+        LIBC = None
+
+# Each of these system calls may not be available, in which case MyData
+# stops trying to use it:
+COPY_SYSCALLS = dict()
+if LIBC is not None:
+    for name in ("copy_file_range", "sendfile", "posix_fadvise"):
+        COPY_SYSCALLS[name] = hasattr(LIBC, name)
+    if COPY_SYSCALLS["copy_file_range"]:
+        LIBC.copy_file_range.restype = ctypes.c_ssize_t
+        LIBC.copy_file_range.argtypes = [
+            ctypes.c_int, ctypes.POINTER(ctypes.c_int64), ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t, ctypes.c_uint]
+    if COPY_SYSCALLS["sendfile"]:
+        LIBC.sendfile.restype = ctypes.c_ssize_t
+        LIBC.sendfile.argtypes = [
+            ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int64),
+            ctypes.c_size_t]
+    if COPY_SYSCALLS["posix_fadvise"]:
+        LIBC.posix_fadvise.argtypes = [
+            ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_int]
+
+# Errors which mean that a system call can't copy between two files,
+# but copying with read and write will still work:
+UNSUPPORTED_ERRNOS = (errno.ENOSYS, errno.EXDEV, errno.EINVAL,
+                      errno.EOPNOTSUPP, errno.EBADF)
+
+
+def CopyChunkWithSyscall(name, srcFd, dstFd, offset, count):
+    """
+    Copy up to count bytes from offset in srcFd to dstFd (which must be
+    positioned at offset) using the copy_file_range or sendfile system
+    call, returning the number of bytes copied, or None if the system
+    call can't copy between these two files.
+
+    Only ENOSYS (the system call isn't implemented by the kernel) stops
+    MyData from trying the system call for other files.  Other errors
+    (e.g. EXDEV) depend on the file systems involved.
+
+    :raises OSError:
+    """
+    srcOffset = ctypes.c_int64(offset)
+    if name == "copy_file_range":
+        numBytes = LIBC.copy_file_range(
+            srcFd, ctypes.byref(srcOffset), dstFd, None, count, 0)
+    else:
+        numBytes = LIBC.sendfile(dstFd, srcFd, ctypes.byref(srcOffset), count)
+    if numBytes < 0:
+        err = ctypes.get_errno()
+        if err in UNSUPPORTED_ERRNOS and offset == 0:
+            logger.debug("Can't copy files with %s: %s"
+                         % (name, os.strerror(err)))
+            if err == errno.ENOSYS:
+                COPY_SYSCALLS[name] = False
+            return None
+        raise OSError(err, os.strerror(err))
+    return numBytes
 
-from .progress import MonitorProgress
+
+def Fadvise(fd, offset, length, advice):
+    """
+    Call posix_fadvise, if it is available
+    """
+    if COPY_SYSCALLS.get("posix_fadvise"):
+        LIBC.posix_fadvise(fd, offset, length, advice)
 
 
 def CopyFile(filePath, fileSize, targetFilePath,
              progressCallback, uploadModel):
     """
     Copy a file to a local directory or mount point.
+
+    The method used to copy the file (copy_file_range, sendfile or
+    readinto) is chosen when its first chunk is copied, and the same
+    method is used for the rest of the file.  The system calls don't move
+    the source file's position, so it wouldn't be safe to switch to
+    readinto part of the way through the file.
     """
     bytesUploaded = 0
     progressCallback(bytesUploaded, fileSize, message="Uploading...")
-    progressPollInterval = SETTINGS.miscellaneous.progressPollInterval
-    monitoringProgress = threading.Event()
     uploadModel.startTime = datetime.now()
-    MonitorProgress(progressPollInterval, uploadModel,
-                    fileSize, monitoringProgress, progressCallback)
     targetDir = os.path.dirname(targetFilePath)
     with LOCKS.createDir:
         if targetDir not in REMOTE_DIRS_CREATED:
@@ -35,16 +125,59 @@ def CopyFile(filePath, fileSize, targetFilePath,
                 os.makedirs(targetDir)
             REMOTE_DIRS_CREATED[targetDir] = True
 
-    if wx.GetApp().foldersController.canceled or uploadModel.canceled:
+    if ShouldCancelUpload(uploadModel):
         logger.debug("CopyFile: Aborting upload "
                      "for %s" % filePath)
         return
 
-    targetDir = os.path.dirname(targetFilePath)
-    copy(filePath, targetDir)
+    uploadModel.status = UploadStatus.IN_PROGRESS
+    fadvise = SETTINGS.miscellaneous.fadviseLocalCopies
+    buf = None
+    copyMethod = None
+    with open(filePath, 'rb', 0) as srcFile:
+        with open(targetFilePath, 'wb', 0) as dstFile:
+            srcFd = srcFile.fileno()
+            dstFd = dstFile.fileno()
+            if fadvise:
+                Fadvise(srcFd, 0, 0, POSIX_FADV_SEQUENTIAL)
+            while bytesUploaded < fileSize:
+                if ShouldCancelUpload(uploadModel):
+                    logger.debug("CopyFile: Aborting upload "
+                                 "for %s" % filePath)
+                    return
+                count = min(CHUNK_SIZE, fileSize - bytesUploaded)
+                numBytes = None
+                if copyMethod is None:
+                    for name in ("copy_file_range", "sendfile"):
+                        if COPY_SYSCALLS.get(name):
+                            numBytes = CopyChunkWithSyscall(
+                                name, srcFd, dstFd, bytesUploaded, count)
+                            if numBytes is not None:
+                                copyMethod = name
+                                break
+                    else:
+                        copyMethod = "readinto"
+                elif copyMethod != "readinto":
+                    numBytes = CopyChunkWithSyscall(
+                        copyMethod, srcFd, dstFd, bytesUploaded, count)
+                if copyMethod == "readinto":
+                    if buf is None:
+                        buf = bytearray(CHUNK_SIZE)
+                    numBytes = srcFile.readinto(buf)
+                    dstFile.write(memoryview(buf)[:numBytes])
+                if not numBytes:
+                    # The file has been truncated since it was scanned:
+                    break
+                if fadvise:
+                    Fadvise(srcFd, bytesUploaded, numBytes,
+                            POSIX_FADV_DONTNEED)
+                bytesUploaded += numBytes
+                uploadModel.SetLatestTime(datetime.now())
+                progressCallback(bytesUploaded, fileSize)
+    # Like shutil.copy, which MyData used to copy files:
+    shutil.copymode(filePath, targetFilePath)
     latestUpdateTime = datetime.now()
     uploadModel.SetLatestTime(latestUpdateTime)
-    bytesUploaded = fileSize
     progressCallback(bytesUploaded, fileSize)
 
 
@@ -9,10 +9,13 @@ import subprocess
 import traceback
 import re
 import getpass
+import shutil
+import tempfile
 import threading
 import time
 import pkgutil
 import struct
+import tarfile
 
 import psutil
 
@@ -43,6 +46,13 @@ SLEEP_FACTOR = 0.01
 
 REMOTE_DIRS_CREATED = dict()
 
+# If MyData exits without closing its SSH master connections, they will
+# exit after being idle for this many seconds:
+CONTROL_PERSIST_SECONDS = 300
+
+# The size of the chunks read from a local file while resuming its upload:
+RESUME_CHUNK_SIZE = 1024 * 1024
+
 
 class OpenSSH(object):
     """
@@ -118,6 +128,125 @@ class OpenSSH(object):
         ]
 
 
+class SshControlMasters(object):
+    """
+    Persistent SSH master connections (using OpenSSH's ControlMaster
+    feature), one for each upload thread, so that the remote mkdir, scp
+    and chmod commands for each staged file can be multiplexed over an
+    existing connection, rather than each performing its own key exchange
+    and authentication.
+
+    Each master connection is started explicitly (with ssh -M -N -f), so
+    that a master never inherits the output pipes of a command whose
+    output MyData is waiting to read.  The other commands only specify the
+    master's ControlPath, so if a master isn't running, they connect to
+    the server directly.
+
+    A singleton instance of this class (called SSH_CONTROL_MASTERS) is
+    created in this module.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.controlDir = None
+        # Control paths keyed by (thread name, username, host, port),
+        # or None if the master connection couldn't be started:
+        self.controlPaths = dict()
+        # (username, host, port) keyed by control path:
+        self.masters = dict()
+
+    def GetOptions(self, username, privateKeyFilePath, host, port):
+        """
+        Return the SSH options for running a command over the current
+        thread's master connection to host, starting the master
+        connection if necessary.  Returns an empty list if connection
+        sharing is disabled or the master connection couldn't be started.
+        """
+        if not SETTINGS.miscellaneous.sshConnectionSharing or \
+                sys.platform.startswith("win"):
+            return []
+        key = (threading.current_thread().name, username, host, str(port))
+        with self.lock:
+            if key in self.controlPaths:
+                controlPath = self.controlPaths[key]
+                return ["-oControlPath=%s" % controlPath] \
+                    if controlPath else []
+            if not self.controlDir:
+                self.controlDir = tempfile.mkdtemp(prefix="mydata-ssh-")
+            # Unix domain socket paths are limited to around 100
+            # characters, so a short name is used for each master:
+            controlPath = os.path.join(
+                self.controlDir, str(len(self.controlPaths)))
+            self.controlPaths[key] = None
+        if not self.StartMaster(
+                controlPath, username, privateKeyFilePath, host, port):
+            return []
+        with self.lock:
+            self.controlPaths[key] = controlPath
+            self.masters[controlPath] = (username, host, str(port))
+        return ["-oControlPath=%s" % controlPath]
+
+    @staticmethod
+    def StartMaster(controlPath, username, privateKeyFilePath, host, port):
+        """
+        Start a master connection listening on controlPath, returning
+        True if it was started successfully
+        """
+        cmdAndArgs = [
+            OPENSSH.ssh,
+            "-M", "-N", "-f",
+            "-oControlPath=%s" % controlPath,
+            "-oControlPersist=%d" % CONTROL_PERSIST_SECONDS,
+            "-p", str(port),
+            "-i", privateKeyFilePath,
+            "-l", username,
+            host]
+        cmdAndArgs[1:1] = SETTINGS.miscellaneous.cipherOptions
+        cmdAndArgs[1:1] = OpenSSH.DefaultSshOptions(
+            SETTINGS.miscellaneous.connectionTimeout)
+        logger.debug(" ".join(cmdAndArgs))
+        try:
+            with open(os.devnull, 'r+') as devNull:
+                returncode = subprocess.call(
+                    cmdAndArgs, stdin=devNull, stdout=devNull,
+                    stderr=devNull)
+        except (IOError, OSError):
+            logger.warning(traceback.format_exc())
+            return False
+        if returncode != 0:
+            logger.warning(
+                "Couldn't start SSH master connection to %s, so SSH "
+                "commands will connect separately." % host)
+            return False
+        return True
+
+    def Close(self):
+        """
+        Ask each master connection to exit, and remove their control
+        sockets' directory
+        """
+        with self.lock:
+            masters = self.masters.items()
+            controlDir = self.controlDir
+            self.controlPaths.clear()
+            self.masters.clear()
+            self.controlDir = None
+        for controlPath, (username, host, port) in masters:
+            cmdAndArgs = [
+                OPENSSH.ssh, "-O", "exit",
+                "-oControlPath=%s" % controlPath,
+                "-p", port, "-l", username, host]
+            logger.debug(" ".join(cmdAndArgs))
+            try:
+                with open(os.devnull, 'r+') as devNull:
+                    subprocess.call(
+                        cmdAndArgs, stdin=devNull, stdout=devNull,
+                        stderr=devNull)
+            except (IOError, OSError):
+                logger.warning(traceback.format_exc())
+        if controlDir:
+            shutil.rmtree(controlDir, ignore_errors=True)
+
+
 class KeyPair(object):
     """
     Represents an SSH key-pair, e.g. (~/.ssh/MyData, ~/.ssh/MyData.pub)
@@ -378,6 +507,8 @@ def UploadFile(filePath, fileSize, username, privateKeyFilePath,
                       .replace('`', r'\\`')
                       .replace('$', r'\\$'))]
     scpCommandList[2:2] = SETTINGS.miscellaneous.cipherOptions
+    scpCommandList[2:2] = SSH_CONTROL_MASTERS.GetOptions(
+        username, privateKeyFilePath, host, port)
     scpCommandList[2:2] = OpenSSH.DefaultSshOptions(
         SETTINGS.miscellaneous.connectionTimeout)
 
@@ -393,6 +524,208 @@ def UploadFile(filePath, fileSize, username, privateKeyFilePath,
     progressCallback(current=fileSize, total=fileSize)
 
 
+class TarMemberReader(object):
+    """
+    Reads a file being added to a tar archive, reporting the file's
+    upload progress as it is read.
+    """
+    def __init__(self, fileObj, fileSize, progressCallback):
+        self.fileObj = fileObj
+        self.fileSize = fileSize
+        self.progressCallback = progressCallback
+        self.bytesRead = 0
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes, and report progress
+        """
+        data = self.fileObj.read(size)
+        self.bytesRead += len(data)
+        self.progressCallback(current=self.bytesRead, total=self.fileSize)
+        return data
+
+
+def UploadFilesWithTar(files, username, privateKeyFilePath, host, port):
+    """
+    Upload a batch of files to staging by streaming a tar archive over a
+    single SSH connection to "tar -x" on the staging server, rather than
+    running ssh mkdir, scp and ssh chmod for each file.
+
+    The files argument is a list of (filePath, fileSize, remoteFilePath,
+    progressCallback, uploadModel) tuples.  Each file's archive member is
+    named with its absolute remote path (relative to the root directory
+    which the archive is extracted into), with mode 660, like the files
+    uploaded by UploadFile.
+    """
+    if sys.platform.startswith("win"):
+        privateKeyFilePath = GetCygwinPath(privateKeyFilePath)
+
+    remoteDirs = sorted(set(os.path.dirname(remoteFilePath)
+                            for _, _, remoteFilePath, _, _ in files))
+    for remoteDir in remoteDirs:
+        with LOCKS.createRemoteDir:
+            CreateRemoteDir(
+                remoteDir, username, privateKeyFilePath, host, port)
+
+    tarCmdAndArgs = [
+        OPENSSH.ssh,
+        "-p", port,
+        "-i", privateKeyFilePath,
+        "-l", username,
+        host,
+        "tar -x -p -f - -C /"]
+    tarCmdAndArgs[1:1] = SETTINGS.miscellaneous.cipherOptions
+    tarCmdAndArgs[1:1] = SSH_CONTROL_MASTERS.GetOptions(
+        username, privateKeyFilePath, host, port)
+    tarCmdAndArgs[1:1] = OpenSSH.DefaultSshOptions(
+        SETTINGS.miscellaneous.connectionTimeout)
+    tarCommandString = " ".join(tarCmdAndArgs)
+    logger.debug(tarCommandString)
+    try:
+        tarProcess = subprocess.Popen(
+            tarCmdAndArgs,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            startupinfo=DEFAULT_STARTUP_INFO,
+            creationflags=DEFAULT_CREATION_FLAGS)
+    except (IOError, OSError) as err:
+        raise SshException(err, returncode=255)
+    for filePath, fileSize, _, progressCallback, uploadModel in files:
+        uploadModel.status = UploadStatus.IN_PROGRESS
+        uploadModel.scpUploadProcessPid = tarProcess.pid
+        progressCallback(current=0, total=fileSize, message="Uploading...")
+    try:
+        archive = tarfile.open(
+            fileobj=tarProcess.stdin, mode="w|",
+            format=tarfile.PAX_FORMAT, encoding="utf-8")
+        for filePath, fileSize, remoteFilePath, progressCallback, \
+                uploadModel in files:
+            if ShouldCancelUpload(uploadModel):
+                logger.debug(
+                    "UploadFilesWithTar: Aborting upload for %s" % filePath)
+                break
+            tarInfo = tarfile.TarInfo(remoteFilePath.lstrip("/"))
+            tarInfo.size = fileSize
+            tarInfo.mode = 0o660
+            tarInfo.mtime = os.path.getmtime(filePath)
+            with open(filePath, 'rb') as fileObj:
+                archive.addfile(
+                    tarInfo,
+                    TarMemberReader(fileObj, fileSize, progressCallback))
+            uploadModel.SetLatestTime(datetime.now())
+        else:
+            archive.close()
+    except IOError as err:
+        # e.g. a broken pipe, if the SSH connection failed, in which case
+        # the SSH process's output will explain why, or a local file which
+        # couldn't be read, in which case the remote tar will report that
+        # the archive is incomplete:
+        logger.warning(str(err))
+    finally:
+        try:
+            tarProcess.stdin.close()
+        except IOError:
+            pass
+    stdout = tarProcess.stdout.read()
+    tarProcess.wait()
+    if tarProcess.returncode != 0:
+        raise SshException(stdout, tarProcess.returncode)
+
+
+def ResumeUploadFile(filePath, fileSize, bytesUploadedPreviously, md5sum,
+                     username, privateKeyFilePath, host, port,
+                     remoteFilePath, progressCallback, uploadModel):
+    """
+    Resume a partial upload to staging, by truncating the remote file to
+    the bytesUploadedPreviously bytes which are known to have been
+    uploaded, appending the rest of the local file to it over SSH and
+    setting its permissions.
+
+    Returns True if the remote file then has the expected size and MD5
+    checksum, or False if it doesn't, in which case the whole file should
+    be uploaded again.
+    """
+    if sys.platform.startswith("win"):
+        privateKeyFilePath = GetCygwinPath(privateKeyFilePath)
+    quotedPath = OpenSSH.DoubleQuoteRemotePath(remoteFilePath)
+    remoteCommand = (
+        "truncate -s %d %s && cat >> %s && chmod 660 %s && "
+        "wc -c < %s && md5sum %s"
+        % (bytesUploadedPreviously, quotedPath, quotedPath, quotedPath,
+           quotedPath, quotedPath))
+    resumeCmdAndArgs = [
+        OPENSSH.ssh,
+        "-p", port,
+        "-i", privateKeyFilePath,
+        "-l", username,
+        host,
+        remoteCommand]
+    resumeCmdAndArgs[1:1] = SETTINGS.miscellaneous.cipherOptions
+    resumeCmdAndArgs[1:1] = SSH_CONTROL_MASTERS.GetOptions(
+        username, privateKeyFilePath, host, port)
+    resumeCmdAndArgs[1:1] = OpenSSH.DefaultSshOptions(
+        SETTINGS.miscellaneous.connectionTimeout)
+    logger.debug(" ".join(resumeCmdAndArgs))
+    try:
+        resumeProcess = subprocess.Popen(
+            resumeCmdAndArgs,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            startupinfo=DEFAULT_STARTUP_INFO,
+            creationflags=DEFAULT_CREATION_FLAGS)
+    except (IOError, OSError) as err:
+        raise SshException(err, returncode=255)
+    uploadModel.status = UploadStatus.IN_PROGRESS
+    uploadModel.scpUploadProcessPid = resumeProcess.pid
+    bytesUploaded = bytesUploadedPreviously
+    progressCallback(current=bytesUploaded, total=fileSize,
+                     message="Resuming upload...")
+    try:
+        with open(filePath, 'rb') as localFile:
+            localFile.seek(bytesUploadedPreviously)
+            while not ShouldCancelUpload(uploadModel):
+                chunk = localFile.read(RESUME_CHUNK_SIZE)
+                if not chunk:
+                    break
+                resumeProcess.stdin.write(chunk)
+                bytesUploaded += len(chunk)
+                progressCallback(current=bytesUploaded, total=fileSize)
+    except IOError as err:
+        # e.g. a broken pipe, if the SSH connection failed, in which case
+        # the SSH process's output will explain why:
+        logger.warning(str(err))
+    finally:
+        try:
+            resumeProcess.stdin.close()
+        except IOError:
+            pass
+    stdout = resumeProcess.stdout.read()
+    stderr = resumeProcess.stderr.read()
+    resumeProcess.wait()
+    if ShouldCancelUpload(uploadModel):
+        return False
+    if resumeProcess.returncode != 0:
+        raise SshException(stderr or stdout, resumeProcess.returncode)
+    uploadModel.SetLatestTime(datetime.now())
+    try:
+        sizeLine, md5Line = stdout.strip().splitlines()[-2:]
+        remoteSize = int(sizeLine.strip())
+        remoteMd5Sum = md5Line.split()[0]
+    except ValueError:
+        logger.warning("Unexpected output from resumed upload: %s" % stdout)
+        return False
+    if remoteSize != fileSize or remoteMd5Sum != md5sum:
+        logger.warning(
+            "Resumed upload of %s has size %s and MD5 sum %s, but expected "
+            "%s and %s." % (filePath, remoteSize, remoteMd5Sum, fileSize,
+                            md5sum))
+        return False
+    progressCallback(current=fileSize, total=fileSize)
+    return True
+
+
 def ScpUpload(uploadModel, scpCommandList):
     """
     Perfom an SCP upload using subprocess.Popen
@@ -467,6 +800,8 @@ def SetRemoteFilePermissions(remoteFilePath, username, privateKeyFilePath,
          "-l", username,
          host,
          "chmod 660 %s" % OpenSSH.DoubleQuoteRemotePath(remoteFilePath)]
+    chmodCmdAndArgs[1:1] = SSH_CONTROL_MASTERS.GetOptions(
+        username, privateKeyFilePath, host, port)
     chmodCmdAndArgs[1:1] = OpenSSH.DefaultSshOptions(
         SETTINGS.miscellaneous.connectionTimeout)
     logger.debug(" ".join(chmodCmdAndArgs))
@@ -524,6 +859,8 @@ def CreateRemoteDir(remoteDir, username, privateKeyFilePath, host, port):
              "-l", username,
              host,
              "mkdir -m 2770 -p %s" % remoteDir]
+        mkdirCmdAndArgs[1:1] = SSH_CONTROL_MASTERS.GetOptions(
+            username, privateKeyFilePath, host, port)
         mkdirCmdAndArgs[1:1] = OpenSSH.DefaultSshOptions(
             SETTINGS.miscellaneous.connectionTimeout)
         logger.debug(" ".join(mkdirCmdAndArgs))
@@ -575,7 +912,11 @@ def CleanUpScpAndSshProcesses():
     check that the absolute path of the SSH executable to be terminated
     matches MyData's SSH path.  On other platforms, we can use proc.cmdline()
     to ensure that the SSH process we're killing uses MyData's private key.
+
+    SSH master connections are asked to exit first, so they can close
+    their connections and remove their control sockets.
     """
+    SSH_CONTROL_MASTERS.Close()
     if not SETTINGS.uploaderModel:
         return
     try:
@@ -601,3 +942,6 @@ def CleanUpScpAndSshProcesses():
 
 # Singleton instance of OpenSSH class:
 OPENSSH = OpenSSH()
+
+# Singleton instance of SshControlMasters class:
+SSH_CONTROL_MASTERS = SshControlMasters()
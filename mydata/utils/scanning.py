@@ -0,0 +1,65 @@
+"""
+Directory listing functions used when scanning MyData's data directory.
+
+Where scandir is available (os.scandir on Python 3.5+, or the scandir
+package on Python 2), directory entries' types are read from the
+directory listing itself (d_type on POSIX systems), rather than requiring
+an extra stat call per entry, which is expensive on network file systems.
+"""
+import fnmatch
+import os
+
+try:
+    from os import scandir
+    from os import walk
+except ImportError:
+    try:
+        from scandir import scandir
+        from scandir import walk
+    except ImportError:
+        scandir = None
+        from os import walk
+
+
+def ListEntries(path, wantDirectories, pattern=None):
+    """
+    Return a sorted list of the names of the subdirectories of path (if
+    wantDirectories is True) or of the files in path (if wantDirectories
+    is False).
+
+    If a glob pattern is supplied, only matching names are returned, and
+    like glob.glob, names beginning with '.' are ignored.
+    """
+    if scandir:
+        if wantDirectories:
+            names = [entry.name for entry in scandir(path) if entry.is_dir()]
+        else:
+            names = [entry.name for entry in scandir(path) if entry.is_file()]
+    else:
+        if wantDirectories:
+            isType = os.path.isdir
+        else:
+            isType = os.path.isfile
+        names = [name for name in os.listdir(path)
+                 if isType(os.path.join(path, name))]
+    if pattern is not None:
+        names = [name for name in fnmatch.filter(names, pattern)
+                 if not name.startswith('.')]
+    return sorted(names)
+
+
+def SubdirectoryNames(path, pattern=None):
+    """
+    Return a sorted list of the names of the subdirectories of path,
+    optionally only those matching a glob pattern.
+    """
+    return ListEntries(path, wantDirectories=True, pattern=pattern)
+
+
+def FileNames(path, pattern=None):
+    """
+    Return a sorted list of the names of the files in path,
+    optionally only those matching a glob pattern.
+    """
+    return ListEntries(path, wantDirectories=False, pattern=pattern)
+
@@ -0,0 +1,304 @@
+"""
+Methods for uploading files to staging with an in-process SFTP client
+(paramiko), as an alternative to running OpenSSH's scp and ssh binaries
+(see mydata.utils.openssh).
+
+Authenticated SSH connections are kept in a pool, so each upload thread
+can reuse a connection for many files, and each file's remote mkdir,
+upload and chmod are performed within one SFTP session.  Upload progress
+is counted locally as the file is written, and an upload can be canceled
+between writes, without terminating any processes.
+
+paramiko is only imported when an SFTP connection is needed, so it is
+only required if the sftp_uploads setting is enabled.
+"""
+import os
+import socket
+import threading
+from datetime import datetime
+
+from ..events.stop import ShouldCancelUpload
+from ..settings import SETTINGS
+from ..logs import logger
+from ..models.upload import UploadStatus
+from ..threads.locks import LOCKS
+from .exceptions import SshException
+from .openssh import OpenSSH
+from .openssh import REMOTE_DIRS_CREATED
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def LoadPrivateKey(privateKeyFilePath):
+    """
+    Load MyData's private key
+
+    :raises SshException:
+    """
+    import paramiko
+    # MyData's key pair is generated by OpenSSH's ssh-keygen, whose default
+    # key type depends on its version:
+    for keyClass in (paramiko.RSAKey, paramiko.ECDSAKey,
+                     paramiko.Ed25519Key, paramiko.DSSKey):
+        try:
+            return keyClass.from_private_key_file(privateKeyFilePath)
+        except paramiko.SSHException:
+            continue
+    raise SshException(
+        "Couldn't read private key file \"%s\"" % privateKeyFilePath)
+
+
+class SftpConnectionPool(object):
+    """
+    A pool of authenticated SFTP sessions, keyed by username, host and
+    port.  A session is only used by one upload thread at a time.
+
+    A singleton instance of this class (called SFTP_POOL) is created in
+    this module.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idleSessions = dict()
+
+    def Acquire(self, username, privateKeyFilePath, host, port):
+        """
+        Return an SFTP session from the pool, connecting a new one if
+        there are no idle sessions
+
+        :raises SshException:
+        """
+        key = (username, host, int(port))
+        with self.lock:
+            idleSessions = self.idleSessions.setdefault(key, [])
+            while idleSessions:
+                sftp = idleSessions.pop()
+                if sftp.get_channel().get_transport().is_active():
+                    return sftp
+                sftp.close()
+        return self.Connect(username, privateKeyFilePath, host, int(port))
+
+    @staticmethod
+    def Connect(username, privateKeyFilePath, host, port):
+        """
+        Connect and authenticate a new SFTP session
+
+        Like MyData's OpenSSH commands (which use StrictHostKeyChecking=no),
+        the server's host key isn't checked against a known hosts file.
+
+        :raises SshException:
+        """
+        import paramiko
+        logger.debug("Opening SFTP connection to %s@%s:%s"
+                     % (username, host, port))
+        transport = None
+        try:
+            sock = socket.create_connection(
+                (host, port), SETTINGS.miscellaneous.connectionTimeout)
+            transport = paramiko.Transport(sock)
+            transport.connect(
+                username=username, pkey=LoadPrivateKey(privateKeyFilePath))
+            return paramiko.SFTPClient.from_transport(transport)
+        except (paramiko.SSHException, socket.error, EOFError) as err:
+            if transport:
+                transport.close()
+            raise SshException(
+                "Couldn't open SFTP connection to %s: %s" % (host, err),
+                returncode=255)
+
+    def Release(self, sftp, username, host, port):
+        """
+        Return an SFTP session to the pool
+        """
+        key = (username, host, int(port))
+        with self.lock:
+            self.idleSessions.setdefault(key, []).append(sftp)
+
+    def CloseAll(self):
+        """
+        Close all of the idle SFTP sessions and their connections
+        """
+        with self.lock:
+            sessions = [sftp for idleSessions in self.idleSessions.values()
+                        for sftp in idleSessions]
+            self.idleSessions.clear()
+        if not sessions:
+            return
+        import paramiko
+        for sftp in sessions:
+            try:
+                sftp.get_channel().get_transport().close()
+            except (paramiko.SSHException, socket.error, EOFError):
+                pass
+
+
+def CreateRemoteDirWithSftp(sftp, remoteDir):
+    """
+    Create a remote directory (and its parent directories) with mode 2770,
+    like "mkdir -m 2770 -p"
+    """
+    if remoteDir in REMOTE_DIRS_CREATED:
+        return
+    missingDirs = []
+    path = remoteDir.rstrip('/')
+    while path:
+        try:
+            sftp.stat(path)
+            break
+        except IOError:
+            missingDirs.append(path)
+            path = os.path.dirname(path).rstrip('/')
+    for path in reversed(missingDirs):
+        try:
+            sftp.mkdir(path)
+        except IOError:
+            # Another upload thread (or MyData instance) may have just
+            # created it:
+            sftp.stat(path)
+            continue
+        # The server's umask applies to SFTP mkdir, so the permissions are
+        # set explicitly:
+        sftp.chmod(path, 0o2770)
+    REMOTE_DIRS_CREATED[remoteDir] = True
+
+
+def UploadFileWithSftp(filePath, fileSize, username, privateKeyFilePath,
+                       host, port, remoteFilePath, progressCallback,
+                       uploadModel, md5=None):
+    """
+    Upload a file to staging using SFTP, with the same arguments as
+    mydata.utils.openssh.UploadFile.
+
+    If md5 (a hashlib.md5 object) is supplied, it is updated with each
+    chunk of the file as it is uploaded, so the file's MD5 checksum can
+    be calculated without reading the file again.
+
+    :raises SshException:
+    """
+    import paramiko
+    progressCallback(current=0, total=fileSize, message="Uploading...")
+    uploadModel.startTime = datetime.now()
+    sftp = SFTP_POOL.Acquire(username, privateKeyFilePath, host, port)
+    try:
+        with LOCKS.createRemoteDir:
+            CreateRemoteDirWithSftp(sftp, os.path.dirname(remoteFilePath))
+        if ShouldCancelUpload(uploadModel):
+            logger.debug("UploadFileWithSftp: Aborting upload for %s"
+                         % filePath)
+            SFTP_POOL.Release(sftp, username, host, port)
+            return
+        uploadModel.status = UploadStatus.IN_PROGRESS
+        bytesUploaded = 0
+        with open(filePath, 'rb') as localFile:
+            with sftp.open(remoteFilePath, 'wb') as remoteFile:
+                remoteFile.set_pipelined(True)
+                while True:
+                    if ShouldCancelUpload(uploadModel):
+                        logger.debug(
+                            "UploadFileWithSftp: Aborting upload for %s"
+                            % filePath)
+                        break
+                    chunk = localFile.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    remoteFile.write(chunk)
+                    if md5:
+                        md5.update(chunk)
+                    bytesUploaded += len(chunk)
+                    progressCallback(current=bytesUploaded, total=fileSize)
+        if not ShouldCancelUpload(uploadModel):
+            sftp.chmod(remoteFilePath, 0o660)
+    except (paramiko.SSHException, socket.error, EOFError, IOError) as err:
+        sftp.get_channel().get_transport().close()
+        raise SshException(
+            "SFTP upload of %s to %s failed: %s" % (filePath, host, err),
+            returncode=255)
+    SFTP_POOL.Release(sftp, username, host, port)
+
+    uploadModel.SetLatestTime(datetime.now())
+    if bytesUploaded == fileSize:
+        progressCallback(current=fileSize, total=fileSize)
+
+
+def RemoteMd5Sum(sftp, remoteFilePath):
+    """
+    Return the MD5 checksum of a remote file, calculated by running
+    md5sum over the SFTP session's SSH connection, or None if it can't
+    be calculated (e.g. for an SFTP-only account)
+    """
+    import paramiko
+    channel = sftp.get_channel().get_transport().open_session()
+    try:
+        try:
+            channel.exec_command(
+                "md5sum %s" % OpenSSH.DoubleQuoteRemotePath(remoteFilePath))
+        except paramiko.SSHException:
+            # The server doesn't allow commands to be run:
+            return None
+        stdout = channel.makefile('rb').read()
+        if channel.recv_exit_status() != 0 or not stdout.strip():
+            return None
+        return stdout.split()[0]
+    finally:
+        channel.close()
+
+
+def ResumeUploadFileWithSftp(filePath, fileSize, bytesUploadedPreviously,
+                             md5sum, username, privateKeyFilePath, host,
+                             port, remoteFilePath, progressCallback,
+                             uploadModel):
+    """
+    Resume a partial upload to staging using SFTP, with the same arguments
+    and return value as mydata.utils.openssh.ResumeUploadFile.
+
+    :raises SshException:
+    """
+    import paramiko
+    sftp = SFTP_POOL.Acquire(username, privateKeyFilePath, host, port)
+    bytesUploaded = bytesUploadedPreviously
+    progressCallback(current=bytesUploaded, total=fileSize,
+                     message="Resuming upload...")
+    uploadModel.status = UploadStatus.IN_PROGRESS
+    try:
+        with open(filePath, 'rb') as localFile:
+            localFile.seek(bytesUploadedPreviously)
+            with sftp.open(remoteFilePath, 'r+b') as remoteFile:
+                remoteFile.truncate(bytesUploadedPreviously)
+                remoteFile.seek(bytesUploadedPreviously)
+                remoteFile.set_pipelined(True)
+                while not ShouldCancelUpload(uploadModel):
+                    chunk = localFile.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    remoteFile.write(chunk)
+                    bytesUploaded += len(chunk)
+                    progressCallback(current=bytesUploaded, total=fileSize)
+        if ShouldCancelUpload(uploadModel):
+            SFTP_POOL.Release(sftp, username, host, port)
+            return False
+        sftp.chmod(remoteFilePath, 0o660)
+        remoteSize = sftp.stat(remoteFilePath).st_size
+        remoteMd5Sum = RemoteMd5Sum(sftp, remoteFilePath)
+    except (paramiko.SSHException, socket.error, EOFError, IOError) as err:
+        sftp.get_channel().get_transport().close()
+        raise SshException(
+            "Resuming SFTP upload of %s to %s failed: %s"
+            % (filePath, host, err), returncode=255)
+    SFTP_POOL.Release(sftp, username, host, port)
+    uploadModel.SetLatestTime(datetime.now())
+    if remoteMd5Sum is None:
+        # MyTardis will still check the MD5 sum when verifying the file:
+        logger.debug("Couldn't calculate MD5 sum of %s on %s"
+                     % (remoteFilePath, host))
+        remoteMd5Sum = md5sum
+    if remoteSize != fileSize or remoteMd5Sum != md5sum:
+        logger.warning(
+            "Resumed upload of %s has size %s and MD5 sum %s, but expected "
+            "%s and %s." % (filePath, remoteSize, remoteMd5Sum, fileSize,
+                            md5sum))
+        return False
+    progressCallback(current=fileSize, total=fileSize)
+    return True
+
+
+# Singleton instance of SftpConnectionPool class:
+SFTP_POOL = SftpConnectionPool()
@@ -11,7 +11,12 @@ Only the very latest pre-release wxPython (3.0.3.dev)
 is pip-installable.  For earlier versions (2.9.5 or
 3.0.2), use the installer from http://wxpython.org
 """
+import multiprocessing
 import sys
 import mydata.MyData
 
-mydata.MyData.Run(sys.argv)
+if __name__ == "__main__":
+    # Required for MyData's hashing worker processes in frozen
+    # (PyInstaller) Windows builds:
+    multiprocessing.freeze_support()
+    mydata.MyData.Run(sys.argv)